@@ -3,7 +3,7 @@ Entry point for running the application with `python -m backend`
 """
 import os
 import logging
-from .app import app, logger
+from .app import app, logger, start_background_workers
 from .utils.file_logger import setup_file_logger
 
 # Set up file logging
@@ -17,5 +17,9 @@ if __name__ == "__main__":
     host = os.environ.get("HOST", "0.0.0.0")
     port = int(os.environ.get("PORT", 5000))
     
+    # Not in the reloader's parent process, which only watches files
+    if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_workers()
+
     logger.info(f"🚀 Starting application on http://{host}:{port}")
     app.run(host=host, port=port)
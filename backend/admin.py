@@ -393,8 +393,10 @@ class CarAdmin(SecureModelView):
             from utils.file_logger import get_module_logger
         try:
             from backend.models import ImageTask
+            from backend.utils.image_queue import GALLERY_AI_SOURCE, add_gallery_generation, generator_path
         except ImportError:
             from models import ImageTask
+            from utils.image_queue import GALLERY_AI_SOURCE, add_gallery_generation, generator_path
         logger = get_module_logger(__name__)
 
         # Get the gallery image by ID
@@ -409,7 +411,7 @@ class CarAdmin(SecureModelView):
         image_task = ImageTask(
             task_id=task_id,
             car_id=car.id,
-            source='gallery_ai',
+            source=GALLERY_AI_SOURCE,
             status='processing',
             source_image_id=image.id,
             source_url=image.url,
@@ -438,36 +440,30 @@ class CarAdmin(SecureModelView):
             # Call the image generation function
             try:
                 from backend.utils.generator_photon import generate_with_photon
+                from backend.utils.generation_outputs import generation_task, latest_generation_output
             except ImportError:
                 from utils.generator_photon import generate_with_photon
+                from utils.generation_outputs import generation_task, latest_generation_output
             logger.info(f"🚀 Calling Photon generator with image URL: {image.url}")
 
             # Image lookup and generation process
-            new_image_url = generate_with_photon(
-                prompt=prompt_hint,
-                image_url=image.url,
-                car_model=car.model,
-                car_brand=car.brand.name if car.brand else "Unknown",
-                car_id=car.id
-            )
+            generator_params = {
+                'prompt': prompt_hint,
+                'image_url': image.url,
+                'car_model': car.model,
+                'car_brand': car.brand.name if car.brand else "Unknown",
+                'car_id': car.id
+            }
+            with generation_task(task_id):
+                new_image_url = generate_with_photon(**generator_params)
 
             # Update the task with the status
             if new_image_url:
                 logger.info(f"✅ Successfully generated image, URL: {new_image_url}")
 
-                # Create a new gallery image with the generated image
-                new_image = CarImage(
-                    car_id=car.id,
-                    url=new_image_url,
-                    title=f"AI Generated {datetime.now().strftime('%Y-%m-%d')}",
-                    alt=f"AI generated {car.brand.name if car.brand else ''} {car.model}",
-                    position=(len(car.gallery_images) if car.gallery_images else 0)
-                )
-                db.session.add(new_image)
+                # Create a new gallery image with the generated image and set it as main image
+                new_image = add_gallery_generation(car, new_image_url)
                 db.session.flush()  # Get the new ID without committing
-
-                # Set as main image
-                car.image_url = new_image_url
                 
                 # Update the image task status
                 image_task.status = 'completed'
@@ -495,63 +491,21 @@ class CarAdmin(SecureModelView):
                     flash(f"Сохранено, но произошла ошибка при сохранении изображения: {str(db_error)[:100]}", "error")
                     return redirect(url_for('car.edit_view', id=car.id))
             else:
-                # Log failure but the URL was generated successfully in Replicate
-                # This is likely a validation error in our code
-                from utils.image_queue import add_to_generated_cache
-                
-                # Check logs for generated URL to try to recover it
-                try:
-                    import re
-                    import os
-                    from flask import current_app
-                    
-                    # Try several possible log file locations
-                    log_paths = [
-                        # Try app log path from config if available
-                        current_app.config.get('LOG_FILE_PATH'),
-                        # Try common deployment locations
-                        "/app/backend/logs/app.log",
-                        "/app/logs/app.log",
-                        # Try with date if available
-                        f"/app/backend/logs/app_{datetime.now().strftime('%Y%m%d')}.log",
-                        # Try development path as last resort
-                        "/home/aleks/dev/cnauto-site/backend/logs/app.log",
-                        f"/home/aleks/dev/cnauto-site/backend/logs/app_{datetime.now().strftime('%Y%m%d')}.log",
-                    ]
-                    
-                    # Filter out None values
-                    log_paths = [path for path in log_paths if path]
-                    
-                    log_content = ""
-                    for log_path in log_paths:
-                        if os.path.exists(log_path):
-                            logger.info(f"📁 Found log file at: {log_path}")
-                            with open(log_path, "r") as f:
-                                log_content = f.read()
-                                break
-                    
-                    if not log_content:
-                        logger.warning("⚠️ Could not find any log files to extract URLs from")
-                    else:
-                        match = re.search(f"Downloading generated image from: (https?://.*?)\\n", log_content)
-                        if match:
-                            generator_output_url = match.group(1)
-                            logger.info(f"🔍 Extracted generated image URL from logs: {generator_output_url}")
-                            # Save for later retry
-                            add_to_generated_cache(f"admin-car-{car.id}-img-{id}", generator_output_url)
-                            logger.info(f"💾 Cached generated URL for later retry: {generator_output_url}")
-                            
-                            # Update task status
-                            image_task.status = 'waiting_upload'
-                            image_task.error = 'Upload failed but generation succeeded'
-                            image_task.notes = generator_output_url
-                            db.session.commit()
-                            
-                            flash("Изображение было сгенерировано, но произошла ошибка при загрузке. Мы сохранили ссылку для повторной попытки.", "warning")
-                            return redirect(url_for('car.edit_view', id=car.id))
-                except Exception as log_error:
-                    logger.error(f"❌ Failed to extract URL from logs: {str(log_error)}")
-                
+                # The generator records its output before uploading it: if Replicate succeeded
+                # and only the upload failed, hand the task to the image queue to upload it.
+                # Its source (GALLERY_AI_SOURCE) makes the queue add the result like this action does
+                generator_output_url = latest_generation_output(db.session, task_id)
+                if generator_output_url:
+                    logger.info(f"🔍 Generation succeeded but upload failed, output: {generator_output_url}")
+                    image_task.status = 'waiting_upload'
+                    image_task.error = 'Upload failed but generation succeeded'
+                    image_task.generator = generator_path(generate_with_photon)
+                    image_task.params = generator_params
+                    db.session.commit()
+
+                    flash("Изображение было сгенерировано, но произошла ошибка при загрузке. Мы сохранили ссылку для повторной попытки.", "warning")
+                    return redirect(url_for('car.edit_view', id=car.id))
+
                 logger.warning(f"⚠️ AI generation returned None but no exception was raised. Car ID={car.id}, Image ID={id}")
                 image_task.status = 'failed'
                 image_task.error = 'Generation returned None'
@@ -11,11 +11,13 @@ from flask import Flask, render_template, request, jsonify, redirect, url_for, f
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from sqlalchemy.engine import make_url
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from functools import wraps
 import os
 import logging
+import threading
 from logging.handlers import RotatingFileHandler
 import time
 from datetime import datetime, timedelta
@@ -27,6 +29,7 @@ import os
 from flask_cors import CORS
 from .admin import init_admin
 from .app_decorators import admin_required
+from .commands import renormalize_cars
 from .config_dev import DevConfig
 from .config_prod import ProdConfig
 from .db import db
@@ -35,7 +38,7 @@ from .models import Car, Category, Brand, Country, CarType, User, ImageTask
 from .utils.file_logger import setup_file_logger
 from .utils.image_queue import start_image_processor
 from .utils.log_viewer import get_log_files, get_log_content
-from .utils.telegram_import import import_car as import_car_handler
+from .utils.telegram_import import import_car as import_car_handler, start_import_executor
 
 # .env
 load_dotenv()
@@ -56,7 +59,9 @@ else:
     app.config.from_object(DevConfig)
     logger.info("✅ DevConfig loaded")
 
-logger.info(f"📦 DB URI: {app.config.get('SQLALCHEMY_DATABASE_URI')}")
+# Never log the database password
+database_uri = app.config.get('SQLALCHEMY_DATABASE_URI')
+logger.info(f"📦 DB URI: {make_url(database_uri).render_as_string(hide_password=True) if database_uri else None}")
 
 # Add Python built-ins to Jinja environment
 app.jinja_env.globals['min'] = min
@@ -65,6 +70,7 @@ app.jinja_env.globals['max'] = max
 # Initialize database and migrations
 db.init_app(app)
 migrate = Migrate(app, db, directory=os.path.join(os.path.dirname(__file__), 'migrations'))
+app.cli.add_command(renormalize_cars)
 
 # Add CORS support
 CORS(app)  # Allow cross-origin requests, can be configured further if needed
@@ -192,9 +198,67 @@ admin_app = init_admin(app)
 with app.app_context():
     setup_deletion_events()
 
-    # Start the image processor worker for handling AI image generation
-    image_processor_thread = start_image_processor(app)
-    logger.info("✅ Image processor started for asynchronous AI image generation")
+_background_workers_started = False
+_background_workers_lock = threading.Lock()
+# Timer of the next start attempt after a failed one
+_background_workers_retry = None
+BACKGROUND_WORKERS_RETRY_DELAY = float(os.getenv("BACKGROUND_WORKERS_RETRY_DELAY", "30"))
+
+
+def start_background_workers():
+    """
+    Start the image worker pool and the car import pool once per process.
+
+    Only processes that serve the app start them, when they start: the
+    `python -m backend.app` / `python -m backend` entry points and gunicorn's
+    post_worker_init hook (gunicorn.conf.py). `flask` CLI commands import this
+    module too, and must neither claim image_tasks/import_jobs rows nor fork
+    (renormalize-cars) while these threads are running.
+
+    If the start fails (e.g. the database is not reachable yet), it is tried
+    again every BACKGROUND_WORKERS_RETRY_DELAY seconds until it succeeds.
+
+    Returns:
+        bool: Whether the workers are running
+    """
+    global _background_workers_started, _background_workers_retry
+    with _background_workers_lock:
+        if _background_workers_started:
+            return True
+        if _background_workers_retry is not None:
+            # A retry is already scheduled
+            return False
+        try:
+            with app.app_context():
+                # Start the image worker pool for handling AI image generation
+                start_image_processor(app)
+                logger.info("✅ Image processor started for asynchronous AI image generation")
+
+                # Start the bounded car import pool (re-queues imports spooled at the last shutdown)
+                start_import_executor(app)
+        except Exception as e:
+            logger.error(f"❌ Could not start background workers, retrying in "
+                         f"{BACKGROUND_WORKERS_RETRY_DELAY:.0f}s: {e}")
+            _background_workers_retry = threading.Timer(BACKGROUND_WORKERS_RETRY_DELAY, _retry_background_workers)
+            _background_workers_retry.daemon = True
+            _background_workers_retry.start()
+            return False
+        _background_workers_started = True
+        return True
+
+
+def _retry_background_workers():
+    global _background_workers_retry
+    with _background_workers_lock:
+        _background_workers_retry = None
+    start_background_workers()
+
+
+@app.before_request
+def ensure_background_workers():
+    # `flask run` has no start hook; its server process starts them on the first request
+    if not _background_workers_started:
+        start_background_workers()
 
 # Add a verification point to ensure logs are being captured
 log_capture_test_interval = 60  # seconds
@@ -723,12 +787,7 @@ def get_image_task(task_id):
     try:
         task = ImageTask.query.filter_by(task_id=task_id).first()
         if not task:
-            # Check in-memory status as fallback
-            from .utils.image_queue import get_task_status
-            mem_task = get_task_status(task_id)
-            if mem_task.get('status') == 'unknown':
-                return jsonify({'error': 'Task not found'}), 404
-            return jsonify(mem_task)
+            return jsonify({'error': 'Task not found'}), 404
             
         return jsonify(task.to_dict())
         
@@ -961,6 +1020,65 @@ def admin_stats_misc():
     return jsonify(stats)
 
 
+@app.route('/admin/stats/parser')
+@admin_required
+@login_required
+def admin_stats_parser():
+    """Return car parser stage timings, reference-cache and external API cache statistics."""
+    from .utils.api_cache import get_api_cache
+    from .utils.carapi_client import get_carapi_stats
+    from .utils.parse_memo import get_parse_memo
+    from .utils.parse_trace import get_parse_trace_stats
+    from .utils.reference_snapshot import get_snapshot_stats
+    stats = {
+        'parse_trace': get_parse_trace_stats(),
+        'parse_memo': get_parse_memo().stats(),
+        'reference_snapshot': get_snapshot_stats(),
+        'api_cache': get_api_cache().stats(),
+        'carapi': get_carapi_stats(),
+    }
+    return jsonify(stats)
+
+
+@app.route('/admin/stats/imports')
+@admin_required
+@login_required
+def admin_stats_imports():
+    """Return car import queue depth, in-flight jobs and per-stage latency."""
+    from .utils.telegram_import import get_import_executor
+    executor = get_import_executor()
+    return jsonify(executor.stats() if executor else {})
+
+
+@app.route('/admin/stats/images')
+@admin_required
+@login_required
+def admin_stats_images():
+    """Return image task queue depth, worker health and utilization, and generation cache hit rate."""
+    from .utils.generation_cache import get_generation_cache_stats
+    from .utils.image_queue import get_image_processor
+    pool = get_image_processor()
+    stats = pool.stats() if pool else {}
+    stats['generation_cache'] = get_generation_cache_stats(db.session)
+    return jsonify(stats)
+
+
+@app.route('/admin/image-workers', methods=['POST'])
+@admin_required
+@login_required
+def admin_resize_image_workers():
+    """Resize the image worker pool of this process: JSON body {"workers": N}."""
+    from .utils.image_queue import get_image_processor
+    pool = get_image_processor()
+    if pool is None:
+        return jsonify({'error': 'Image processor is not running'}), 503
+    workers = (request.get_json(silent=True) or {}).get('workers')
+    if not isinstance(workers, int) or not 0 <= workers <= 32:
+        return jsonify({'error': 'workers must be an integer between 0 and 32'}), 400
+    pool.resize(workers)
+    return jsonify(pool.stats())
+
+
 app.register_blueprint(api, url_prefix='/api')
 
 # Register filters
@@ -971,4 +1089,8 @@ if __name__ == '__main__':
     with app.app_context():
         logger.info("🔗 login url: %s", url_for('admin_login'))
 
+    # Not in the reloader's parent process, which only watches files
+    if not app.debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_workers()
+
     app.run(host="0.0.0.0", port=int(os.environ.get("PORT", 5000)))
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Benchmark the car parsing pipeline against a seeded in-memory database.
+
+Seeds an in-memory SQLite database from the seed data (seeds/brands.csv,
+the brand synonyms, seeds/brand_models.py, seeds/brand_trims.py and
+seeds/brand_modifications.py), generates a corpus of Russian/English listing
+strings and times parse_car_info, normalize_car and extract_engine_info
+separately. Reports p50/p95/p99 latency and listings/sec per stage.
+
+Every stage is timed --repeats times and the best value of each metric is
+kept, which filters out runs slowed down by other load on the machine.
+
+With --baseline the run fails (exit code 1) when a stage is slower than the
+stored baseline by more than --threshold and by more than --min-delta-ms per
+listing (a 25% change of a 30 µs p50 is within run-to-run noise);
+--save-baseline stores the run. Re-save the baseline in the change that
+knowingly makes a stage slower.
+
+Usage:
+    cd backend
+    python benchmarks/parser_pipeline.py [--listings 3000] [--seed 7]
+    python benchmarks/parser_pipeline.py --save-baseline benchmarks/baselines/parser_pipeline.json
+    python benchmarks/parser_pipeline.py --baseline benchmarks/baselines/parser_pipeline.json --threshold 0.25
+        [--min-delta-ms 0.01] [--repeats 5]
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# seeds/brand_models.py creates an engine at import time
+os.environ.setdefault('DATABASE_URL', 'sqlite://')
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandModel, BrandModification, BrandSynonym, BrandTrim, Country
+
+STAGES = ('parse_car_info', 'normalize_car', 'extract_engine_info')
+# Compared against the baseline; higher is worse except for listings_per_sec
+GATED_METRICS = ('p50_ms', 'p95_ms', 'listings_per_sec')
+# Smaller differences per listing are never reported as regressions
+MIN_DELTA_MS = 0.01
+REPEATS = 5
+
+PREFIXES = ["Продаю", "Срочно!", "New", "В наличии:", "Под заказ из Китая"]
+YEARS = [f"{year} г." for year in range(2018, 2026)] + [str(year) for year in range(2018, 2026)]
+ENGINES = ["2.0T", "1.5T DCT", "2.5L", "77.4 kWh", "2.0TSI", "1.6 TGDI", "3.0 дизель", "1.5 гибрид", "EV", "PHEV"]
+POWER = ["150 hp", "249 л.с.", "190 лс", "300 кВт", "408 HP"]
+DRIVE = ["AWD", "4WD", "RWD", "FWD", "полный привод", "передний привод", "quattro", "4MATIC"]
+GEARBOX = ["АКПП", "МКПП", "CVT", "DCT", "автомат", "8AT", "робот"]
+SUFFIXES = ["пробег 15 000 км", "без пробега", "цена 3 500 000 ₽", "растаможен", "(версия Ruiyi)", "новый"]
+MISSPELLED = ["Тойта Камри 2.5", "Hyundia Solaris 1.6", "Мерседес-бенц E200 4MATIC", "Unknownbrand X1 2.0"]
+
+
+def create_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def seed_database(session):
+    """Load countries, brands, synonyms, models, trims and modifications from the seed data"""
+    from backend.seeds.brand_models import BRAND_MODELS
+    from backend.seeds.brand_modifications import seed_brand_modifications
+    from backend.seeds.brand_trims import seed_brand_trims
+    from backend.seeds.seed_brand_synonyms import seed_brand_synonyms
+    from backend.seeds.seed_brands import CSV_FILE
+
+    with open(CSV_FILE, newline='', encoding='utf-8') as csvfile:
+        rows = list(csv.DictReader(csvfile))
+
+    countries = {}
+    for row in rows:
+        if row['country'] not in countries:
+            countries[row['country']] = Country(name=row['country'])
+            session.add(countries[row['country']])
+    for row in rows:
+        session.add(Brand(name=row['name'], slug=row['slug'], logo=row['logo'], country=countries[row['country']]))
+    session.commit()
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed_brand_synonyms()
+
+    for brand in session.query(Brand).all():
+        for model_name in BRAND_MODELS.get(brand.name, []):
+            session.add(BrandModel(name=model_name, brand_id=brand.id,
+                                   is_multi_word=len(model_name.split()) > 1, source="seed_script"))
+    session.commit()
+
+    seed_brand_trims(session)
+    seed_brand_modifications(session)
+
+
+def generate_corpus(session, count, seed=7):
+    """
+    Build synthetic listing strings from the seeded reference data.
+
+    Returns:
+        list: (text, brand, model, modification_text) tuples; brand and model are
+            the canonical names the listing was built from (None for noise)
+    """
+    rng = random.Random(seed)
+    brands = {brand.id: brand.name for brand in session.query(Brand)}
+    spellings, models, trims, modifications = {}, {}, {}, {}
+    for table, target in ((BrandSynonym, spellings), (BrandModel, models),
+                          (BrandTrim, trims), (BrandModification, modifications)):
+        for row in session.query(table):
+            target.setdefault(row.brand_id, []).append(row.name)
+
+    brand_ids = sorted(brands)
+    corpus = []
+    for index in range(count):
+        if index % 100 == 99:
+            corpus.append((rng.choice(MISSPELLED), None, None, None))
+            continue
+
+        brand_id = rng.choice(brand_ids)
+        brand = brands[brand_id]
+        spelling = rng.choice([brand, brand.upper()] + spellings.get(brand_id, []))
+        model = rng.choice(models.get(brand_id) or [f"Model {rng.randint(1, 9)}"])
+
+        tail = []
+        if rng.random() < 0.5 and modifications.get(brand_id):
+            tail.append(rng.choice(modifications[brand_id]))
+        for pool in (ENGINES, POWER, DRIVE, GEARBOX):
+            if rng.random() < 0.5:
+                tail.append(rng.choice(pool))
+        if rng.random() < 0.6 and trims.get(brand_id):
+            tail.append(rng.choice(trims[brand_id]))
+        if rng.random() < 0.3:
+            tail.append(rng.choice(SUFFIXES))
+
+        parts = [spelling, model] + tail
+        if rng.random() < 0.2:
+            parts.insert(0, rng.choice(PREFIXES))
+        if rng.random() < 0.3:
+            parts.append(rng.choice(YEARS))
+        text = ' '.join(parts)
+        if rng.random() < 0.05:
+            text = text.lower()
+        corpus.append((text, brand, model, ' '.join(tail)))
+    return corpus
+
+
+def time_calls(func, args_list):
+    """Call func once per argument tuple and return per-call latencies in ms and the total in seconds"""
+    latencies = []
+    started = time.perf_counter()
+    for args in args_list:
+        call_started = time.perf_counter()
+        func(*args)
+        latencies.append((time.perf_counter() - call_started) * 1000)
+    return latencies, time.perf_counter() - started
+
+
+def summarize(latencies, total):
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 \
+        else [latencies[0]] * 99
+    return {
+        'count': len(latencies),
+        'p50_ms': round(percentiles[49], 4),
+        'p95_ms': round(percentiles[94], 4),
+        'p99_ms': round(percentiles[98], 4),
+        'listings_per_sec': round(len(latencies) / total, 1) if total else None,
+    }
+
+
+def best_of(summaries):
+    """Combine summaries of repeated runs into the lowest latencies and highest throughput"""
+    best = dict(summaries[0])
+    for summary in summaries[1:]:
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            best[metric] = min(best[metric], summary[metric])
+        best['listings_per_sec'] = max(best['listings_per_sec'] or 0, summary['listings_per_sec'] or 0) or None
+    return best
+
+
+def run_benchmark(session, corpus, warmup=50, repeats=1):
+    """Time each pipeline stage over the corpus `repeats` times and return the best per-stage summaries"""
+    from backend.utils.car_parser import extract_engine_info, normalize_car, parse_car_info
+    from backend.utils.parse_memo import get_parse_memo
+
+    texts = [(text, session) for text, _, _, _ in corpus]
+    normalize_args = [(brand, model, modification, session)
+                      for _, brand, model, modification in corpus if brand and modification]
+    engine_args = [(text,) for text, _, _, _ in corpus]
+
+    # Build the reference snapshot and per-brand rules before timing
+    for args in texts[:warmup]:
+        parse_car_info(*args)
+
+    results = {}
+    for stage, func, args_list in (
+        ('parse_car_info', parse_car_info, texts),
+        ('normalize_car', normalize_car, normalize_args),
+        ('extract_engine_info', extract_engine_info, engine_args),
+    ):
+        summaries = []
+        for _ in range(max(repeats, 1)):
+            # Every repeat parses the corpus, not the results memoized by the previous one
+            get_parse_memo().clear()
+            summaries.append(summarize(*time_calls(func, args_list)))
+        results[stage] = best_of(summaries)
+    return results
+
+
+def compare_to_baseline(results, baseline, threshold, min_delta_ms=MIN_DELTA_MS):
+    """
+    Find stages that regressed against a baseline run.
+
+    Args:
+        results (dict): Stage summaries of this run
+        baseline (dict): Stage summaries of the baseline run
+        threshold (float): Allowed relative slowdown, e.g. 0.25 for 25%
+        min_delta_ms (float): Slowdowns of less than this many ms per listing
+            are ignored whatever their relative size
+
+    Returns:
+        list: Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for stage, current in results.items():
+        reference = baseline.get(stage)
+        if not reference:
+            continue
+        for metric in GATED_METRICS:
+            before, after = reference.get(metric), current.get(metric)
+            if not before or after is None:
+                continue
+            if metric == 'listings_per_sec':
+                change = (before - after) / before
+                delta_ms = 1000 / after - 1000 / before if after else float('inf')
+            else:
+                change = (after - before) / before
+                delta_ms = after - before
+            if change > threshold and delta_ms >= min_delta_ms:
+                regressions.append(f"{stage} {metric}: {before} -> {after} ({change:+.0%} worse)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--listings', type=int, default=3000, help='listings in the synthetic corpus')
+    parser.add_argument('--seed', type=int, default=7, help='random seed of the corpus generator')
+    parser.add_argument('--baseline', help='baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed relative regression (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=MIN_DELTA_MS,
+                        help='ignore regressions smaller than this per listing, in ms')
+    parser.add_argument('--repeats', type=int, default=REPEATS, help='timed runs per stage; the best one is kept')
+    parser.add_argument('--save-baseline', help='write this run to a baseline JSON')
+    parser.add_argument('--verbose', action='store_true', help='keep parser logging enabled')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.disable(logging.CRITICAL)
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        seed_database(db.session)
+        corpus = generate_corpus(db.session, args.listings, args.seed)
+        results = run_benchmark(db.session, corpus, repeats=args.repeats)
+
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'listings/s':>12}")
+    for stage in STAGES:
+        stats = results[stage]
+        print(f"{stage:<22}{stats['count']:>7}{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}"
+              f"{stats['p99_ms']:>10.3f}{stats['listings_per_sec']:>12.1f}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as baseline_file:
+            json.dump({'listings': args.listings, 'seed': args.seed, 'repeats': args.repeats, 'stages': results},
+                      baseline_file, indent=2)
+            baseline_file.write('\n')
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_to_baseline(results, baseline['stages'], args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"❌ Regressions over {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"✅ No stage regressed by more than {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
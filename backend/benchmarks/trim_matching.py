@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark trim matching in normalize_car: per-trim regex loop vs token trie.
+
+Builds modification texts from the seeded BMW and Toyota catalogs
+(seeds/brand_trims.py, seeds/brand_modifications.py) and times extracting and
+stripping the trim with the old two-pass regex loop and with TokenTrie.
+The "trims + modifications" catalog shows how both scale with catalog size.
+
+Usage:
+    cd backend
+    python benchmarks/trim_matching.py [--listings 5000] [--repeat 3]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.seeds.brand_modifications import BRAND_MODIFICATIONS
+from backend.seeds.brand_trims import BRAND_TRIMS
+from backend.utils.token_trie import TokenTrie, remove_spans
+
+BRANDS = ["BMW", "Toyota"]
+FILLER = ["2.0", "AT", "4WD", "(версия Ruiyi)", "2024", "new", "Hybrid", "-", "249 л.с."]
+
+
+def regex_trim(sorted_trims, mod_text):
+    """The previous normalize_car trim passes"""
+    for multi_word in (True, False):
+        for trim in sorted_trims:
+            if (' ' in trim) != multi_word or (not multi_word and len(trim) <= 1):
+                continue
+            if re.search(r'\b' + re.escape(trim) + r'\b', mod_text, re.IGNORECASE):
+                return trim, re.sub(r'\b' + re.escape(trim) + r'\b', '', mod_text, flags=re.IGNORECASE).strip()
+    return None, mod_text
+
+
+def trie_trim(multi_word_trims, single_word_trims, mod_text):
+    """The token-trie normalize_car trim pass"""
+    match = multi_word_trims.find_best(mod_text) or single_word_trims.find_best(mod_text)
+    if not match:
+        return None, mod_text
+    return match[0], remove_spans(mod_text, match[1]).strip()
+
+
+def make_texts(vocabulary, count, rng):
+    texts = []
+    for _ in range(count):
+        words = rng.sample(vocabulary, k=min(len(vocabulary), rng.randint(2, 6)))
+        rng.shuffle(words)
+        texts.append(' '.join(words))
+    return texts
+
+
+def best_time(func, texts, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            func(text)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--listings', type=int, default=5000, help='modification texts per catalog')
+    parser.add_argument('--repeat', type=int, default=3, help='timing repetitions (best is reported)')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'catalog':<32}{'names':>7}{'regex µs':>11}{'trie µs':>10}{'speedup':>9}")
+
+    for brand in BRANDS:
+        trims = BRAND_TRIMS.get(brand, [])
+        modifications = BRAND_MODIFICATIONS.get(brand, [])
+        catalogs = [
+            (f"{brand} trims", trims + ["Standard"]),
+            (f"{brand} trims + modifications", trims + modifications + ["Standard"]),
+        ]
+        for label, names in catalogs:
+            texts = make_texts(names + FILLER + modifications, args.listings, rng)
+
+            sorted_names = sorted(names, key=len, reverse=True)
+            multi_word = TokenTrie([n for n in names if ' ' in n])
+            single_word = TokenTrie([n for n in names if ' ' not in n and len(n) > 1])
+
+            for text in texts:
+                assert regex_trim(sorted_names, text) == trie_trim(multi_word, single_word, text), text
+
+            regex_time = best_time(lambda text: regex_trim(sorted_names, text), texts, args.repeat)
+            trie_time = best_time(lambda text: trie_trim(multi_word, single_word, text), texts, args.repeat)
+            print(f"{label:<32}{len(names):>7}{regex_time / len(texts) * 1e6:>11.1f}"
+                  f"{trie_time / len(texts) * 1e6:>10.1f}{regex_time / trie_time:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,24 @@
-from backend.models import db, Category
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import create_engine, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from backend.models import db, Category, Car, Brand
+from backend.utils.car_parser import extract_engine_info, normalize_car
+from backend.utils.modification_index import rebuild_modification_index
+
+DEFAULT_CHECKPOINT = 'renormalize_cars.checkpoint.json'
+
+# Session of a renormalize-cars worker process, opened by _init_worker()
+_worker_session = None
 
 
 def init_categories():
@@ -15,3 +35,170 @@ def init_categories():
             db.session.add(new_cat)
 
     db.session.commit()
+
+
+def _engine_summary(text):
+    """Short engine description ("2.0T 249 hp gasoline") extracted from listing text, or None"""
+    info = extract_engine_info(text)
+    parts = [info['displacement'], f"{info['power_hp']} hp" if info['power_hp'] else None, info['type']]
+    return ' '.join(part for part in parts if part) or None
+
+
+def renormalize_rows(rows, db_session):
+    """
+    Re-derive the normalized fields of car rows from the current reference data.
+
+    Args:
+        rows (list): (id, brand name, model, modification, trim, engine) tuples
+        db_session: SQLAlchemy session to load the reference snapshot with
+
+    Returns:
+        list: (car id, {field: (old value, new value)}) for cars with changed fields
+    """
+    changes = []
+    for car_id, brand, model, modification, trim, engine in rows:
+        # "Standard" is the placeholder for "no trim found", not listing text
+        text = ' '.join(part for part in (modification, trim if trim != 'Standard' else None)
+                        if part and part.strip())
+        if not brand or not text:
+            continue
+
+        normalized = normalize_car(brand, model or '', text, db_session)
+        current = {'modification': modification, 'trim': trim, 'engine': engine}
+        derived = {'modification': normalized['modification'], 'trim': normalized['trim']}
+        if not (engine and engine.strip()):
+            derived['engine'] = _engine_summary(text)
+
+        fields = {}
+        for field, value in derived.items():
+            length = Car.__table__.c[field].type.length
+            if value is not None and length:
+                value = value[:length]
+            if value is not None and value != current[field]:
+                fields[field] = (current[field], value)
+        if fields:
+            changes.append((car_id, fields))
+    return changes
+
+
+def _init_worker(database_uri):
+    global _worker_session
+    _worker_session = sessionmaker(bind=create_engine(database_uri))()
+
+
+def _renormalize_chunk(rows):
+    try:
+        return renormalize_rows(rows, _worker_session)
+    finally:
+        # Release the connection between chunks; the reference snapshot stays cached
+        _worker_session.rollback()
+
+
+def _car_chunks(db_session, after_id, chunk_size):
+    """Yield lists of car rows in primary-key order, `chunk_size` rows per keyset-paginated query"""
+    while True:
+        statement = (
+            select(Car.id, Brand.name, Car.model, Car.modification, Car.trim, Car.engine)
+            .outerjoin(Brand, Car.brand_id == Brand.id)
+            .where(Car.id > after_id)
+            .order_by(Car.id)
+            .limit(chunk_size)
+            .execution_options(stream_results=True, yield_per=chunk_size)
+        )
+        rows = [tuple(row) for row in db_session.execute(statement)]
+        # End the read transaction so no snapshot is held between chunks
+        db_session.rollback()
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return {'last_id': 0, 'processed': 0, 'changed': 0}
+    with open(path, encoding='utf-8') as checkpoint_file:
+        return json.load(checkpoint_file)
+
+
+def _save_checkpoint(path, checkpoint):
+    # Write-then-rename so an interrupted run never leaves a truncated checkpoint
+    temporary_path = f"{path}.tmp"
+    with open(temporary_path, 'w', encoding='utf-8') as checkpoint_file:
+        json.dump(checkpoint, checkpoint_file)
+    os.replace(temporary_path, path)
+
+
+@click.command('renormalize-cars')
+@click.option('--chunk-size', default=1000, show_default=True, help='Cars read, parsed and updated per batch.')
+@click.option('--workers', type=int, default=None, help='Parser processes (default: all cores; 1 parses in-process).')
+@click.option('--dry-run', is_flag=True, help='Print the changes instead of writing them.')
+@click.option('--checkpoint', default=DEFAULT_CHECKPOINT, show_default=True,
+              help='File recording the last updated car id.')
+@click.option('--resume', is_flag=True, help='Continue after the car id stored in the checkpoint.')
+@with_appcontext
+def renormalize_cars(chunk_size, workers, dry_run, checkpoint, resume):
+    """Re-derive modification, trim and blank engine of every car from the current seeds."""
+    workers = workers or os.cpu_count() or 1
+    state = _load_checkpoint(checkpoint) if resume else {'last_id': 0, 'processed': 0, 'changed': 0}
+    total = db.session.scalar(select(func.count(Car.id)).where(Car.id > state['last_id']))
+    click.echo(f"🔄 Re-normalizing {total} cars after id {state['last_id']} with {workers} worker(s)"
+               f"{' (dry run)' if dry_run else ''}")
+
+    started = time.perf_counter()
+    processed = 0
+
+    def apply(rows, changes):
+        nonlocal processed
+        if dry_run:
+            for car_id, fields in changes:
+                for field, (old, new) in fields.items():
+                    click.echo(f"  #{car_id} {field}: {old!r} -> {new!r}")
+        elif changes:
+            db.session.execute(update(Car), [
+                {'id': car_id, **{field: new for field, (old, new) in fields.items()}}
+                for car_id, fields in changes
+            ])
+            db.session.commit()
+
+        processed += len(rows)
+        state['last_id'] = rows[-1][0]
+        state['processed'] += len(rows)
+        state['changed'] += len(changes)
+        if not dry_run:
+            _save_checkpoint(checkpoint, state)
+        elapsed = time.perf_counter() - started
+        click.echo(f"  {processed}/{total} cars, {state['changed']} changed, "
+                   f"{processed / elapsed if elapsed else 0:.0f} cars/s, last id {state['last_id']}")
+
+    chunks = _car_chunks(db.session, state['last_id'], chunk_size)
+    if workers == 1:
+        for rows in chunks:
+            apply(rows, renormalize_rows(rows, db.session))
+    else:
+        database_uri = current_app.config['SQLALCHEMY_DATABASE_URI']
+        # Spawned, not forked: a fork would copy locks held by this process's
+        # threads (logging, database pools) into the workers
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(database_uri,)) as executor:
+            # Keep every worker busy while applying results in id order, so the
+            # checkpoint never skips a chunk that is still being parsed
+            in_flight = deque()
+            for rows in chunks:
+                in_flight.append((rows, executor.submit(_renormalize_chunk, rows)))
+                if len(in_flight) >= workers * 2:
+                    done_rows, future = in_flight.popleft()
+                    apply(done_rows, future.result())
+            while in_flight:
+                done_rows, future = in_flight.popleft()
+                apply(done_rows, future.result())
+
+    if not dry_run:
+        # The bulk updates bypass the Car hooks that keep the modification index current
+        if state['changed']:
+            rebuild_modification_index(db.session)
+            db.session.commit()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+    elapsed = time.perf_counter() - started
+    click.echo(f"✅ {state['processed']} cars processed, {state['changed']} changed in {elapsed:.1f}s")
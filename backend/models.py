@@ -376,6 +376,24 @@ class BrandModification(db.Model):
         return f"{self.name}"
 
 
+class ModificationUsage(db.Model):
+    """Distinct modification of a brand's cars with the number of cars using it, kept up to date on car writes"""
+    __tablename__ = 'modification_usage'
+    id = db.Column(db.Integer, primary_key=True)
+    brand_id = db.Column(db.Integer, db.ForeignKey('brands.id'), nullable=False)
+    # Lowercased, whitespace-collapsed modification
+    normalized = db.Column(db.String(100), nullable=False)
+    # Spelling of the most recently saved car
+    name = db.Column(db.String(100), nullable=False)
+    usage_count = db.Column(db.Integer, nullable=False, default=0)
+    __table_args__ = (
+        db.UniqueConstraint('brand_id', 'normalized', name='unique_modification_usage_per_brand'),
+    )
+
+    def __str__(self):
+        return f"{self.name}"
+
+
 class BrandModel(db.Model):
     __tablename__ = 'brand_models'
     id = db.Column(db.Integer, primary_key=True)
@@ -500,6 +518,17 @@ class ImageTask(db.Model):
     # Generation details
     prompt = db.Column(db.Text, nullable=True)
     error = db.Column(db.Text, nullable=True)
+
+    # Queued generation: "module:function" of the generator and its keyword arguments
+    generator = db.Column(db.String(200), nullable=True)
+    params = db.Column(db.JSON, nullable=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    max_retries = db.Column(db.Integer, default=3, nullable=False)
+    next_attempt_at = db.Column(db.DateTime, nullable=True)  # Backoff of a failed task; claimable after it
+
+    # Lease of the worker running the task; refreshed while it runs
+    locked_by = db.Column(db.String(128), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -508,6 +537,7 @@ class ImageTask(db.Model):
     __table_args__ = (
         db.Index('idx_image_tasks_car_status', 'car_id', 'status'),
         db.Index('idx_image_tasks_created', 'created_at'),
+        db.Index('idx_image_tasks_status_id', 'status', 'id'),
     )
 
     def __str__(self):
@@ -527,6 +557,88 @@ class ImageTask(db.Model):
             'error': self.error,
             'source_url': self.source_url,
             'result_url': self.result_url,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
+
+
+class GenerationCache(db.Model):
+    """Result of an AI image generation, keyed by its inputs, so identical generations are not paid for twice"""
+    __tablename__ = 'generation_cache'
+
+    id = db.Column(db.Integer, primary_key=True)
+    cache_key = db.Column(db.String(64), unique=True, nullable=False)  # sha256 of generator, source, prompt, params
+    generator = db.Column(db.String(200), nullable=False)
+    mode = db.Column(db.String(32), nullable=True)
+    source_hash = db.Column(db.String(64), nullable=False)  # sha256 of the source image content
+    prompt_hash = db.Column(db.String(64), nullable=True)
+    result_url = db.Column(db.String(512), nullable=False)
+    hits = db.Column(db.Integer, default=0, nullable=False)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # LRU eviction order
+
+    def __str__(self):
+        return f"GenerationCache #{self.id} ({self.mode or self.generator})"
+
+
+class GenerationOutput(db.Model):
+    """Output URL of an AI generator, recorded as soon as the generator returns it"""
+    __tablename__ = 'generation_outputs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    task_id = db.Column(db.String(64), nullable=True)  # ImageTask.task_id the generation ran for
+    car_id = db.Column(db.Integer, db.ForeignKey('cars.id', ondelete='SET NULL'), nullable=True)
+    generator = db.Column(db.String(32), nullable=True)  # photon, comfy
+    output_url = db.Column(db.String(1024), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('idx_generation_outputs_task_id', 'task_id', 'id'),
+    )
+
+    def __str__(self):
+        return f"GenerationOutput #{self.id} ({self.task_id})"
+
+
+class ImportJob(db.Model):
+    """Telegram car import waiting for or going through the import stages, shared by all app replicas"""
+    __tablename__ = 'import_jobs'
+
+    # Stages in the order they run; `stage` holds the last one completed
+    STAGES = ('parsed', 'main_image_uploaded', 'gallery_uploaded', 'ai_task_queued', 'notified')
+
+    id = db.Column(db.Integer, primary_key=True)
+    chat_id = db.Column(db.String(64), nullable=True)
+    payload = db.Column(db.JSON, nullable=False)  # Request body of /api/import_car
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True)  # pending, running, done, failed
+    stage = db.Column(db.String(32), nullable=True)
+    state = db.Column(db.JSON, nullable=True)  # Results of the completed stages (parsed data, image URLs, ...)
+    car_id = db.Column(db.Integer, db.ForeignKey('cars.id', ondelete='SET NULL'), nullable=True)
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+
+    # Lease of the worker running the job; refreshed while it runs
+    locked_by = db.Column(db.String(128), nullable=True)
+    locked_at = db.Column(db.DateTime, nullable=True)
+
+    # Timestamps
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_import_jobs_status_id', 'status', 'id'),
+    )
+
+    def __str__(self):
+        return f"ImportJob #{self.id} ({self.stage or 'new'}) - {self.status}"
+
+    def has_completed(self, stage):
+        """Whether a stage (one of STAGES) was checkpointed by this or an earlier attempt"""
+        if self.stage is None:
+            return False
+        return self.STAGES.index(self.stage) >= self.STAGES.index(stage)
@@ -0,0 +1,183 @@
+"""
+Test the two-tier API cache and its use by the CarQuery/CarAPI trim checks
+"""
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from backend.utils import car_parser
+from backend.utils.api_cache import MemoryCache, SQLiteCache, TieredCache, MISS, set_api_cache
+
+
+class StubTrimAPIHandler(BaseHTTPRequestHandler):
+    """Serves CarQuery and CarAPI lookalike endpoints and counts requests"""
+
+    TRIMS = {
+        ("bmw", "x5"): ["M Sport", "xLine"],
+        ("toyota", "camry"): [],
+    }
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.server.requests.append(self.path)
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        trims = self.TRIMS.get((query.get("make"), query.get("model")))
+        if trims is None:
+            self._send(404, {"error": "not found"})
+        elif url.path == "/carquery/":
+            self._send(200, {"Trims": [{"model_trim": trim} for trim in trims]})
+        elif url.path == "/carapi/v1/trims":
+            if self.headers.get("Authorization") != "Bearer stub-token":
+                self._send(401, {"error": "unauthorized"})
+            else:
+                self._send(200, {"data": [{"trim": trim} for trim in trims]})
+        else:
+            self._send(404, {})
+
+    def do_POST(self):
+        self.server.requests.append(self.path)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self._send(200, {"access_token": "stub-token"})
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTieredCache(unittest.TestCase):
+    """Memory LRU/TTL tier in front of a shared SQLite tier"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "api_cache.sqlite")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_cache(self, memory_entries=10, disk_entries=100):
+        return TieredCache(
+            memory=MemoryCache(memory_entries, clock=self.clock),
+            disk=SQLiteCache(self.path, disk_entries, clock=self.clock),
+            ttl=100,
+            negative_ttl=10,
+        )
+
+    def test_disk_tier_survives_restart(self):
+        self.make_cache().set("carquery", "bmw_x5", [{"model_trim": "M Sport"}])
+
+        restarted = self.make_cache()
+        self.assertEqual(restarted.get("carquery", "bmw_x5"), [{"model_trim": "M Sport"}])
+        self.assertEqual(restarted.get("carquery", "bmw_x5"), [{"model_trim": "M Sport"}])
+        stats = restarted.stats()
+        self.assertEqual((stats["disk_hits"], stats["memory_hits"], stats["misses"]), (1, 1, 0))
+        self.assertEqual(stats["hit_ratio"], 1.0)
+
+    def test_ttl_and_negative_ttl(self):
+        cache = self.make_cache()
+        cache.set("carapi", "found", [{"trim": "GT"}])
+        cache.set("carapi", "missing", [], negative=True)
+
+        self.clock.now += 11
+        self.assertEqual(cache.get("carapi", "found"), [{"trim": "GT"}])
+        self.assertIs(cache.get("carapi", "missing"), MISS)
+
+        self.clock.now += 100
+        self.assertIs(cache.get("carapi", "found"), MISS)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    def test_promoted_entry_keeps_its_expiry(self):
+        self.make_cache().set("carquery", "bmw_x5", [{"model_trim": "M Sport"}])
+
+        self.clock.now += 90
+        restarted = self.make_cache()
+        self.assertEqual(restarted.get("carquery", "bmw_x5"), [{"model_trim": "M Sport"}])
+        self.clock.now += 11
+        self.assertIs(restarted.get("carquery", "bmw_x5"), MISS)
+
+    def test_size_limits(self):
+        cache = self.make_cache(memory_entries=2, disk_entries=3)
+        for index in range(5):
+            self.clock.now += 1
+            cache.set("carquery", str(index), index)
+
+        self.assertEqual(len(cache.memory), 2)
+        self.assertEqual(len(cache.disk), 3)
+        self.assertIs(cache.get("carquery", "0"), MISS)
+        self.assertEqual(cache.get("carquery", "2"), 2)
+
+
+class TestTrimLookupCaching(unittest.TestCase):
+    """check_trim_* hit the API once per make/model, including for negative results"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubTrimAPIHandler)
+        cls.server.requests = []
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        base_url = f"http://127.0.0.1:{cls.server.server_address[1]}"
+        cls.original_urls = (car_parser.CARQUERY_API_URL, car_parser.CARAPI_BASE_URL)
+        car_parser.CARQUERY_API_URL = f"{base_url}/carquery/"
+        car_parser.CARAPI_BASE_URL = f"{base_url}/carapi"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        car_parser.CARQUERY_API_URL, car_parser.CARAPI_BASE_URL = cls.original_urls
+        set_api_cache(None)
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.cache = TieredCache(memory=MemoryCache(100))
+        set_api_cache(self.cache)
+        os.environ["CARAPI_API_KEY"] = "key"
+        os.environ["CARAPI_API_SECRET"] = "secret"
+
+    def tearDown(self):
+        os.environ.pop("CARAPI_API_KEY", None)
+        os.environ.pop("CARAPI_API_SECRET", None)
+
+    def test_carquery_results_are_cached(self):
+        self.assertTrue(car_parser.check_trim_carquery("BMW", "X5", "m sport"))
+        self.assertFalse(car_parser.check_trim_carquery("BMW", "X5", "Competition"))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_not_found_and_empty_results_are_negative_cached(self):
+        self.assertFalse(car_parser.check_trim_carquery("Lada", "Niva", "Base"))
+        self.assertFalse(car_parser.check_trim_carquery("Lada", "Niva", "Base"))
+        self.assertFalse(car_parser.check_trim_carquery("Toyota", "Camry", "LE"))
+        self.assertFalse(car_parser.check_trim_carquery("Toyota", "Camry", "LE"))
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(self.cache.stats()["negative_hits"], 2)
+
+    def test_carapi_results_are_cached(self):
+        self.assertTrue(car_parser.check_trim_carapi("BMW", "X5", "xLine"))
+        self.assertTrue(car_parser.check_trim_carapi("BMW", "X5", "M Sport"))
+        # One login and one trims request
+        self.assertEqual(len(self.server.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Test the compiled brand matcher against the per-brand regex loop it replaces
+"""
+import re
+import unittest
+
+from backend.utils.brand_matcher import LongestMatchPattern
+
+
+def naive_search(names, text):
+    """The original parse_car_info brand loop"""
+    for name in sorted(names, key=len, reverse=True):
+        match = re.search(r'\b' + re.escape(name) + r'\b', text, re.IGNORECASE)
+        if match:
+            return name, match.start(), match.end()
+    return None
+
+
+class TestLongestMatchPattern(unittest.TestCase):
+    """Compiled matcher must return exactly what the regex loop returned"""
+
+    NAMES = [
+        "BMW", "bmw", "бмв", "Land Rover", "Rover", "Mercedes-Benz", "Mercedes", "Great Wall", "GAC",
+        "Li Auto", "Kia", "Lynk & Co", "MG", "Mini",
+    ]
+
+    def test_matches_naive_loop(self):
+        texts = [
+            "BMW X5 xDrive30d M Sport",
+            "Land Rover Range Rover Sport P400e HSE Dynamic",
+            "Продаю бмв X3 2.0T",
+            "Mercedes-Benz E-Class E 300 2.0T Avantgarde",
+            "Rover 75 and Land Rover Defender",
+            "kia kia Sportage",
+            "Lynk & Co 01 1.5T",
+            "Minivan MG5",
+            "MGB Roadster",
+            "Unknown X1 2.0",
+            "",
+        ]
+        matcher = LongestMatchPattern(self.NAMES)
+        for text in texts:
+            self.assertEqual(matcher.search(text), naive_search(self.NAMES, text), f"Mismatch for: {text!r}")
+
+    def test_longest_name_wins_over_earlier_shorter_name(self):
+        matcher = LongestMatchPattern(["Rover", "Land Rover"])
+        self.assertEqual(matcher.search("Rover 75, Land Rover"), ("Land Rover", 10, 20))
+
+    def test_first_letter_case_variants(self):
+        names = ["kia", "Kia Motors", "KGM", "\u212aia", "Бмв", "бмв x"]
+        matcher = LongestMatchPattern(names)
+        for text in ["KIA MOTORS K5", "kgm torres", "\u212aIA K5", "бмв Х5", "БМВ X 5", "Kia kgm Kia Motors"]:
+            self.assertEqual(matcher.search(text), naive_search(names, text), f"Mismatch for: {text!r}")
+
+    def test_empty_matcher(self):
+        self.assertIsNone(LongestMatchPattern([]).search("BMW X5"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Test bulk insert-if-missing of newly discovered reference rows
+"""
+import threading
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandTrim, BrandModel, BrandModification, Country
+from backend.utils import car_parser
+from backend.utils import bulk_upsert
+from backend.utils.bulk_upsert import insert_ignore
+
+
+class TestInsertIgnore(unittest.TestCase):
+    """One statement per table, existing and duplicate rows skipped"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        db.session.add(Country(name="Germany"))
+        db.session.add(Brand(name="BMW", slug="bmw"))
+        db.session.commit()
+        self.bmw_id = Brand.query.filter_by(name="BMW").one().id
+
+    def tearDown(self):
+        car_parser.staged_trims().clear()
+        car_parser.staged_modifications().clear()
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_skips_existing_and_duplicate_rows(self):
+        rows = [
+            {"name": "Sport", "brand_id": self.bmw_id},
+            {"name": "Sport", "brand_id": self.bmw_id},
+            {"name": "Luxury", "brand_id": self.bmw_id},
+        ]
+        self.assertEqual(insert_ignore(db.session, BrandTrim, rows, [('brand_id', 'name')]),
+                         [(self.bmw_id, "Sport"), (self.bmw_id, "Luxury")])
+        self.assertEqual(insert_ignore(db.session, BrandTrim, rows, [('brand_id', 'name')]), [])
+        db.session.commit()
+        self.assertEqual(BrandTrim.query.count(), 2)
+
+    def test_any_unique_constraint_skips_row(self):
+        rows = [{"name": "Bmw", "slug": "bmw"}, {"name": "Audi", "slug": "audi"}]
+        self.assertEqual(insert_ignore(db.session, Brand, rows, [('name',), ('slug',)]), [("Audi",)])
+
+    def test_generic_fallback(self):
+        original = bulk_upsert._dialect_insert
+        bulk_upsert._dialect_insert = lambda dialect_name: None
+        try:
+            rows = [{"name": "Bmw", "slug": "bmw"}, {"name": "Audi", "slug": "audi"}, {"name": "Audi", "slug": "audi"}]
+            self.assertEqual(insert_ignore(db.session, Brand, rows, [('name',), ('slug',)]), [("Audi",)])
+        finally:
+            bulk_upsert._dialect_insert = original
+        self.assertEqual(Brand.query.count(), 2)
+
+    def test_save_new_trims_and_modifications(self):
+        car_parser.staged_trims().extend([
+            {"brand": "BMW", "trim": "M Sport Pro", "source": "api"},
+            {"brand": "BMW", "trim": "M Sport Pro"},
+            {"brand": "Unknown", "trim": "Base"},
+        ])
+        car_parser.staged_modifications().append({"brand": "BMW", "modification": "xDrive40d"})
+
+        self.assertEqual(car_parser.save_new_trims_to_db(db.session), ["M Sport Pro"])
+        self.assertEqual(car_parser.save_new_modifications_to_db(db.session), ["xDrive40d"])
+        self.assertEqual(car_parser.staged_trims(), [])
+        self.assertEqual(BrandTrim.query.one().source, "api")
+        self.assertEqual(BrandModification.query.one().name, "xDrive40d")
+
+    def test_staged_trims_are_per_thread(self):
+        car_parser.staged_trims().append({"brand": "BMW", "trim": "M Sport Pro"})
+        other = threading.Thread(target=lambda: car_parser.staged_trims().append({"brand": "BMW", "trim": "xLine"}))
+        other.start()
+        other.join()
+
+        self.assertEqual(car_parser.save_new_trims_to_db(db.session), ["M Sport Pro"])
+        self.assertEqual(BrandTrim.query.count(), 1)
+
+    def test_save_new_brand_and_model(self):
+        self.assertTrue(car_parser.save_new_brand_to_db("Zeekr", db.session))
+        self.assertFalse(car_parser.save_new_brand_to_db("Zeekr", db.session))
+        self.assertTrue(car_parser.save_new_model_to_db("Zeekr", "001", db.session))
+        self.assertFalse(car_parser.save_new_model_to_db("Zeekr", "001", db.session))
+        zeekr = Brand.query.filter_by(name="Zeekr").one()
+        self.assertEqual(BrandModel.query.one().brand_id, zeekr.id)
+
+    def test_discovered_brands_get_the_same_slug_and_country(self):
+        self.assertEqual(car_parser.save_discovered_brands_and_models(
+            ["Great Wall"], [("Great Wall", "Poer")], db.session), (1, 1))
+        great_wall = Brand.query.filter_by(name="Great Wall").one()
+        self.assertEqual((great_wall.slug, great_wall.country_id), ("great-wall", Country.query.one().id))
+        # Both paths build the same slug, so the brand is not added twice
+        self.assertFalse(car_parser.save_new_brand_to_db("great wall", db.session))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Test CarAPI token reuse, refresh on 401 and per-endpoint stats against a local stub server
+"""
+import base64
+import json
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.utils.carapi_client import CarAPIClient, CarAPIAuthError
+
+
+def make_jwt(exp):
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).decode().rstrip("=")
+    return f"header.{payload}.signature"
+
+
+class StubCarAPIHandler(BaseHTTPRequestHandler):
+    """Issues JWTs that expire after server.token_ttl seconds and accepts only the latest one"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.server.requests.append(("POST", self.path))
+        credentials = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if credentials.get("api_secret") != "secret":
+            self._send(401, {"error": "bad credentials"})
+            return
+        self.server.token_counter += 1
+        self.server.valid_token = make_jwt(time.time() + self.server.token_ttl) + str(self.server.token_counter)
+        self._send(200, {"access_token": self.server.valid_token})
+
+    def do_GET(self):
+        self.server.requests.append(("GET", self.path))
+        if self.headers.get("Authorization") != f"Bearer {self.server.valid_token}":
+            self._send(401, {"error": "expired"})
+        else:
+            self._send(200, {"data": [{"trim": "M Sport"}]})
+
+
+class TestCarAPIClient(unittest.TestCase):
+    """The client logs in once per token lifetime and reuses its connection"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubCarAPIHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_address[1]}/api"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.requests = []
+        self.server.valid_token = None
+        self.server.token_counter = 0
+        self.server.token_ttl = 3600
+        self.client = CarAPIClient(self.base_url, "key", "secret")
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_token_is_reused(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get_trims("bmw", "x5").status_code, 200)
+        self.assertEqual([method for method, _ in self.server.requests], ["POST", "GET", "GET", "GET"])
+
+        stats = self.client.stats()
+        self.assertEqual(stats["logins"], 1)
+        self.assertEqual(stats["endpoints"]["/v1/trims"]["requests"], 3)
+        self.assertEqual(stats["endpoints"]["/v1/trims"]["errors"], 0)
+        self.assertIsNotNone(stats["endpoints"]["/auth/login"]["avg_ms"])
+
+    def test_refresh_on_401(self):
+        self.client.get_trims("bmw", "x5")
+        # Server-side revocation: the cached token is no longer accepted
+        self.server.valid_token = "revoked"
+
+        self.assertEqual(self.client.get_trims("bmw", "x5").status_code, 200)
+        self.assertEqual(self.client.stats()["logins"], 2)
+        self.assertEqual(self.client.stats()["token_refreshes"], 1)
+
+    def test_expiring_token_is_renewed_before_use(self):
+        self.server.token_ttl = 30  # inside the refresh margin
+        self.client.get_trims("bmw", "x5")
+        self.client.get_trims("bmw", "x5")
+        self.assertEqual(self.client.stats()["logins"], 2)
+
+    def test_login_failure(self):
+        client = CarAPIClient(self.base_url, "key", "wrong")
+        with self.assertRaises(CarAPIAuthError):
+            client.get_trims("bmw", "x5")
+        client.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
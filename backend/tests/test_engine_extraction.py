@@ -9,7 +9,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import the engine extraction function directly
-from backend.utils.car_parser import extract_engine_info
+from backend.utils.car_parser import extract_engine_info, extract_engine_info_many
 # Update import path since we've moved the enum classes to models.py
 from backend.models import EngineType, DriveType, TransmissionType
 
@@ -87,6 +87,28 @@ class TestEngineExtraction(unittest.TestCase):
             self.assertEqual(engine_data["transmission"], test["transmission"],
                             f"Transmission detection failed for: {test['input']}")
 
+    def test_pattern_priority_over_position(self):
+        """Test that a higher-priority pattern wins even when it occurs later in the text"""
+        engine_data = extract_engine_info("2.5 CVT 200 HP 1.5T 150 hp DSG AWD quattro")
+        self.assertEqual(engine_data["displacement"], "1.5T")
+        self.assertEqual(engine_data["power_hp"], 200)
+        self.assertEqual(engine_data["type"], "gasoline")
+        self.assertEqual(engine_data["drive"], "all_wheel_drive")
+        self.assertEqual(engine_data["transmission"], "dsg")
+
+    def test_kwh_electric_check_is_case_sensitive(self):
+        """Test that only the exact "kWh" spelling marks a car as electric"""
+        self.assertEqual(extract_engine_info("Zeekr 001 100kWh")["type"], "electric")
+        self.assertIsNone(extract_engine_info("Zeekr 001 100KWH")["type"])
+
+    def test_batch_extraction(self):
+        """Test that batch extraction returns independent results in input order"""
+        texts = ["2.0 TSI DSG", "3.0d xDrive", "2.0 TSI DSG"]
+        results = extract_engine_info_many(texts)
+        self.assertEqual(results, [extract_engine_info(text) for text in texts])
+        results[0]["type"] = None
+        self.assertEqual(results[2]["type"], "gasoline")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,99 @@
+"""
+Test typo-tolerant brand and model detection with the trigram index
+"""
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandModel, BrandSynonym
+from backend.utils import fuzzy_index
+from backend.utils.car_parser import parse_car_info, parse_car_info_many
+from backend.utils.fuzzy_index import TrigramIndex
+
+
+class TestTrigramIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TrigramIndex([
+            ("Toyota", "Toyota"), ("тойота", "Toyota"), ("Hyundai", "Hyundai"), ("хендай", "Hyundai"),
+            ("Land Rover", "Land Rover"), ("Model 6", "Model 6"), ("I-Pace", "I-Pace"), ("CX-9", "CX-9"),
+        ])
+
+    def test_misspellings(self):
+        self.assertEqual(self.index.match("Тойта")[:2], ("Toyota", "тойота"))
+        self.assertEqual(self.index.match("Hyundia")[0], "Hyundai")
+        self.assertEqual(self.index.match("land-rovr")[0], "Land Rover")
+        self.assertEqual(self.index.match("TOYOTA")[2], 1.0)
+
+    def test_threshold(self):
+        self.assertIsNone(self.index.match("Tesla"))
+        value, _, score = self.index.match("Hyundia")
+        self.assertIsNone(self.index.match("Hyundia", threshold=score + 0.01))
+        self.assertEqual(self.index.match("Hyundia", threshold=score)[0], value)
+
+    def test_numbers_and_code_words_must_match(self):
+        self.assertIsNone(self.index.match("Model 7"))
+        self.assertIsNone(self.index.match("CX-5"))
+        self.assertIsNone(self.index.match("E-Pace"))
+        self.assertEqual(self.index.match("i pace")[0], "I-Pace")
+
+    def test_short_queries_are_rejected(self):
+        self.assertIsNone(self.index.match("To"))
+        self.assertEqual(len(self.index), 8)
+
+
+class TestFuzzyParsing(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        hyundai = Brand(name="Hyundai", slug="hyundai")
+        toyota = Brand(name="Toyota", slug="toyota")
+        db.session.add_all([hyundai, toyota])
+        db.session.flush()
+        db.session.add_all([
+            BrandSynonym(name="тойота", brand_id=toyota.id),
+            BrandModel(name="Solaris", brand_id=hyundai.id),
+            BrandModel(name="Camry", brand_id=toyota.id),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_misspelled_brand_and_model(self):
+        result = parse_car_info("Hyundia Solaris 1.6 AT", db.session)
+        self.assertEqual((result["brand"], result["model"]), ("Hyundai", "Solaris"))
+
+        result = parse_car_info("Тойта Camri 2.5", db.session)
+        self.assertEqual((result["brand"], result["model"], result["modification"]), ("Toyota", "Camry", "2.5"))
+
+        self.assertEqual(Brand.query.count(), 2)
+        self.assertEqual(BrandModel.query.count(), 2)
+
+    def test_rejected_candidate_creates_brand(self):
+        original = fuzzy_index.FUZZY_MATCH_THRESHOLD
+        fuzzy_index.FUZZY_MATCH_THRESHOLD = 0.9
+        try:
+            result = parse_car_info("Hyundia Solaris", db.session)
+        finally:
+            fuzzy_index.FUZZY_MATCH_THRESHOLD = original
+        self.assertEqual(result["brand"], "Hyundia")
+        self.assertIsNotNone(Brand.query.filter_by(name="Hyundia").first())
+
+    def test_batch_parser(self):
+        results = list(parse_car_info_many(["Hyundia Solaris", "Тойта Camry"], db.session))
+        self.assertEqual([result["brand"] for result in results], ["Hyundai", "Toyota"])
+        self.assertEqual(Brand.query.count(), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
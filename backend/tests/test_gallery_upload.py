@@ -0,0 +1,56 @@
+"""
+Test the concurrent gallery upload
+"""
+import threading
+import time
+import unittest
+
+from backend.utils.gallery_upload import upload_gallery
+
+
+class TestGalleryUpload(unittest.TestCase):
+
+    def test_parallel_and_keyed_by_index(self):
+        delays = {1: 0.3, 2: 0.1, 3: 0.2, 4: 0.05}
+
+        def upload(index, file_id):
+            time.sleep(delays[index])
+            return f"https://cdn/{file_id}.jpg"
+
+        started = time.perf_counter()
+        uploaded = upload_gallery([(index, f"file{index}") for index in delays], upload, workers=4, retry_delay=0)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(uploaded, {index: f"https://cdn/file{index}.jpg" for index in delays})
+        # About as long as the slowest image, not the sum of all of them
+        self.assertLess(elapsed, 0.55)
+
+    def test_retries_failed_images(self):
+        attempts = {}
+
+        def upload(index, file_id):
+            attempts[index] = attempts.get(index, 0) + 1
+            if index == 1 and attempts[index] < 3:
+                raise ConnectionError("timeout")
+            if index == 2:
+                return None
+            return f"https://cdn/{file_id}.jpg"
+
+        uploaded = upload_gallery([(1, "a"), (2, "b"), (3, "c")], upload, retries=2, retry_delay=0)
+        self.assertEqual(uploaded, {1: "https://cdn/a.jpg", 3: "https://cdn/c.jpg"})
+        self.assertEqual(attempts, {1: 3, 2: 3, 3: 1})
+
+    def test_progress_is_reported_in_calling_thread(self):
+        reported = []
+        caller = threading.current_thread()
+
+        def on_uploaded(index, url):
+            reported.append((index, threading.current_thread() is caller))
+
+        upload_gallery([(1, "a"), (2, "b")], lambda index, file_id: file_id, on_uploaded=on_uploaded)
+        self.assertEqual(sorted(reported), [(1, True), (2, True)])
+        self.assertEqual(upload_gallery([], lambda index, file_id: file_id), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
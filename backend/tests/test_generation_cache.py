@@ -0,0 +1,94 @@
+"""
+Test the content-addressed generation cache
+"""
+import hashlib
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from backend.db import db
+from backend.models import GenerationCache
+from backend.utils.generation_cache import (forget_generation, generation_key, get_generation_cache_stats,
+                                            hash_file, lookup_generation, store_generation)
+
+GENERATOR = "backend.utils.telegram_import:generate_image"
+PARAMS = {'mode': 'photon', 'prompt': 'Studio shot of a BMW X5', 'image_url': 'https://t.me/file/1.jpg',
+          'car_model': 'X5', 'car_brand': 'BMW', 'car_id': 1}
+
+
+class TestGenerationKey(unittest.TestCase):
+
+    def test_ignores_upload_naming_and_source_url(self):
+        key, prompt_hash = generation_key(GENERATOR, PARAMS, "source-sha")
+        other_car = dict(PARAMS, car_id=2, car_model='X5 M', image_url='https://t.me/file/2.jpg')
+        self.assertEqual(generation_key(GENERATOR, other_car, "source-sha")[0], key)
+        self.assertEqual(prompt_hash, hashlib.sha256(PARAMS['prompt'].encode()).hexdigest())
+
+    def test_inputs_that_change_the_image_change_the_key(self):
+        key = generation_key(GENERATOR, PARAMS, "source-sha")[0]
+        self.assertNotEqual(generation_key(GENERATOR, PARAMS, "other-sha")[0], key)
+        self.assertNotEqual(generation_key(GENERATOR, dict(PARAMS, prompt='Red car'), "source-sha")[0], key)
+        self.assertNotEqual(generation_key(GENERATOR, dict(PARAMS, mode='comfy'), "source-sha")[0], key)
+        self.assertNotEqual(generation_key("other:generator", PARAMS, "source-sha")[0], key)
+
+    def test_hash_file(self):
+        with tempfile.NamedTemporaryFile(delete=False) as image_file:
+            image_file.write(b'\xff\xd8\xff' * 50000)
+        try:
+            self.assertEqual(hash_file(image_file.name), hashlib.sha256(b'\xff\xd8\xff' * 50000).hexdigest())
+        finally:
+            os.unlink(image_file.name)
+
+
+class TestGenerationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        db.metadata.create_all(self.engine, tables=[GenerationCache.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def store(self, key, url, **options):
+        store_generation(self.session, key, GENERATOR, "source-sha", "prompt-sha", url, mode='photon', **options)
+
+    def test_store_and_lookup(self):
+        before = get_generation_cache_stats()
+        self.assertIsNone(lookup_generation(self.session, "k1"))
+        self.store("k1", "https://res.cloudinary.com/cars/1-main.webp")
+
+        entry = lookup_generation(self.session, "k1")
+        self.assertEqual(entry.result_url, "https://res.cloudinary.com/cars/1-main.webp")
+        self.assertEqual(entry.hits, 1)
+
+        stats = get_generation_cache_stats(self.session)
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual((stats['entries'], stats['total_hits']), (1, 1))
+
+        forget_generation(self.session, "k1")
+        self.assertIsNone(lookup_generation(self.session, "k1"))
+
+    def test_evicts_least_recently_used(self):
+        now = datetime.utcnow()
+        for index, key in enumerate(("old", "used", "new")):
+            self.store(key, f"https://res.cloudinary.com/{key}.webp", max_entries=10)
+            entry = self.session.scalars(select(GenerationCache).where(GenerationCache.cache_key == key)).one()
+            entry.last_used_at = now - timedelta(hours=10 - index)
+        self.session.commit()
+        # A hit makes "used" the most recently used entry
+        lookup_generation(self.session, "used")
+
+        self.store("newest", "https://res.cloudinary.com/newest.webp", max_entries=3)
+        keys = set(self.session.scalars(select(GenerationCache.cache_key)))
+        self.assertEqual(keys, {"used", "new", "newest"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+"""
+Test the generator output store
+"""
+import unittest
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend.db import db
+from backend.models import GenerationOutput
+from backend.utils.generation_outputs import generation_task, latest_generation_output, record_generation_output
+
+
+class TestGenerationOutputs(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://", poolclass=StaticPool)
+        db.metadata.create_all(self.engine, tables=[GenerationOutput.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_records_for_enclosing_task(self):
+        with generation_task("img_task_1_100"):
+            record_generation_output("https://replicate.delivery/a.webp", car_id=1, generator='photon',
+                                     bind=self.engine)
+            with generation_task("img_task_2_100"):
+                record_generation_output("https://replicate.delivery/b.webp", bind=self.engine)
+            record_generation_output("https://replicate.delivery/c.webp", bind=self.engine)
+
+        self.assertEqual(latest_generation_output(self.session, "img_task_1_100"), "https://replicate.delivery/c.webp")
+        self.assertEqual(latest_generation_output(self.session, "img_task_2_100"), "https://replicate.delivery/b.webp")
+        self.assertIsNone(latest_generation_output(self.session, "img_task_3_100"))
+        self.assertIsNone(latest_generation_output(self.session, None))
+
+    def test_recording_survives_rollback_of_caller(self):
+        with generation_task("img_task_1_100"):
+            self.session.add(GenerationOutput(task_id="uncommitted", output_url="https://x"))
+            self.session.flush()
+            self.session.rollback()
+            record_generation_output("https://replicate.delivery/a.webp", bind=self.engine)
+        self.assertEqual(latest_generation_output(self.session, "img_task_1_100"), "https://replicate.delivery/a.webp")
+
+    def test_errors_are_not_raised(self):
+        broken = create_engine("sqlite://")
+        record_generation_output("https://replicate.delivery/a.webp", task_id="t", bind=broken)
+        broken.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
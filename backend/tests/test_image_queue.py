@@ -0,0 +1,107 @@
+"""
+Test processing of claimed image tasks
+"""
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+from flask import Flask
+from PIL import Image
+
+from backend.db import db
+from backend.models import Brand, Car, CarImage, GenerationOutput, ImageTask
+from backend.utils.generator_photon import generate_with_photon
+from backend.utils.image_queue import GALLERY_AI_SOURCE, generator_path, process_image_task
+
+OUTPUT_URL = "https://replicate.delivery/photon/out.webp"
+
+
+def create_app(database_uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+class TestProcessImageTask(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.app = create_app(f"sqlite:///{os.path.join(self.directory.name, 'cars.db')}")
+        with self.app.app_context():
+            db.create_all()
+            bmw = Brand(name="BMW", slug="bmw")
+            car = Car(model="X5", price=1, brand=bmw, image_url="https://res.cloudinary.com/cars/1-main.webp")
+            db.session.add(car)
+            db.session.flush()
+            db.session.add_all([CarImage(car_id=car.id, url=f"https://res.cloudinary.com/cars/1-{index}.webp",
+                                         position=index) for index in range(2)])
+            db.session.commit()
+            self.car_id = car.id
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def add_task(self, task_id, source='ai_generation'):
+        params = {'prompt': 'Studio shot', 'image_url': 'https://t.me/file/1.jpg',
+                  'car_model': 'X5', 'car_brand': 'BMW', 'car_id': self.car_id}
+        with self.app.app_context():
+            db.session.add(ImageTask(task_id=task_id, car_id=self.car_id, source=source, status='processing',
+                                     attempts=1, max_retries=3, generator=generator_path(generate_with_photon),
+                                     params=params))
+            db.session.commit()
+
+    def task(self, task_id):
+        return ImageTask.query.filter_by(task_id=task_id).one()
+
+    @patch.dict(os.environ, {'REPLICATE_API_TOKEN': 'token'})
+    @patch('backend.utils.image_queue.hash_source_image', side_effect=OSError("offline"))
+    @patch('backend.utils.generator_photon.requests')
+    @patch('backend.utils.generator_photon.replicate')
+    def test_photon_output_is_kept_for_the_task(self, replicate, requests, hash_source_image):
+        self.add_task("img_task_1_100")
+        replicate.run.return_value = [OUTPUT_URL]
+        requests.head.return_value = MagicMock(status_code=200, headers={'Content-Type': 'image/jpeg'})
+        # Replicate succeeded, the download for the upload fails
+        requests.get.side_effect = ConnectionError("timeout")
+
+        process_image_task("img_task_1_100", self.app)
+
+        with self.app.app_context():
+            output = GenerationOutput.query.one()
+            self.assertEqual((output.task_id, output.output_url), ("img_task_1_100", OUTPUT_URL))
+            # The next attempt only uploads the recorded output
+            self.assertEqual(self.task("img_task_1_100").status, 'waiting_upload')
+
+    @patch('utils.cloudinary_upload.upload_image', return_value="https://res.cloudinary.com/cars/1-ai.webp")
+    def test_gallery_generation_is_added_like_the_admin_action(self, upload_image):
+        self.add_task("gallery_ai_1_100", source=GALLERY_AI_SOURCE)
+        with self.app.app_context():
+            db.session.add(GenerationOutput(task_id="gallery_ai_1_100", car_id=self.car_id, output_url=OUTPUT_URL))
+            db.session.commit()
+
+        @contextmanager
+        def downloaded_image(url):
+            with tempfile.NamedTemporaryFile(suffix=".png") as image_file:
+                Image.new("RGB", (4, 4)).save(image_file.name)
+                yield image_file.name
+
+        with patch('utils.image_transfer.downloaded_image', downloaded_image):
+            process_image_task("gallery_ai_1_100", self.app)
+
+        with self.app.app_context():
+            car = db.session.get(Car, self.car_id)
+            self.assertEqual(car.image_url, "https://res.cloudinary.com/cars/1-ai.webp")
+            added = CarImage.query.filter_by(url=car.image_url).one()
+            self.assertEqual((added.position, added.alt), (2, "AI generated BMW X5"))
+            self.assertEqual(self.task("gallery_ai_1_100").status, 'completed')
+
+
+if __name__ == '__main__':
+    unittest.main()
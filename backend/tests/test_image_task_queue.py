@@ -0,0 +1,170 @@
+"""
+Test the database-backed image task queue
+"""
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+import requests
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from backend.db import db
+from backend.models import ImageTask
+from backend.utils.image_queue import generator_path, resolve_generator
+from backend.utils.image_task_queue import (DEFAULT_RETRY_POLICY, claim_image_task, count_image_tasks,
+                                            get_retry_policy, is_fatal_error, register_retry_policy,
+                                            release_image_task, renew_image_task_leases, retry_delay)
+
+
+class TestImageTaskQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directory.name, 'tasks.db')}")
+        db.metadata.create_all(self.engine, tables=[ImageTask.__table__])
+        self.sessions = scoped_session(sessionmaker(bind=self.engine))
+
+    def tearDown(self):
+        self.sessions.remove()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def add_task(self, task_id, car_id, generator="backend.utils.telegram_import:generate_image", **columns):
+        session = self.sessions()
+        session.add(ImageTask(task_id=task_id, car_id=car_id, source='ai_generation', status='pending',
+                              generator=generator, params={'car_id': car_id}, **columns))
+        session.commit()
+
+    def task(self, task_id):
+        session = self.sessions()
+        session.expire_all()
+        return session.query(ImageTask).filter_by(task_id=task_id).one()
+
+    def test_claims_in_order_and_skips_busy_cars(self):
+        self.add_task("t1", car_id=1)
+        self.add_task("t2", car_id=1)
+        self.add_task("t3", car_id=2)
+        session = self.sessions()
+
+        self.assertEqual(claim_image_task(session, "a").task_id, "t1")
+        # t2 waits until the task of car 1 is done
+        self.assertEqual(claim_image_task(session, "b").task_id, "t3")
+        self.assertIsNone(claim_image_task(session, "c"))
+
+        task = self.task("t1")
+        self.assertEqual((task.status, task.locked_by, task.attempts), ("processing", "a", 1))
+
+        release_image_task(session, "t1", 'retrying', error="Generation returned None")
+        self.assertEqual(claim_image_task(session, "c").task_id, "t1")
+        self.assertEqual(self.task("t1").attempts, 2)
+
+    def test_ignores_tasks_without_generator(self):
+        self.add_task("admin", car_id=1, generator=None)
+        self.assertIsNone(claim_image_task(self.sessions(), "a"))
+        self.assertEqual(count_image_tasks(self.sessions()), {})
+
+    def test_reclaims_expired_lease(self):
+        self.add_task("t1", car_id=1)
+        session = self.sessions()
+        claim_image_task(session, "dead-worker", lease=60)
+        self.assertIsNone(claim_image_task(session, "b", lease=60))
+
+        stale = self.task("t1")
+        stale.locked_at = datetime.utcnow() - timedelta(seconds=120)
+        session.commit()
+        self.assertEqual(claim_image_task(session, "b", lease=60).locked_by, "b")
+
+    def test_fails_expired_task_without_retries_left(self):
+        self.add_task("t1", car_id=1, max_retries=1)
+        self.add_task("t2", car_id=2)
+        session = self.sessions()
+        for attempt in range(2):
+            self.assertEqual(claim_image_task(session, "crashing", lease=60).task_id, "t1")
+            stale = self.task("t1")
+            stale.locked_at = datetime.utcnow() - timedelta(seconds=120)
+            session.commit()
+
+        # The second attempt was the last one: the task is failed, the next one claimed
+        self.assertEqual(claim_image_task(session, "b", lease=60).task_id, "t2")
+        task = self.task("t1")
+        self.assertEqual((task.status, task.attempts, task.locked_by), ("failed", 2, None))
+        self.assertIn("lease expired", task.error)
+
+    def test_renews_only_own_leases(self):
+        self.add_task("t1", car_id=1)
+        session = self.sessions()
+        claim_image_task(session, "a")
+        self.assertEqual(renew_image_task_leases(session, ["t1"], ["other"]), 0)
+        self.assertEqual(renew_image_task_leases(session, ["t1"], ["a"]), 1)
+
+    def test_expired_task_waits_for_running_task_of_same_car(self):
+        self.add_task("t1", car_id=1)
+        self.add_task("t2", car_id=1)
+        session = self.sessions()
+        running = self.task("t1")
+        running.status = 'processing'
+        running.locked_by = 'a'
+        running.locked_at = datetime.utcnow()
+        session.commit()
+        stale = self.task("t2")
+        stale.status = 'processing'
+        stale.locked_at = datetime.utcnow() - timedelta(hours=1)
+        session.commit()
+
+        # t2 is claimable (expired lease) only if car 1 were free; it is not
+        self.assertIsNone(claim_image_task(session, "b", lease=60))
+        self.assertEqual(self.task("t2").status, 'processing')
+
+    def test_backoff_delays_claim(self):
+        self.add_task("t1", car_id=1)
+        self.add_task("t2", car_id=2)
+        session = self.sessions()
+        claim_image_task(session, "a")
+        release_image_task(session, "t1", 'retrying', error="timeout", delay=60)
+
+        # The worker moves on to the next task instead of waiting for t1
+        self.assertEqual(claim_image_task(session, "a").task_id, "t2")
+        self.assertIsNone(claim_image_task(session, "b"))
+
+        due = self.task("t1")
+        due.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+        session.commit()
+        self.assertEqual(claim_image_task(session, "b").task_id, "t1")
+
+    def test_retry_delay_grows_with_jitter_up_to_cap(self):
+        policy = DEFAULT_RETRY_POLICY._replace(base_delay=10, max_delay=60)
+        for attempt, full in ((1, 10), (2, 20), (3, 40), (4, 60), (10, 60)):
+            delays = [retry_delay(policy, attempt) for _ in range(50)]
+            self.assertTrue(all(full / 2 <= delay <= full for delay in delays), (attempt, delays))
+            self.assertGreater(len(set(delays)), 1)
+
+    def test_retry_policies(self):
+        register_retry_policy("tests:generator", max_retries=1, base_delay=5)
+        policy = get_retry_policy("tests:generator")
+        self.assertEqual((policy.max_retries, policy.base_delay), (1, 5))
+        self.assertEqual(policy.max_delay, DEFAULT_RETRY_POLICY.max_delay)
+        self.assertIs(get_retry_policy("tests:other"), DEFAULT_RETRY_POLICY)
+
+    def test_fatal_errors(self):
+        def http_error(status):
+            response = requests.Response()
+            response.status_code = status
+            return requests.HTTPError(response=response)
+
+        self.assertTrue(is_fatal_error(ValueError("bad prompt")))
+        self.assertTrue(is_fatal_error(http_error(422)))
+        self.assertFalse(is_fatal_error(http_error(429)))
+        self.assertFalse(is_fatal_error(http_error(503)))
+        self.assertFalse(is_fatal_error(requests.ConnectionError()))
+
+    def test_generator_round_trip(self):
+        path = generator_path(count_image_tasks)
+        self.assertEqual(path, "backend.utils.image_task_queue:count_image_tasks")
+        self.assertIs(resolve_generator(path), count_image_tasks)
+        self.assertIsNone(resolve_generator("backend.utils.image_task_queue:missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
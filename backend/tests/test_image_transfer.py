@@ -0,0 +1,94 @@
+"""
+Test the streaming image download
+"""
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from backend.utils.image_transfer import ImageDownloadError, detect_image_type, downloaded_image
+
+JPEG = b'\xff\xd8\xff\xe0' + b'\x00' * 4096
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # path -> (content type, body, send Content-Length)
+    routes = {
+        '/car.jpg': ('image/jpeg', JPEG, True),
+        '/telegram': ('application/octet-stream', PNG, True),
+        '/error.html': ('text/html', b'<html>Not found</html>', True),
+        '/fake.jpg': ('image/jpeg', b'<html>Not found</html>', True),
+        '/chunked.jpg': ('image/jpeg', JPEG, False),
+    }
+
+    def do_GET(self):
+        content_type, body, with_length = self.routes[self.path]
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        if with_length:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestImageTransfer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def test_detect_image_type(self):
+        self.assertEqual(detect_image_type(JPEG[:12]), '.jpg')
+        self.assertEqual(detect_image_type(PNG[:12]), '.png')
+        self.assertEqual(detect_image_type(b'RIFF\x00\x00\x00\x00WEBP'), '.webp')
+        self.assertEqual(detect_image_type(b'\x00\x00\x00\x1cftypheic'), '.heic')
+        self.assertIsNone(detect_image_type(b'<html>'))
+
+    def test_downloads_to_temporary_file(self):
+        with downloaded_image(f"{self.base_url}/car.jpg") as path:
+            self.assertTrue(path.endswith('.jpg'))
+            with open(path, 'rb') as image_file:
+                self.assertEqual(image_file.read(), JPEG)
+        self.assertFalse(os.path.exists(path))
+
+    def test_accepts_octet_stream_and_detects_extension(self):
+        with downloaded_image(f"{self.base_url}/telegram") as path:
+            self.assertTrue(path.endswith('.png'))
+
+    def test_rejects_non_image_content_type(self):
+        with self.assertRaises(ImageDownloadError):
+            with downloaded_image(f"{self.base_url}/error.html"):
+                pass
+
+    def test_rejects_body_that_is_not_an_image(self):
+        with self.assertRaises(ImageDownloadError):
+            with downloaded_image(f"{self.base_url}/fake.jpg"):
+                pass
+
+    def test_rejects_declared_size_over_limit(self):
+        with self.assertRaisesRegex(ImageDownloadError, 'more than'):
+            with downloaded_image(f"{self.base_url}/car.jpg", max_bytes=1000):
+                pass
+
+    def test_aborts_stream_over_limit_and_removes_file(self):
+        before = set(os.listdir(tempfile.gettempdir()))
+        with self.assertRaisesRegex(ImageDownloadError, 'larger than'):
+            with downloaded_image(f"{self.base_url}/chunked.jpg", max_bytes=1000):
+                pass
+        self.assertEqual(set(os.listdir(tempfile.gettempdir())) - before, set())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+"""
+Test the image generation worker pool
+"""
+import queue
+import threading
+import time
+import unittest
+
+from backend.utils.image_workers import ImageWorkerPool
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+class TestImageWorkerPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tasks = queue.Queue()
+        self.pool = None
+
+    def tearDown(self):
+        if self.pool is not None:
+            self.pool.shutdown(timeout=5)
+
+    def claim(self, worker_name):
+        try:
+            return self.tasks.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _start(self, handler, workers, **options):
+        self.pool = ImageWorkerPool(handler, self.claim, workers=workers, queue_depth=self.tasks.qsize,
+                                    poll_interval=0.02, **options).start()
+        return self.pool
+
+    def test_runs_tasks_in_parallel(self):
+        done = []
+
+        def handler(task_id):
+            time.sleep(0.3)
+            done.append(task_id)
+
+        self._start(handler, workers=4)
+        started = time.perf_counter()
+        for index in range(4):
+            self.tasks.put(f"t{index}")
+        _wait_for(lambda: len(done) == 4)
+        self.assertLess(time.perf_counter() - started, 1.0)
+
+    def test_resize_and_stats(self):
+        release = threading.Event()
+        self._start(lambda task_id: release.wait(5), workers=1)
+        self.tasks.put("t1")
+        _wait_for(lambda: self.pool.stats()['in_flight'] == 1)
+
+        self.pool.resize(3)
+        _wait_for(lambda: len(self.pool.stats()['workers']) == 3)
+        statuses = sorted(worker['status'] for worker in self.pool.stats()['workers'])
+        self.assertEqual(statuses, ['busy', 'idle', 'idle'])
+
+        # Shrinking stops idle workers first; the busy one keeps its task
+        self.pool.resize(1)
+        _wait_for(lambda: len(self.pool.stats()['workers']) == 1)
+        self.assertEqual(self.pool.stats()['workers'][0]['task_id'], 't1')
+
+        release.set()
+        _wait_for(lambda: self.pool.stats()['workers'][0]['completed'] == 1)
+        self.assertGreater(self.pool.stats()['utilization'], 0)
+        self.assertEqual(self.pool.stats()['queue_depth'], 0)
+
+    def test_renews_leases_of_running_tasks(self):
+        renewed = []
+        release = threading.Event()
+        self._start(lambda task_id: release.wait(5), workers=2,
+                    renew=lambda task_ids, names: renewed.append(sorted(task_ids)), supervise_interval=0.05)
+        self.tasks.put("t1")
+        _wait_for(lambda: ["t1"] in renewed)
+        release.set()
+
+    def test_supervisor_survives_errors(self):
+        passes = []
+        pool = ImageWorkerPool(lambda task_id: None, self.claim, workers=0, supervise_interval=0.02)
+        supervise_once = pool._supervise_once
+
+        def failing_once():
+            passes.append(True)
+            if len(passes) == 1:
+                raise TypeError("unsupported operand type(s) for -: 'float' and 'NoneType'")
+            supervise_once()
+
+        pool._supervise_once = failing_once
+        self.pool = pool.start()
+        _wait_for(lambda: len(passes) >= 3)
+        self.assertTrue(pool._supervisor.is_alive())
+
+    def test_handler_errors_are_counted(self):
+        def handler(task_id):
+            raise RuntimeError("replicate down")
+
+        self._start(handler, workers=1)
+        self.tasks.put("t1")
+        _wait_for(lambda: self.pool.stats()['workers'][0]['errors'] == 1)
+        self.assertEqual(self.pool.stats()['workers'][0]['status'], 'idle')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+Test the database-backed car import queue and its bounded executor
+"""
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from backend.db import db
+from backend.models import ImportJob
+from backend.utils.import_executor import DEFAULT_RETRY_AFTER, ImportExecutor, ImportQueueFull, import_stage
+from backend.utils.import_jobs import (checkpoint_import_job, claim_import_job, enqueue_import_job,
+                                       fail_import_job, finish_import_job, renew_import_job_leases)
+
+
+class ImportQueueTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.directory.name, 'jobs.db')}")
+        db.metadata.create_all(self.engine, tables=[ImportJob.__table__])
+        self.sessions = scoped_session(sessionmaker(bind=self.engine))
+
+    def tearDown(self):
+        self.sessions.remove()
+        self.engine.dispose()
+        self.directory.cleanup()
+
+    def job(self, job_id):
+        session = self.sessions()
+        session.expire_all()
+        return session.get(ImportJob, job_id)
+
+
+class TestImportJobs(ImportQueueTestCase):
+
+    def test_claims_each_job_once_in_order(self):
+        session = self.sessions()
+        first = enqueue_import_job(session, {"car_data": "BMW X5"}, 1).id
+        second = enqueue_import_job(session, {"car_data": "Audi Q7"}, 2).id
+
+        self.assertEqual(claim_import_job(session, "a").id, first)
+        self.assertEqual(claim_import_job(session, "b").id, second)
+        self.assertIsNone(claim_import_job(session, "c"))
+        job = self.job(first)
+        self.assertEqual((job.status, job.locked_by, job.attempts), ("running", "a", 1))
+
+    def test_max_pending_is_never_exceeded(self):
+        barrier = threading.Barrier(8)
+        accepted = []
+
+        def submit(index):
+            barrier.wait()
+            job = enqueue_import_job(self.sessions(), {}, index, max_pending=3)
+            accepted.append(job is not None)
+            self.sessions.remove()
+
+        threads = [threading.Thread(target=submit, args=(index,)) for index in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(accepted.count(True), 3)
+        self.assertEqual(self.sessions().query(ImportJob).count(), 3)
+
+    def test_resumes_after_expired_lease(self):
+        session = self.sessions()
+        job_id = enqueue_import_job(session, {"car_data": "BMW X5"}, 1).id
+        job = claim_import_job(session, "worker-1", lease=60)
+        checkpoint_import_job(session, job, 'parsed', data={"brand": "BMW"})
+        checkpoint_import_job(session, job, 'main_image_uploaded', main_image_url="https://img/1.jpg")
+        self.assertTrue(job.has_completed('parsed'))
+        self.assertFalse(job.has_completed('gallery_uploaded'))
+
+        # worker-1 was killed; its lease is still valid, then expires
+        self.assertIsNone(claim_import_job(session, "worker-2", lease=60))
+        job.locked_at = datetime.utcnow() - timedelta(seconds=61)
+        session.commit()
+        self.assertEqual(renew_import_job_leases(session, [job_id], ["worker-2"]), 0)
+
+        resumed = claim_import_job(session, "worker-2", lease=60)
+        self.assertEqual(resumed.id, job_id)
+        self.assertEqual((resumed.stage, resumed.attempts, resumed.locked_by),
+                         ('main_image_uploaded', 2, "worker-2"))
+        self.assertEqual(resumed.state, {"data": {"brand": "BMW"}, "main_image_url": "https://img/1.jpg"})
+        finish_import_job(session, resumed)
+        self.assertEqual(self.job(job_id).status, "done")
+
+    def test_failed_attempts_are_retried_until_the_limit(self):
+        session = self.sessions()
+        job_id = enqueue_import_job(session, {}, 1).id
+        for attempt in range(1, 4):
+            job = claim_import_job(session, "worker")
+            self.assertEqual(job.attempts, attempt)
+            given_up = fail_import_job(session, job, "upload failed")
+        self.assertTrue(given_up)
+        self.assertEqual((self.job(job_id).status, self.job(job_id).error), ("failed", "upload failed"))
+        self.assertIsNone(claim_import_job(session, "worker"))
+
+
+class TestImportExecutor(ImportQueueTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.release = threading.Event()
+        self.started = threading.Event()
+        self.handled = []
+
+    def tearDown(self):
+        self.release.set()
+        super().tearDown()
+
+    def executor(self, handler, **options):
+        options.setdefault('workers', 1)
+        options.setdefault('poll_interval', 0.05)
+        return ImportExecutor(handler, self.sessions, **options)
+
+    def blocking_handler(self, session, job):
+        self.started.set()
+        with import_stage('parse'):
+            self.release.wait(5)
+        self.handled.append(job.chat_id)
+        finish_import_job(session, job)
+
+    def test_rejects_when_queue_is_full(self):
+        executor = self.executor(self.blocking_handler, queue_size=1).start()
+        executor.submit({}, 1)
+        self.assertTrue(self.started.wait(5))
+        executor.submit({}, 2)
+
+        with self.assertRaises(ImportQueueFull) as raised:
+            executor.submit({}, 3)
+        self.assertEqual(raised.exception.retry_after, DEFAULT_RETRY_AFTER)
+        stats = executor.stats()
+        self.assertEqual((stats['queue_depth'], stats['in_flight'], stats['rejected']), (1, 1, 1))
+
+        self.release.set()
+        deadline = time.monotonic() + 5
+        while len(self.handled) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        executor.shutdown(timeout=5)
+        self.assertEqual(self.handled, ["1", "2"])
+        stats = executor.stats()
+        self.assertEqual((stats['completed'], stats['failed'], stats['jobs']), (2, 0, {'done': 2}))
+        self.assertEqual(set(stats['stages']), {'queue_wait', 'parse', 'total'})
+        self.assertGreaterEqual(executor.retry_after(0), 1)
+
+    def test_gives_up_after_failed_attempts(self):
+        given_up = []
+
+        def handler(session, job):
+            raise ValueError("broken listing")
+
+        executor = self.executor(handler, on_give_up=lambda job, error: given_up.append((job.chat_id, error)))
+        executor.start()
+        job_id = executor.submit({}, 7)
+        deadline = time.monotonic() + 5
+        while not given_up and time.monotonic() < deadline:
+            time.sleep(0.02)
+        executor.shutdown(timeout=5)
+        self.assertEqual(given_up, [("7", "broken listing")])
+        self.assertEqual((self.job(job_id).status, self.job(job_id).attempts), ("failed", 3))
+
+    def test_pending_jobs_survive_shutdown(self):
+        executor = self.executor(self.blocking_handler).start()
+        executor.submit({}, 1)
+        self.assertTrue(self.started.wait(5))
+        pending_id = executor.submit({}, 2)
+        threading.Timer(0.2, self.release.set).start()
+        executor.shutdown(timeout=5)
+        self.assertEqual(self.handled, ["1"])
+        with self.assertRaises(ImportQueueFull):
+            executor.submit({}, 3)
+
+        # The next process picks the job up from the table
+        restarted = self.executor(self.blocking_handler).start()
+        deadline = time.monotonic() + 5
+        while len(self.handled) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        restarted.shutdown(timeout=5)
+        self.assertEqual(self.handled, ["1", "2"])
+        self.assertEqual(self.job(pending_id).status, "done")
+
+    def test_import_stage_outside_executor(self):
+        with import_stage('parse'):
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
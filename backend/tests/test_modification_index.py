@@ -0,0 +1,103 @@
+"""
+Test the per-brand index of modifications used by cars
+"""
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, Car, ModificationUsage
+from backend.utils.car_parser import find_known_modification
+from backend.utils.modification_index import (find_used_modifications, normalize_modification,
+                                              rebuild_modification_index)
+
+
+class TestModificationIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        self.app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.bmw = Brand(name="BMW", slug="bmw")
+        self.audi = Brand(name="Audi", slug="audi")
+        db.session.add_all([self.bmw, self.audi])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def add_car(self, brand, modification):
+        car = Car(model="X", price=1, brand=brand, modification=modification)
+        db.session.add(car)
+        db.session.commit()
+        return car
+
+    def usage(self):
+        return {(row.brand_id, row.normalized): (row.name, row.usage_count)
+                for row in ModificationUsage.query.order_by(ModificationUsage.id)}
+
+    def test_normalize_modification(self):
+        self.assertEqual(normalize_modification("  xDrive  30d "), "xdrive 30d")
+        self.assertIsNone(normalize_modification("   "))
+        self.assertIsNone(normalize_modification(None))
+
+    def test_maintained_on_car_writes(self):
+        first = self.add_car(self.bmw, "xDrive 30d")
+        self.add_car(self.bmw, "XDRIVE  30d")
+        self.add_car(self.audi, "xDrive 30d")
+        self.add_car(self.bmw, "")
+        self.assertEqual(self.usage(), {
+            (self.bmw.id, "xdrive 30d"): ("XDRIVE  30d", 2),
+            (self.audi.id, "xdrive 30d"): ("xDrive 30d", 1),
+        })
+
+        first.modification = "M50i"
+        db.session.commit()
+        self.assertEqual(self.usage()[(self.bmw.id, "xdrive 30d")][1], 1)
+        self.assertEqual(self.usage()[(self.bmw.id, "m50i")][1], 1)
+
+        first.brand = self.audi
+        db.session.commit()
+        self.assertNotIn((self.bmw.id, "m50i"), self.usage())
+        self.assertEqual(self.usage()[(self.audi.id, "m50i")][1], 1)
+
+        db.session.delete(first)
+        db.session.commit()
+        self.assertNotIn((self.audi.id, "m50i"), self.usage())
+
+    def test_ranked_lookup(self):
+        self.add_car(self.bmw, "30d")
+        self.add_car(self.bmw, "xDrive30d")
+        for _ in range(2):
+            self.add_car(self.bmw, "M Sport")
+        self.add_car(self.audi, "xDrive30d Pro")
+
+        self.assertEqual(find_used_modifications(db.session, self.bmw.id, "xDrive30d M Sport 2024"),
+                         ["xDrive30d", "M Sport", "30d"])
+        self.assertEqual(find_used_modifications(db.session, self.bmw.id, "xDrive30d", limit=1), ["xDrive30d"])
+        self.assertEqual(find_used_modifications(db.session, self.bmw.id, "40i"), [])
+        # Falls back to the index when no BrandModification matches
+        self.assertEqual(find_known_modification("BMW", "XDRIVE30D m sport", db.session), "xDrive30d")
+        self.assertIsNone(find_known_modification("Audi", "M Sport", db.session))
+
+    def test_rebuild_matches_incremental_index(self):
+        for modification in ("2.0 TFSI", "2.0  tfsi", "45 TFSI quattro", None):
+            self.add_car(self.audi, modification)
+        incremental = self.usage()
+
+        db.session.execute(ModificationUsage.__table__.delete())
+        self.assertEqual(rebuild_modification_index(db.session), 2)
+        db.session.commit()
+        self.assertEqual({key: count for key, (_, count) in self.usage().items()},
+                         {key: count for key, (_, count) in incremental.items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Test transliteration-normalized matching keys for brand, model and trim names
+"""
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandModel, BrandTrim
+from backend.utils.car_parser import parse_car_info
+from backend.utils.name_keys import KeyIndex, normalize_key
+
+
+class TestNormalizeKey(unittest.TestCase):
+
+    def test_case_separators_and_transliteration(self):
+        self.assertEqual(normalize_key("Great Wall"), "greatwall")
+        self.assertEqual(normalize_key("great-wall"), "greatwall")
+        self.assertEqual(normalize_key("ТОЙОТА"), "toyota")
+        self.assertEqual(normalize_key("Тигго 8"), normalize_key("Tiggo 8"))
+        self.assertEqual(normalize_key("Шкода Ёти"), "shkodaeti")
+
+    def test_lookalike_letters_in_mixed_words(self):
+        # Cyrillic "В" and "М" typed into a Latin name
+        self.assertEqual(normalize_key("ВМW"), "bmw")
+        # A purely Cyrillic word is transliterated by sound
+        self.assertEqual(normalize_key("ВМВ"), "vmv")
+
+
+class TestKeyIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = KeyIndex([
+            ("Great Wall", "Great Wall"), ("Tiggo 8", "Tiggo 8"), ("#1", "#1"), ("LS", "LS"), ("UNI-T", "UNI-T"),
+        ])
+
+    def test_search_prefers_leftmost_longest(self):
+        self.assertEqual(self.index.search("Продаю GreatWall Tank"), ("Great Wall", 7, 16))
+        self.assertEqual(self.index.search("Chery Тигго 8 Pro"), ("Tiggo 8", 6, 13))
+        self.assertEqual(self.index.search("Changan UNIT 1.5T")[0], "UNI-T")
+
+    def test_matches_cover_whole_chunks(self):
+        self.assertIsNone(self.index.search("1.5T AWD"))
+        self.assertEqual(self.index.search("SMART #1 1.5T"), ("#1", 7, 8))
+
+    def test_get_matches_words_merged_into_one_key(self):
+        self.assertEqual(self.index.get("Great-Wall"), "Great Wall")
+        self.assertEqual(self.index.get("Тигго8"), "Tiggo 8")
+        # "8" ends the key "tiggo8", but "Audi8" does not
+        self.assertIsNone(self.index.get("Audi8"))
+        self.assertIsNone(self.index.get("АКПП"))
+        self.assertIsNone(self.index.get("..."))
+
+    def test_short_transliterated_keys_are_ignored(self):
+        self.assertIsNone(self.index.get("л.с."))
+        self.assertIsNone(self.index.search("249 л.с."))
+        self.assertEqual(self.index.get("ls"), "LS")
+
+
+class TestKeyParsing(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        great_wall = Brand(name="Great Wall", slug="great-wall")
+        chery = Brand(name="Chery", slug="chery")
+        vw = Brand(name="Volkswagen", slug="volkswagen")
+        db.session.add_all([great_wall, chery, vw])
+        db.session.flush()
+        db.session.add_all([
+            BrandModel(name="Tank 300", brand_id=great_wall.id, is_multi_word=True),
+            BrandModel(name="Tiggo 8", brand_id=chery.id, is_multi_word=True),
+            BrandModel(name="Touareg", brand_id=vw.id),
+            BrandTrim(name="R-Line", brand_id=vw.id),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_brand_model_and_trim_spelling_variants(self):
+        result = parse_car_info("GreatWall Tank 300 2.0T", db.session)
+        self.assertEqual((result["brand"], result["model"]), ("Great Wall", "Tank 300"))
+
+        result = parse_car_info("Chery Тигго 8 1.6T", db.session)
+        self.assertEqual((result["model"], result["modification"]), ("Tiggo 8", "1.6 T"))
+
+        result = parse_car_info("Volkswagen Touareg 3.0 TSI Rline", db.session)
+        self.assertEqual((result["trim"], result["modification"]), ("R-Line", "3.0 TSI"))
+
+        self.assertEqual(Brand.query.count(), 3)
+        self.assertEqual(BrandModel.query.count(), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
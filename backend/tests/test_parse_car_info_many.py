@@ -0,0 +1,85 @@
+"""
+Test batch parsing against the single-listing parser
+"""
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandSynonym, BrandModel, BrandTrim, Country
+from backend.utils.car_parser import parse_car_info, parse_car_info_many
+
+
+class TestParseCarInfoMany(unittest.TestCase):
+    """parse_car_info_many must return what a parse_car_info loop returns"""
+
+    LISTINGS = [
+        "BMW X5 xDrive30d M Sport",
+        "Volkswagen Touareg R-Line 3.0 TSI 4Motion",
+        "бмв X3 2.0T xDrive",
+        "BMW 3 Series 320i M Sport",
+        "Volkswagen ID.4 Pro",
+        "BMW",
+        "",
+        "VW Tiguan 2.0 TSI R-Line",
+    ]
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        bmw = Brand(name="BMW", slug="bmw")
+        vw = Brand(name="Volkswagen", slug="volkswagen")
+        # Default country of discovered brands
+        db.session.add_all([Country(name="China"), bmw, vw])
+        db.session.flush()
+        db.session.add_all([
+            BrandSynonym(name="бмв", brand_id=bmw.id),
+            BrandSynonym(name="vw", brand_id=vw.id),
+            BrandModel(name="X5", brand_id=bmw.id),
+            BrandModel(name="X3", brand_id=bmw.id),
+            BrandModel(name="3 Series", brand_id=bmw.id, is_multi_word=True),
+            BrandModel(name="Touareg", brand_id=vw.id),
+            BrandModel(name="ID.4", brand_id=vw.id),
+            BrandModel(name="Tiguan", brand_id=vw.id),
+            BrandTrim(name="M Sport", brand_id=bmw.id),
+            BrandTrim(name="R-Line", brand_id=vw.id),
+            BrandTrim(name="Pro", brand_id=vw.id),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_matches_single_listing_parser(self):
+        expected = [parse_car_info(text, db.session) for text in self.LISTINGS]
+        self.assertEqual(list(parse_car_info_many(self.LISTINGS, db.session, chunk_size=3)), expected)
+
+    def test_new_brands_and_models_saved_at_end(self):
+        results = list(parse_car_info_many(["Zeekr 001 YOU", "Zeekr 007 Max", "BMW iX3 M Sport"], db.session))
+
+        self.assertEqual([r["brand"] for r in results], ["Zeekr", "Zeekr", "BMW"])
+        self.assertEqual([r["model"] for r in results], ["001", "007", "iX3"])
+        self.assertEqual(results[2]["trim"], "M Sport")
+
+        zeekr = Brand.query.filter_by(name="Zeekr").one()
+        self.assertEqual(sorted(m.name for m in BrandModel.query.filter_by(brand_id=zeekr.id)), ["001", "007"])
+        bmw = Brand.query.filter_by(name="BMW").one()
+        self.assertEqual(BrandModel.query.filter_by(brand_id=bmw.id, name="iX3").count(), 1)
+
+        # The next batch sees the saved brand and model
+        self.assertEqual(next(parse_car_info_many(["Omoda Zeekr 001"], db.session))["brand"], "Zeekr")
+
+    def test_session_is_required(self):
+        with self.assertRaises(ValueError):
+            list(parse_car_info_many(self.LISTINGS, None))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+"""
+Test the parse_car_info result memo
+"""
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandModel, BrandTrim
+from backend.utils import car_parser
+from backend.utils.api_cache import MISS
+from backend.utils.parse_memo import ParseMemo, normalize_listing_text, set_parse_memo
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestParseMemo(unittest.TestCase):
+
+    def test_normalize_listing_text(self):
+        self.assertEqual(normalize_listing_text("  Land \t Rover\nDefender "), "Land Rover Defender")
+        # Decomposed "й" (и + combining breve) becomes the composed letter
+        self.assertEqual(normalize_listing_text("Хенда\u0438\u0306"), "Хендай")
+
+    def test_lru_ttl_and_copies(self):
+        clock = FakeClock()
+        memo = ParseMemo(max_entries=2, ttl=10, clock=clock)
+        keys = [memo.key(text, 1) for text in ("a", "b", "c")]
+        self.assertEqual(len(set(keys)), 3)
+
+        memo.set(keys[0], {"brand": "BMW", "engine": {"type": "diesel"}})
+        cached = memo.get(keys[0])
+        cached["engine"]["type"] = "electric"
+        self.assertEqual(memo.get(keys[0])["engine"]["type"], "diesel")
+
+        memo.set(keys[1], {"brand": "Audi"})
+        memo.set(keys[2], {"brand": "Kia"})
+        self.assertIs(memo.get(keys[0]), MISS)
+
+        clock.now += 11
+        self.assertIs(memo.get(keys[2]), MISS)
+        stats = memo.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (2, 2, 1))
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_disabled(self):
+        memo = ParseMemo(max_entries=0)
+        memo.set("key", {"brand": "BMW"})
+        self.assertIs(memo.get("key"), MISS)
+        self.assertFalse(memo.stats()["enabled"])
+
+
+class TestMemoizedParsing(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        bmw = Brand(name="BMW", slug="bmw")
+        db.session.add(bmw)
+        db.session.flush()
+        self.bmw_id = bmw.id
+        db.session.add_all([
+            BrandModel(name="X5", brand_id=bmw.id),
+            BrandTrim(name="M Sport", brand_id=bmw.id),
+        ])
+        db.session.commit()
+
+        self.memo = ParseMemo(max_entries=100)
+        set_parse_memo(self.memo)
+        self.calls = []
+        self.original_parse = car_parser._parse_car_info
+
+        def counting_parse(*args, **kwargs):
+            self.calls.append(args[0])
+            return self.original_parse(*args, **kwargs)
+
+        car_parser._parse_car_info = counting_parse
+
+    def tearDown(self):
+        car_parser._parse_car_info = self.original_parse
+        set_parse_memo(ParseMemo())
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_repeated_listing_is_parsed_once(self):
+        first = car_parser.parse_car_info("BMW X5 xDrive30d M Sport", db.session)
+        second = car_parser.parse_car_info("  BMW  X5 xDrive30d M Sport\n", db.session)
+        self.assertEqual(first, second)
+        self.assertEqual(self.calls, ["BMW X5 xDrive30d M Sport"])
+        self.assertEqual(self.memo.stats()["hit_ratio"], 0.5)
+
+    def test_disabled_memo_parses_text_as_given(self):
+        set_parse_memo(ParseMemo(max_entries=0))
+        car_parser.parse_car_info("  BMW  X5 xDrive30d\n", db.session)
+        self.assertEqual(self.calls, ["  BMW  X5 xDrive30d\n"])
+
+    def test_snapshot_reload_keeps_entries(self):
+        car_parser.parse_car_info("BMW X5 xDrive30d M Sport", db.session)
+        # An expired snapshot is reloaded at the same reference version
+        car_parser.get_reference_snapshot(db.session).loaded_at -= 10 ** 6
+        car_parser.parse_car_info("BMW X5 xDrive30d M Sport", db.session)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_reference_change_invalidates(self):
+        car_parser.parse_car_info("BMW X5 xDrive30d Luxury", db.session)
+        db.session.add(BrandTrim(name="Luxury", brand_id=self.bmw_id))
+        db.session.commit()
+
+        result = car_parser.parse_car_info("BMW X5 xDrive30d Luxury", db.session)
+        self.assertEqual(result["trim"], "Luxury")
+        self.assertEqual(len(self.calls), 2)
+
+    def test_parse_that_creates_rows_is_not_stored(self):
+        car_parser.parse_car_info("BMW X7 M60i", db.session)
+        car_parser.parse_car_info("BMW X7 M60i", db.session)
+        car_parser.parse_car_info("BMW X7 M60i", db.session)
+        # The first parse created the X7 model, the second one was stored
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.memo.stats()["skipped"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+Test per-stage tracing of parse_car_info and the rolling trace histograms
+"""
+import json
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandModel, BrandTrim
+from backend.utils import parse_trace
+from backend.utils.car_parser import parse_car_info
+from backend.utils.parse_trace import ParseTrace, ParseTraceStats
+from backend.utils.reference_snapshot import invalidate_reference_snapshot
+
+
+class TestParseTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        bmw = Brand(name="BMW", slug="bmw")
+        db.session.add(bmw)
+        db.session.flush()
+        db.session.add_all([
+            BrandModel(name="X5", brand_id=bmw.id),
+            BrandTrim(name="M Sport", brand_id=bmw.id),
+        ])
+        db.session.commit()
+        invalidate_reference_snapshot()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_stages_queries_and_cache(self):
+        first = ParseTrace("BMW X5 xDrive30d M Sport")
+        result = parse_car_info(first.text, db.session, trace=first)
+        self.assertEqual(result["trim"], "M Sport")
+        self.assertEqual(set(first.stages), {"brand", "engine", "model", "normalize"})
+        self.assertIsNotNone(first.total_ms)
+        self.assertGreaterEqual(first.total_ms, sum(first.stages.values()) - 1)
+        # Loading the reference snapshot queries the reference tables
+        self.assertGreater(first.queries, 0)
+        self.assertEqual(first.cache["reference_snapshot"], {"hits": 0, "misses": 1})
+        self.assertEqual(first.cache["brand_rules"], {"hits": 0, "misses": 1})
+        self.assertEqual(first.cache["parse_memo"], {"hits": 0, "misses": 1})
+
+        second = ParseTrace()
+        parse_car_info("BMW X5 xDrive40d", db.session, trace=second)
+        self.assertEqual(second.queries, 0)
+        self.assertEqual(second.cache["reference_snapshot"], {"hits": 1, "misses": 0})
+        self.assertEqual(second.cache["brand_rules"], {"hits": 1, "misses": 0})
+
+        repeated = ParseTrace()
+        self.assertEqual(parse_car_info("BMW X5 xDrive30d M Sport", db.session, trace=repeated), result)
+        self.assertEqual(repeated.cache, {"parse_memo": {"hits": 1, "misses": 0}})
+        self.assertEqual(repeated.stages, {})
+
+    def test_untraced_queries_are_not_counted(self):
+        trace = ParseTrace()
+        parse_car_info("BMW X5", db.session, trace=trace)
+        queries = trace.queries
+        invalidate_reference_snapshot()
+        parse_car_info("BMW X5", db.session)
+        self.assertEqual(trace.queries, queries)
+
+    def test_record_logs_one_json_line(self):
+        trace = ParseTrace("BMW X5")
+        parse_car_info(trace.text, db.session, trace=trace)
+        with self.assertLogs(parse_trace.logger.name, level="INFO") as logs:
+            parse_trace.record_parse_trace(trace)
+        self.assertEqual(len(logs.records), 1)
+        line = logs.records[0].getMessage()
+        self.assertTrue(line.startswith("parse_trace "))
+        self.assertEqual(json.loads(line[len("parse_trace "):])["text"], "BMW X5")
+
+
+class TestParseTraceStats(unittest.TestCase):
+
+    def make_trace(self, brand_ms, queries=0):
+        trace = ParseTrace()
+        trace.stages = {"brand": brand_ms}
+        trace.queries = queries
+        trace.cache_result("brand_rules", hit=brand_ms < 10)
+        trace.total_ms = brand_ms
+        return trace
+
+    def test_rolling_window_and_buckets(self):
+        stats = ParseTraceStats(window=3)
+        for brand_ms in (0.5, 20, 3, 7000):
+            stats.add(self.make_trace(brand_ms, queries=2))
+
+        summary = stats.stats()
+        self.assertEqual(summary["traces"], 4)
+        brand = summary["stages"]["brand"]
+        # 0.5 ms fell out of the window
+        self.assertEqual(brand["count"], 3)
+        self.assertEqual(brand["max_ms"], 7000)
+        self.assertEqual(brand["p50_ms"], 20)
+        self.assertEqual((brand["buckets"]["le_5"], brand["buckets"]["le_50"], brand["buckets"]["inf"]), (1, 1, 1))
+        self.assertEqual(summary["avg_queries"], 2)
+        self.assertEqual(summary["cache"]["brand_rules"], {"hits": 2, "misses": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
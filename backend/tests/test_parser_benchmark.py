@@ -0,0 +1,79 @@
+"""
+Test the parser benchmark harness and its regression gate
+"""
+import unittest
+
+from backend.benchmarks.parser_pipeline import (
+    STAGES, best_of, compare_to_baseline, create_app, generate_corpus, run_benchmark, seed_database
+)
+from backend.db import db
+from backend.models import Brand, BrandTrim
+
+
+class TestRegressionGate(unittest.TestCase):
+
+    baseline = {'parse_car_info': {'p50_ms': 1.0, 'p95_ms': 4.0, 'listings_per_sec': 1000.0}}
+
+    def test_within_threshold(self):
+        results = {'parse_car_info': {'p50_ms': 1.2, 'p95_ms': 3.0, 'listings_per_sec': 850.0}}
+        self.assertEqual(compare_to_baseline(results, self.baseline, 0.25), [])
+
+    def test_slower_latency_and_throughput(self):
+        results = {'parse_car_info': {'p50_ms': 1.5, 'p95_ms': 4.0, 'listings_per_sec': 700.0}}
+        regressions = compare_to_baseline(results, self.baseline, 0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('parse_car_info p50_ms'))
+        self.assertTrue(regressions[1].startswith('parse_car_info listings_per_sec'))
+
+    def test_small_absolute_changes_are_ignored(self):
+        baseline = {'normalize_car': {'p50_ms': 0.030, 'p95_ms': 0.060, 'listings_per_sec': 50000.0}}
+        results = {'normalize_car': {'p50_ms': 0.038, 'p95_ms': 0.120, 'listings_per_sec': 35000.0}}
+        regressions = compare_to_baseline(results, baseline, 0.25, min_delta_ms=0.01)
+        # +8 µs p50 and +9 µs per listing are noise; +60 µs p95 is not
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('normalize_car p95_ms'))
+
+    def test_best_of_repeats(self):
+        best = best_of([
+            {'count': 3, 'p50_ms': 2.0, 'p95_ms': 3.0, 'p99_ms': 9.0, 'listings_per_sec': 400.0},
+            {'count': 3, 'p50_ms': 1.0, 'p95_ms': 5.0, 'p99_ms': 6.0, 'listings_per_sec': 500.0},
+        ])
+        self.assertEqual(best, {'count': 3, 'p50_ms': 1.0, 'p95_ms': 3.0, 'p99_ms': 6.0, 'listings_per_sec': 500.0})
+
+    def test_new_stage_is_not_gated(self):
+        results = {'normalize_car': {'p50_ms': 9.0, 'p95_ms': 9.0, 'listings_per_sec': 1.0}}
+        self.assertEqual(compare_to_baseline(results, self.baseline, 0.25), [])
+
+
+class TestSeededRun(unittest.TestCase):
+
+    def setUp(self):
+        self.app = create_app()
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_seed_corpus_and_stages(self):
+        seed_database(db.session)
+        self.assertGreater(Brand.query.count(), 50)
+        self.assertGreater(BrandTrim.query.count(), 100)
+
+        corpus = generate_corpus(db.session, 200, seed=1)
+        self.assertEqual(len(corpus), 200)
+        self.assertEqual(corpus, generate_corpus(db.session, 200, seed=1))
+
+        results = run_benchmark(db.session, corpus, warmup=10, repeats=2)
+        self.assertEqual(set(results), set(STAGES))
+        self.assertEqual(results['parse_car_info']['count'], 200)
+        for stats in results.values():
+            self.assertLessEqual(stats['p50_ms'], stats['p95_ms'])
+            self.assertLessEqual(stats['p95_ms'], stats['p99_ms'])
+
+
+if __name__ == "__main__":
+    unittest.main()
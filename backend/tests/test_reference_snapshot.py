@@ -0,0 +1,83 @@
+"""
+Test the cached reference snapshot used by the car parser
+"""
+import unittest
+
+from flask import Flask
+
+from backend.db import db
+from backend.models import Brand, BrandSynonym, BrandModel, BrandTrim
+from backend.utils.car_parser import get_all_brands_with_synonyms, get_brand_models, get_brand_trims
+from backend.utils.reference_snapshot import get_reference_snapshot, invalidate_reference_snapshot
+
+
+class TestReferenceSnapshot(unittest.TestCase):
+    """Snapshot must be reused until reference rows change"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+
+        brand = Brand(name="BMW", slug="bmw")
+        db.session.add(brand)
+        db.session.flush()
+        db.session.add_all([
+            BrandSynonym(name="бмв", brand_id=brand.id),
+            BrandModel(name="X5", brand_id=brand.id),
+            BrandTrim(name="M Sport", brand_id=brand.id),
+        ])
+        db.session.commit()
+        self.brand_id = brand.id
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def test_lookups_read_from_snapshot(self):
+        self.assertEqual(get_all_brands_with_synonyms(db.session), ["BMW", "бмв"])
+        self.assertEqual(get_brand_models("BMW", db.session), ["X5"])
+        self.assertEqual(get_brand_trims("BMW", db.session), ["M Sport", "Standard"])
+        self.assertEqual(get_brand_models("Audi", db.session), [])
+
+    def test_snapshot_is_reused_until_rows_change(self):
+        snapshot = get_reference_snapshot(db.session)
+        self.assertIs(get_reference_snapshot(db.session), snapshot)
+
+        db.session.add(BrandModel(name="X3", brand_id=self.brand_id))
+        db.session.commit()
+
+        reloaded = get_reference_snapshot(db.session)
+        self.assertIsNot(reloaded, snapshot)
+        self.assertEqual(reloaded.get_brand("BMW").models, ("X5", "X3"))
+
+    def test_uncommitted_rows_do_not_invalidate(self):
+        snapshot = get_reference_snapshot(db.session)
+        db.session.add(BrandModel(name="X3", brand_id=self.brand_id))
+        db.session.flush()
+        # Flushed but not committed: other sessions cannot see the row yet
+        self.assertIs(get_reference_snapshot(db.session), snapshot)
+
+        db.session.rollback()
+        self.assertIs(get_reference_snapshot(db.session), snapshot)
+
+        db.session.add(BrandModel(name="X1", brand_id=self.brand_id))
+        db.session.commit()
+        self.assertEqual(get_reference_snapshot(db.session).get_brand("BMW").models, ("X5", "X1"))
+
+    def test_explicit_invalidation(self):
+        snapshot = get_reference_snapshot(db.session)
+        invalidate_reference_snapshot()
+        self.assertIsNot(get_reference_snapshot(db.session), snapshot)
+
+    def test_session_is_required(self):
+        with self.assertRaises(ValueError):
+            get_reference_snapshot(None)
+
+
+if __name__ == "__main__":
+    unittest.main()
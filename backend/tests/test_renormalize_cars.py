@@ -0,0 +1,128 @@
+"""
+Test the renormalize-cars CLI command
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from flask import Flask
+
+from backend.commands import renormalize_cars, renormalize_rows
+from backend.db import db
+from backend.models import Brand, BrandTrim, Car, ModificationUsage
+
+
+def create_app(database_uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    app.cli.add_command(renormalize_cars)
+    return app
+
+
+def seed(session):
+    bmw = Brand(name="BMW", slug="bmw")
+    session.add(bmw)
+    session.flush()
+    session.add(BrandTrim(name="M Sport", brand_id=bmw.id))
+    session.add_all([
+        # Imported before "M Sport" was a known trim
+        Car(model="X5", price=1, brand=bmw, modification="xDrive30d M Sport", trim="Standard", engine="3.0d"),
+        # Already normalized
+        Car(model="X3", price=1, brand=bmw, modification="xDrive 20 i", trim="M Sport", engine="2.0"),
+        # Blank engine is filled in from the modification
+        Car(model="X1", price=1, brand=bmw, modification="2.0T", trim="M Sport", engine=""),
+        # Nothing to derive from
+        Car(model="i3", price=1, brand=bmw, modification="", trim="", engine=""),
+    ])
+    session.commit()
+
+
+class TestRenormalizeCars(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.directory.name, 'checkpoint.json')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_command(self, app, *args):
+        result = app.test_cli_runner().invoke(args=['renormalize-cars', '--checkpoint', self.checkpoint, *args])
+        self.assertEqual(result.exit_code, 0, result.output)
+        return result.output
+
+    def cars(self):
+        return {car.model: (car.modification, car.trim, car.engine) for car in Car.query.order_by(Car.id)}
+
+    def test_renormalize_rows(self):
+        app = create_app('sqlite://')
+        with app.app_context():
+            db.create_all()
+            seed(db.session)
+            rows = [(car.id, car.brand.name, car.model, car.modification, car.trim, car.engine)
+                    for car in Car.query.order_by(Car.id)]
+            changes = dict(renormalize_rows(rows, db.session))
+
+        self.assertEqual(changes[1], {'modification': ("xDrive30d M Sport", "xDrive 30 d"),
+                                      'trim': ("Standard", "M Sport")})
+        self.assertEqual(changes[3], {'modification': ("2.0T", "2.0 T"), 'engine': ("", "2.0T gasoline")})
+        self.assertNotIn(2, changes)
+        self.assertNotIn(4, changes)
+
+    def test_dry_run_then_update(self):
+        app = create_app('sqlite://')
+        with app.app_context():
+            db.create_all()
+            seed(db.session)
+            before = self.cars()
+
+            output = self.run_command(app, '--workers', '1', '--dry-run')
+            self.assertIn("#1 trim: 'Standard' -> 'M Sport'", output)
+            self.assertEqual(self.cars(), before)
+            self.assertFalse(os.path.exists(self.checkpoint))
+
+            output = self.run_command(app, '--workers', '1', '--chunk-size', '2')
+            self.assertIn("4/4 cars, 2 changed", output)
+            cars = self.cars()
+            self.assertEqual(cars["X5"], ("xDrive 30 d", "M Sport", "3.0d"))
+            self.assertEqual(cars["X1"], ("2.0 T", "M Sport", "2.0T gasoline"))
+            self.assertEqual(cars["X3"], before["X3"])
+            # The bulk updates are followed by a rebuild of the modification index
+            self.assertEqual(sorted(row.normalized for row in ModificationUsage.query),
+                             ["2.0 t", "xdrive 20 i", "xdrive 30 d"])
+            # A finished run removes its checkpoint
+            self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_from_checkpoint(self):
+        app = create_app('sqlite://')
+        with app.app_context():
+            db.create_all()
+            seed(db.session)
+            with open(self.checkpoint, 'w', encoding='utf-8') as checkpoint_file:
+                json.dump({'last_id': 1, 'processed': 1, 'changed': 0}, checkpoint_file)
+
+            output = self.run_command(app, '--workers', '1', '--resume')
+            self.assertIn("Re-normalizing 3 cars after id 1", output)
+            cars = self.cars()
+            # The car before the checkpoint is left alone
+            self.assertEqual(cars["X5"], ("xDrive30d M Sport", "Standard", "3.0d"))
+            self.assertEqual(cars["X1"][2], "2.0T gasoline")
+
+    def test_worker_processes(self):
+        app = create_app(f"sqlite:///{os.path.join(self.directory.name, 'cars.db')}")
+        with app.app_context():
+            db.create_all()
+            seed(db.session)
+
+            output = self.run_command(app, '--workers', '2', '--chunk-size', '1')
+            self.assertIn("4 cars processed, 2 changed", output)
+            self.assertEqual(self.cars()["X5"], ("xDrive 30 d", "M Sport", "3.0d"))
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    unittest.main()
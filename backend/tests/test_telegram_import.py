@@ -0,0 +1,114 @@
+"""
+Test running Telegram car imports in the import executor
+"""
+import os
+import sys
+import tempfile
+import time
+import unittest
+from functools import partial
+from unittest.mock import patch
+
+from flask import Flask
+from sqlalchemy import create_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+# Some of the modules telegram_import uses import their siblings as utils.*
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.db import db
+from backend.models import Car, CarImage, ImageTask, ImportJob
+from backend.utils.import_executor import ImportExecutor
+from backend.utils.telegram_import import process_import_job
+
+LISTING = {"brand": "BMW", "model": "X5", "price": 100, "image_file_ids": ["main", "side", "rear"]}
+
+
+def create_app(database_uri):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+
+def reupload(url, car_id=None, car_name=None, car_brand=None, is_main_img=False, image_index=None, app=None):
+    return f"https://res.cloudinary.com/cars/{car_id}-{'main' if is_main_img else image_index}.webp"
+
+
+@patch('backend.utils.telegram_import.get_telegram_file_url', lambda file_id: f"https://t.me/file/{file_id}.jpg")
+class TestProcessImportJob(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        database_uri = f"sqlite:///{os.path.join(self.directory.name, 'cars.db')}"
+        self.app = create_app(database_uri)
+        with self.app.app_context():
+            db.create_all()
+        self.engine = create_engine(database_uri)
+        self.sessions = scoped_session(sessionmaker(bind=self.engine))
+        self.given_up = []
+
+    def tearDown(self):
+        self.sessions.remove()
+        self.engine.dispose()
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.directory.cleanup()
+
+    def run_import(self, data, chat_id=5):
+        """Submit an import and wait until the executor's worker thread finishes it"""
+        executor = ImportExecutor(partial(process_import_job, self.app), self.sessions, workers=1,
+                                  poll_interval=0.05,
+                                  on_give_up=lambda job, error: self.given_up.append(error)).start()
+        try:
+            job_id = executor.submit(dict(data, chat_id=chat_id), chat_id)
+            deadline = time.monotonic() + 10
+            while self.job(job_id).status not in ('done', 'failed') and time.monotonic() < deadline:
+                time.sleep(0.05)
+        finally:
+            executor.shutdown(timeout=5)
+        return self.job(job_id)
+
+    def job(self, job_id):
+        session = self.sessions()
+        session.expire_all()
+        return session.get(ImportJob, job_id)
+
+    @patch('backend.utils.telegram_import.send_telegram_message')
+    @patch('backend.utils.telegram_import.download_and_reupload', side_effect=reupload)
+    def test_imports_car_from_worker_thread(self, download_and_reupload, send_telegram_message):
+        job = self.run_import(LISTING)
+
+        self.assertEqual((job.status, job.stage, job.attempts), ('done', 'notified', 1))
+        self.assertEqual(self.given_up, [])
+        with self.app.app_context():
+            car = db.session.get(Car, job.car_id)
+            self.assertEqual(car.image_url, f"https://res.cloudinary.com/cars/{car.id}-main.webp")
+            self.assertEqual([image.url for image in CarImage.query.order_by(CarImage.position)],
+                             [f"https://res.cloudinary.com/cars/{car.id}-{index}.webp" for index in (1, 2)])
+            task = ImageTask.query.one()
+            self.assertEqual((task.task_id, task.status), (job.state['ai_task_id'], 'pending'))
+            self.assertEqual(task.params['image_url'], car.image_url)
+            self.assertNotIn('app', task.params)
+        send_telegram_message.assert_called_once()
+        self.assertIn("✅ Автомобиль успешно добавлен!", send_telegram_message.call_args[0][1])
+
+    @patch('backend.utils.telegram_import.send_telegram_message',
+           side_effect=[ConnectionError("telegram is down"), True])
+    @patch('backend.utils.telegram_import.download_and_reupload', side_effect=reupload)
+    def test_resumes_from_saved_stage(self, download_and_reupload, send_telegram_message):
+        job = self.run_import(LISTING)
+
+        # The second attempt only sends the message, the checkpointed stages are not run again
+        self.assertEqual((job.status, job.stage, job.attempts), ('done', 'notified', 2))
+        self.assertEqual(self.given_up, [])
+        self.assertEqual(download_and_reupload.call_count, 3)
+        self.assertEqual(send_telegram_message.call_count, 2)
+        with self.app.app_context():
+            self.assertEqual((Car.query.count(), CarImage.query.count(), ImageTask.query.count()), (1, 2, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
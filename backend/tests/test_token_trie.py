@@ -0,0 +1,61 @@
+"""
+Test the token trie against the per-trim regex loop it replaces in normalize_car
+"""
+import re
+import unittest
+
+from backend.utils.token_trie import TokenTrie, remove_spans
+
+
+def naive_strip(names, text):
+    """The original normalize_car trim pass"""
+    for name in sorted(names, key=len, reverse=True):
+        pattern = r'\b' + re.escape(name) + r'\b'
+        if re.search(pattern, text, re.IGNORECASE):
+            return name, re.sub(pattern, '', text, flags=re.IGNORECASE).strip()
+    return None
+
+
+class TestTokenTrie(unittest.TestCase):
+    """Trie must find and strip exactly what the regex loop did"""
+
+    NAMES = [
+        "Sport", "M Sport", "M Sport Pro", "R-Line", "Luxury", "xLine", "Standard",
+        "Престиж", "A A", "Sport+", "(Ruiyi)",
+    ]
+
+    def strip(self, trie, text):
+        match = trie.find_best(text)
+        if not match:
+            return None
+        return match[0], remove_spans(text, match[1]).strip()
+
+    def test_matches_naive_loop(self):
+        texts = [
+            "xDrive30d M Sport Pro",
+            "2.0 TSI r-line 4Motion",
+            "Sportback 35 TFSI",
+            "M  Sport 2.0",
+            "sport Sport SPORT",
+            "A A A A",
+            "3.0 Sport+ AT",
+            "1.5T (Ruiyi) Luxury",
+            "ПРЕСТИЖ 2.5",
+            "xLine-Luxury",
+            "",
+        ]
+        trie = TokenTrie(self.NAMES)
+        for text in texts:
+            self.assertEqual(self.strip(trie, text), naive_strip(self.NAMES, text), f"Mismatch for: {text!r}")
+
+    def test_all_occurrences(self):
+        trie = TokenTrie(["Sport", "M Sport"])
+        self.assertEqual(trie.find_all("M Sport sport"), [(0, 0, 7), (1, 2, 7), (1, 8, 13)])
+        self.assertEqual(trie.search("M Sport sport"), "M Sport")
+
+    def test_empty_trie(self):
+        self.assertIsNone(TokenTrie([]).find_best("M Sport"))
+
+
+if __name__ == "__main__":
+    unittest.main()
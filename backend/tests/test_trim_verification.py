@@ -0,0 +1,104 @@
+"""
+Test concurrent trim verification against (stub) external catalogs
+"""
+import threading
+import time
+import unittest
+
+from flask import Flask
+
+from backend.utils import car_parser
+
+
+def stub_provider(answer, delay=0.0, calls=None):
+    """Provider that answers after a delay, optionally recording its calls"""
+    def check(brand, model, trim_candidate):
+        if calls is not None:
+            calls.append((brand, model, trim_candidate))
+        time.sleep(delay)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+    return check
+
+
+class TestVerifyTrimCandidate(unittest.TestCase):
+    """All providers are asked at once; the first positive answer wins"""
+
+    def tearDown(self):
+        car_parser.staged_trims().clear()
+
+    def test_first_positive_answer_wins(self):
+        providers = [
+            ("slow", stub_provider(True, delay=1.0)),
+            ("fast", stub_provider(True, delay=0.05)),
+        ]
+        started = time.monotonic()
+        self.assertEqual(car_parser.verify_trim_candidate("BMW", "X5", "xLine", providers, deadline=2), "fast")
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(car_parser.staged_trims(), [{"brand": "BMW", "trim": "xLine", "source": "fast"}])
+
+    def test_negative_answer_waits_for_others(self):
+        providers = [
+            ("no", stub_provider(False)),
+            ("broken", stub_provider(RuntimeError("boom"))),
+            ("yes", stub_provider(True, delay=0.1)),
+        ]
+        self.assertEqual(car_parser.verify_trim_candidate("BMW", "X5", "xLine", providers, deadline=2), "yes")
+
+    def test_deadline(self):
+        providers = [
+            ("no", stub_provider(False)),
+            ("hanging", stub_provider(True, delay=1.0)),
+        ]
+        started = time.monotonic()
+        self.assertIsNone(car_parser.verify_trim_candidate("BMW", "X5", "xLine", providers, deadline=0.2))
+        self.assertLess(time.monotonic() - started, 0.6)
+        self.assertEqual(car_parser.staged_trims(), [])
+
+    def test_providers_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=1)
+
+        def check(brand, model, trim_candidate):
+            # Only passes if all three providers are running at the same time
+            barrier.wait()
+            return False
+
+        providers = [(str(index), check) for index in range(3)]
+        self.assertIsNone(car_parser.verify_trim_candidate("BMW", "X5", "xLine", providers, deadline=2))
+        self.assertFalse(barrier.broken)
+
+    def test_providers_see_app_config(self):
+        app = Flask(__name__)
+        app.config["TRIM_STUB_ANSWER"] = True
+
+        def check(brand, model, trim_candidate):
+            from flask import current_app
+            return current_app.config["TRIM_STUB_ANSWER"]
+
+        with app.app_context():
+            self.assertEqual(car_parser.verify_trim_candidate("BMW", "X5", "xLine", [("config", check)]), "config")
+
+    def test_normalize_car_uses_verification(self):
+        calls = []
+        original = car_parser.TRIM_VERIFICATION_ENABLED, dict(car_parser.TRIM_PROVIDERS), \
+            car_parser.TRIM_VERIFICATION_PROVIDERS
+        car_parser.TRIM_VERIFICATION_ENABLED = True
+        car_parser.TRIM_PROVIDERS.clear()
+        car_parser.TRIM_PROVIDERS["stub"] = stub_provider(True, calls=calls)
+        car_parser.TRIM_VERIFICATION_PROVIDERS = "stub"
+        try:
+            # No known trims, so only the catalogs can confirm "Zorro"
+            result = car_parser._normalize_with_rules("Zeekr", "001", "100kWh Zorro", car_parser.BrandRules(None))
+        finally:
+            car_parser.TRIM_VERIFICATION_ENABLED, providers, car_parser.TRIM_VERIFICATION_PROVIDERS = original
+            car_parser.TRIM_PROVIDERS.clear()
+            car_parser.TRIM_PROVIDERS.update(providers)
+
+        self.assertEqual(calls, [("Zeekr", "001", "Zorro")])
+        self.assertEqual(result["trim"], "Zorro")
+        self.assertEqual(result["modification"], "100 kWh")
+
+
+if __name__ == "__main__":
+    unittest.main()
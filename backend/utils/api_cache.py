@@ -0,0 +1,315 @@
+"""
+Two-tier cache for external car API lookups (CarQuery, CarAPI).
+
+- MemoryCache: per-process LRU with TTL and a size limit.
+- SQLiteCache: file shared by all processes (gunicorn workers) on one host,
+  so results survive restarts and deploys.
+- TieredCache: reads memory first, then disk (promoting disk hits), and
+  writes both. Negative results (404 / empty answers) are cached with their
+  own, shorter TTL so they are retried sooner than positive ones.
+
+The process-wide cache is configured from the environment and can be
+replaced with set_api_cache() (e.g. with a memory-only cache in tests).
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+API_CACHE_TTL = int(os.getenv("API_CACHE_TTL", str(7 * 24 * 3600)))
+API_CACHE_NEGATIVE_TTL = int(os.getenv("API_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+API_CACHE_MEMORY_ENTRIES = int(os.getenv("API_CACHE_MEMORY_ENTRIES", "1024"))
+API_CACHE_DISK_ENTRIES = int(os.getenv("API_CACHE_DISK_ENTRIES", "50000"))
+# Empty string disables the disk tier
+API_CACHE_PATH = os.getenv(
+    "API_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'api_results.sqlite')
+)
+
+# Returned by get() when there is no fresh entry, since None can be a cached value
+MISS = object()
+
+
+class MemoryCache:
+    """Thread-safe LRU cache whose entries expire after their TTL"""
+
+    def __init__(self, max_entries=API_CACHE_MEMORY_ENTRIES, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISS, False
+            value, expires_at, negative = entry
+            if expires_at <= self.clock():
+                del self._entries[key]
+                return MISS, False
+            self._entries.move_to_end(key)
+            return value, negative
+
+    def set(self, key, value, ttl, negative=False):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + ttl, negative)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    JSON values in an SQLite file, shared by processes on the same host.
+
+    Every thread uses its own connection; WAL mode lets readers in other
+    processes proceed while one process writes.
+    """
+
+    def __init__(self, path=API_CACHE_PATH, max_entries=API_CACHE_DISK_ENTRIES, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self.clock = clock
+        self.evictions = 0
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS api_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " negative INTEGER NOT NULL DEFAULT 0,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_api_cache_accessed_at ON api_cache (accessed_at)")
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (value or MISS, negative flag, expiry timestamp or None)
+        """
+        now = self.clock()
+        with self._connection() as connection:
+            row = connection.execute(
+                "SELECT value, negative, expires_at FROM api_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return MISS, False, None
+            value, negative, expires_at = row
+            if expires_at <= now:
+                connection.execute("DELETE FROM api_cache WHERE key = ?", (key,))
+                return MISS, False, None
+            connection.execute("UPDATE api_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value), bool(negative), expires_at
+
+    def set(self, key, value, ttl, negative=False):
+        now = self.clock()
+        with self._connection() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO api_cache (key, value, negative, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), int(negative), now + ttl, now)
+            )
+            count = connection.execute("SELECT COUNT(*) FROM api_cache").fetchone()[0]
+            if count > self.max_entries:
+                # Drop expired entries first, then the least recently used ones
+                connection.execute("DELETE FROM api_cache WHERE expires_at <= ?", (now,))
+                excess = connection.execute("SELECT COUNT(*) FROM api_cache").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    connection.execute(
+                        "DELETE FROM api_cache WHERE key IN "
+                        "(SELECT key FROM api_cache ORDER BY accessed_at LIMIT ?)", (excess,)
+                    )
+                    self.evictions += excess
+
+    def delete(self, key):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM api_cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute("DELETE FROM api_cache")
+
+    def __len__(self):
+        with self._connection() as connection:
+            return connection.execute("SELECT COUNT(*) FROM api_cache").fetchone()[0]
+
+
+class TieredCache:
+    """Memory tier in front of an optional shared disk tier, with hit-rate counters"""
+
+    def __init__(self, memory=None, disk=None, ttl=API_CACHE_TTL, negative_ttl=API_CACHE_NEGATIVE_TTL):
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'negative_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'negative_sets': 0,
+            'disk_errors': 0,
+        }
+
+    @staticmethod
+    def _key(namespace, key):
+        return f"{namespace}:{key}"
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, namespace, key):
+        """
+        Get a cached value.
+
+        Args:
+            namespace (str): Cache namespace, e.g. the API name
+            key (str): Key within the namespace
+
+        Returns:
+            The cached value, or MISS if there is no fresh entry
+        """
+        full_key = self._key(namespace, key)
+
+        value, negative = self.memory.get(full_key)
+        if value is not MISS:
+            self._count('memory_hits')
+            if negative:
+                self._count('negative_hits')
+            return value
+
+        if self.disk is not None:
+            try:
+                value, negative, expires_at = self.disk.get(full_key)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ API cache disk read failed: {e}")
+                self._count('disk_errors')
+                value = MISS
+            if value is not MISS:
+                self._count('disk_hits')
+                if negative:
+                    self._count('negative_hits')
+                # Promote to the memory tier for the rest of the entry's lifetime
+                self.memory.set(full_key, value, expires_at - self.disk.clock(), negative)
+                return value
+
+        self._count('misses')
+        return MISS
+
+    def set(self, namespace, key, value, negative=False):
+        """
+        Cache a value.
+
+        Args:
+            namespace (str): Cache namespace, e.g. the API name
+            key (str): Key within the namespace
+            value: JSON-serializable value
+            negative (bool): True for "not found" results, which expire after negative_ttl
+        """
+        full_key = self._key(namespace, key)
+        ttl = self.negative_ttl if negative else self.ttl
+
+        self.memory.set(full_key, value, ttl, negative)
+        if self.disk is not None:
+            try:
+                self.disk.set(full_key, value, ttl, negative)
+            except sqlite3.Error as e:
+                logger.warning(f"⚠️ API cache disk write failed: {e}")
+                self._count('disk_errors')
+        self._count('negative_sets' if negative else 'sets')
+
+    def delete(self, namespace, key):
+        full_key = self._key(namespace, key)
+        self.memory.delete(full_key)
+        if self.disk is not None:
+            self.disk.delete(full_key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self):
+        """Get hit/miss counters, hit ratio and tier sizes"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 4) if lookups else None
+        stats['memory_entries'] = len(self.memory)
+        stats['memory_evictions'] = self.memory.evictions
+        if self.disk is not None:
+            try:
+                stats['disk_entries'] = len(self.disk)
+            except sqlite3.Error:
+                stats['disk_entries'] = None
+            stats['disk_evictions'] = self.disk.evictions
+        return stats
+
+
+_api_cache = None
+_api_cache_lock = threading.Lock()
+
+
+def get_api_cache():
+    """Get the process-wide API cache, creating it from the environment on first use"""
+    global _api_cache
+    if _api_cache is None:
+        with _api_cache_lock:
+            if _api_cache is None:
+                disk = None
+                if API_CACHE_PATH:
+                    try:
+                        disk = SQLiteCache(API_CACHE_PATH)
+                    except (OSError, sqlite3.Error) as e:
+                        logger.warning(f"⚠️ API cache disk tier disabled ({API_CACHE_PATH}): {e}")
+                _api_cache = TieredCache(disk=disk)
+    return _api_cache
+
+
+def set_api_cache(cache):
+    """Replace the process-wide API cache (any object with TieredCache's interface)"""
+    global _api_cache
+    with _api_cache_lock:
+        _api_cache = cache
@@ -0,0 +1,101 @@
+"""
+Compiled multi-pattern matcher used by the car parser.
+
+Instead of compiling and running one word-bounded regex per brand/synonym,
+all names are folded into a single alternation that is compiled once and
+scanned over the input in one pass.
+"""
+
+import re
+
+
+class LongestMatchPattern:
+    """
+    Find the longest of a set of names that occurs in a text as a whole word.
+
+    The result is the same as trying ``r'\\b' + re.escape(name) + r'\\b'`` with
+    ``re.IGNORECASE`` for every name, longest first, and stopping at the first
+    name that matches: names are ordered exactly like
+    ``sorted(names, key=len, reverse=True)`` and every name gets its own
+    capturing group, so the group of a match tells the name's priority.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(sorted((name for name in names if name), key=len, reverse=True))
+
+        # Capturing group number -> priority rank (index into self.names)
+        self._group_ranks = []
+        if self.names:
+            alternatives = []
+            for first_chars, ranks in self._group_by_first_char():
+                groups = []
+                for rank in ranks:
+                    groups.append('(' + re.escape(self.names[rank]) + ')')
+                    self._group_ranks.append(rank)
+                # The cheap first-character guard skips the whole group at
+                # positions where none of its names can start
+                guard = '|'.join(re.escape(char) for char in first_chars)
+                alternatives.append('(?=' + guard + ')(?:' + '|'.join(groups) + ')')
+            # The lookahead makes every match zero-width, so finditer reports a
+            # candidate at every word boundary instead of skipping over text that
+            # was consumed by a shorter, lower-priority name.
+            self._pattern = re.compile(r'(?=\b(?:' + '|'.join(alternatives) + r')\b)', re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def _group_by_first_char(self):
+        """
+        Group name ranks by first character.
+
+        Characters that match each other case-insensitively share a group, so
+        at any position at most one group can match and, inside it, names are
+        tried in priority order.
+        """
+        groups = []
+        for rank, name in enumerate(self.names):
+            char = name[0]
+            for first_chars, ranks in groups:
+                if any(re.fullmatch(re.escape(other), char, re.IGNORECASE)
+                       or re.fullmatch(re.escape(char), other, re.IGNORECASE)
+                       for other in first_chars):
+                    if char not in first_chars:
+                        first_chars.append(char)
+                    ranks.append(rank)
+                    break
+            else:
+                groups.append(([char], [rank]))
+        return groups
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, text):
+        """
+        Find the highest-priority name in the text.
+
+        Args:
+            text (str): Text to search in
+
+        Returns:
+            tuple or None: (name, start, end) of the first occurrence of the
+            longest matching name, or None if no name occurs in the text
+        """
+        if self._pattern is None or not text:
+            return None
+
+        best_rank = None
+        best_match = None
+        for match in self._pattern.finditer(text):
+            rank = self._group_ranks[match.lastindex - 1]
+            if best_rank is None or rank < best_rank:
+                best_rank = rank
+                best_match = match
+                if rank == 0:
+                    # Nothing can beat the longest name
+                    break
+
+        if best_match is None:
+            return None
+
+        group = best_match.lastindex
+        return self.names[best_rank], best_match.start(group), best_match.end(group)
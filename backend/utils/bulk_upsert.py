@@ -0,0 +1,86 @@
+"""
+Bulk "insert if missing" for reference tables.
+
+Rows are written with a single ``INSERT ... ON CONFLICT DO NOTHING`` statement
+on PostgreSQL and SQLite, so the unique constraints on the tables replace
+per-row existence checks. Other databases fall back to one SELECT of the
+existing keys followed by one plain INSERT.
+"""
+
+from sqlalchemy import insert, tuple_
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+
+def _dialect_insert(dialect_name):
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        return dialect_insert
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        return dialect_insert
+    return None
+
+
+def insert_ignore(db_session, model, rows, unique_keys):
+    """
+    Insert rows into a table, skipping rows that would violate a unique constraint.
+
+    The statement is executed in the session's transaction; committing is
+    left to the caller.
+
+    Args:
+        db_session: SQLAlchemy session
+        model: Mapped model class of the table
+        rows (list): Dicts of column values
+        unique_keys (list): Tuples of column names, one per unique constraint of
+            the table. The first one identifies inserted rows in the result.
+
+    Returns:
+        list: Values of the first unique key (as tuples) of the rows that were inserted
+    """
+    key_columns = unique_keys[0]
+
+    # Duplicates inside one batch would only be rejected by the database
+    seen = [set() for _ in unique_keys]
+    unique_rows = []
+    for row in rows:
+        keys = [tuple(row[column] for column in unique_key) for unique_key in unique_keys]
+        if any(key in seen_keys for key, seen_keys in zip(keys, seen)):
+            continue
+        for key, seen_keys in zip(keys, seen):
+            seen_keys.add(key)
+        unique_rows.append(row)
+
+    if not unique_rows:
+        return []
+
+    table = model.__table__
+    returning = [table.c[column] for column in key_columns]
+    dialect_insert = _dialect_insert(db_session.get_bind().dialect.name)
+
+    if dialect_insert is not None:
+        statement = dialect_insert(table).on_conflict_do_nothing().returning(*returning)
+        return [tuple(row) for row in db_session.execute(statement, unique_rows)]
+
+    # Generic fallback: drop rows whose keys already exist, then insert the rest
+    for unique_key in unique_keys:
+        columns = [table.c[column] for column in unique_key]
+        wanted = [tuple(row[column] for column in unique_key) for row in unique_rows]
+        existing = {tuple(row) for row in db_session.execute(
+            table.select().with_only_columns(*columns).where(tuple_(*columns).in_(wanted))
+        )}
+        unique_rows = [
+            row for row, key in zip(unique_rows, wanted)
+            if key not in existing
+        ]
+        if not unique_rows:
+            return []
+
+    db_session.execute(insert(table), unique_rows)
+    return [tuple(row[column] for column in key_columns) for row in unique_rows]
@@ -5,6 +5,10 @@ and converting it to [Brand] [Model] [Modification] [Trim] format.
 
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from itertools import islice
 
 import requests
 
@@ -15,12 +19,127 @@ except ImportError:
     from utils.file_logger import get_module_logger
 logger = get_module_logger(__name__)
 
-# Keep track of new trims and modifications for database persistence
-NEW_TRIMS = []
-NEW_MODIFICATIONS = []
+try:
+    from backend.utils.brand_matcher import LongestMatchPattern
+    from backend.utils.reference_snapshot import (get_reference_snapshot, get_reference_version,
+                                                  invalidate_reference_snapshot)
+    from backend.utils.token_trie import TokenTrie, remove_spans
+    from backend.utils.bulk_upsert import insert_ignore
+    from backend.utils.api_cache import get_api_cache, MISS
+    from backend.utils.carapi_client import get_carapi_client, CarAPIAuthError
+    from backend.utils.parse_trace import trace_stage
+    from backend.utils.fuzzy_index import TrigramIndex
+    from backend.utils.name_keys import KeyIndex
+    from backend.utils.parse_memo import get_parse_memo, normalize_listing_text
+    from backend.utils.modification_index import find_used_modifications
+except ImportError:
+    from utils.brand_matcher import LongestMatchPattern
+    from utils.reference_snapshot import get_reference_snapshot, get_reference_version, invalidate_reference_snapshot
+    from utils.token_trie import TokenTrie, remove_spans
+    from utils.bulk_upsert import insert_ignore
+    from utils.api_cache import get_api_cache, MISS
+    from utils.carapi_client import get_carapi_client, CarAPIAuthError
+    from utils.parse_trace import trace_stage
+    from utils.fuzzy_index import TrigramIndex
+    from utils.name_keys import KeyIndex
+    from utils.parse_memo import get_parse_memo, normalize_listing_text
+    from utils.modification_index import find_used_modifications
+
+# New trims and modifications waiting for database persistence, per thread:
+# concurrent imports each save the rows their own parse discovered
+_staging = threading.local()
+
+
+def staged_trims():
+    """Trims discovered by this thread since its last save_new_trims_to_db()"""
+    if not hasattr(_staging, 'trims'):
+        _staging.trims = []
+    return _staging.trims
+
+
+def staged_modifications():
+    """Modifications discovered by this thread since its last save_new_modifications_to_db()"""
+    if not hasattr(_staging, 'modifications'):
+        _staging.modifications = []
+    return _staging.modifications
+
+
+# External trim APIs (overridable for staging / local stubs)
+CARQUERY_API_URL = os.getenv("CARQUERY_API_URL", "https://www.carqueryapi.com/api/0.3/")
+CARAPI_BASE_URL = os.getenv("CARAPI_BASE_URL", "https://carapi.app/api")
+
+# Online verification of unknown trim candidates (off by default: it makes parsing depend on external APIs)
+TRIM_VERIFICATION_ENABLED = os.getenv("TRIM_VERIFICATION_ENABLED", "false").lower() in ("1", "true", "yes")
+# Comma-separated names from TRIM_PROVIDERS
+TRIM_VERIFICATION_PROVIDERS = os.getenv("TRIM_VERIFICATION_PROVIDERS", "carquery,carapi")
+# Overall time budget for one verification, in seconds
+TRIM_VERIFICATION_DEADLINE = float(os.getenv("TRIM_VERIFICATION_DEADLINE", "3"))
+TRIM_VERIFICATION_WORKERS = int(os.getenv("TRIM_VERIFICATION_WORKERS", "8"))
+
+# Number of listings parse_car_info_many() groups by brand at a time
+PARSE_BATCH_CHUNK_SIZE = int(os.getenv("PARSE_BATCH_CHUNK_SIZE", "1000"))
+
+def _insert_brand_rows(db_session, model, entries):
+    """
+    Insert rows of a per-brand reference table with one INSERT ... ON CONFLICT DO NOTHING.
+
+    Brand ids are resolved with one query; rows of unknown brands are skipped
+    and rows that already exist are left untouched by the (name, brand_id)
+    unique constraint.
+
+    Args:
+        db_session: SQLAlchemy session
+        model: BrandModel, BrandTrim or BrandModification
+        entries (list): (brand name, row dict without brand_id) pairs
 
-# Cache for car API results to minimize external API calls
-API_RESULTS_CACHE = {}
+    Returns:
+        list: (brand name, name) of the rows that were inserted
+    """
+    from backend.models import Brand
+
+    brand_names = {brand_name for brand_name, _ in entries}
+    if not brand_names:
+        return []
+    brand_ids = dict(db_session.query(Brand.name, Brand.id).filter(Brand.name.in_(brand_names)))
+
+    rows = []
+    for brand_name, row in entries:
+        brand_id = brand_ids.get(brand_name)
+        if brand_id is None:
+            logger.warning(f"⚠️ Cannot save {model.__tablename__} row '{row['name']}': Brand '{brand_name}' not found")
+            continue
+        rows.append(dict(row, brand_id=brand_id))
+
+    inserted = insert_ignore(db_session, model, rows, [('brand_id', 'name')])
+    brand_names_by_id = {brand_id: brand_name for brand_name, brand_id in brand_ids.items()}
+    return [(brand_names_by_id[brand_id], name) for brand_id, name in inserted]
+
+
+def _save_staged(db_session, model, staged, name_key, label):
+    """Flush a staged_trims() / staged_modifications() list with one bulk insert."""
+    entries = [
+        (item.get('brand'), {"name": item.get(name_key), "source": item.get('source', 'auto_detected')})
+        for item in staged
+        if item.get('brand') and item.get(name_key)
+    ]
+
+    try:
+        added = _insert_brand_rows(db_session, model, entries)
+        db_session.commit()
+    except Exception as e:
+        logger.error(f"❌ Error saving new {label}s: {e}")
+        db_session.rollback()
+        return []
+    finally:
+        # Clear the list after processing
+        staged.clear()
+
+    if added:
+        # Bulk inserts bypass the mapper events that normally do this
+        invalidate_reference_snapshot()
+        for brand_name, name in added:
+            logger.info(f"✅ New {label} added: {name} for {brand_name}")
+    return [name for _, name in added]
 
 
 def save_new_trims_to_db(db_session=None):
@@ -29,52 +148,19 @@ def save_new_trims_to_db(db_session=None):
     
     Args:
         db_session: Optional SQLAlchemy session to use for database operations
+
+    Returns:
+        list: Names of the trims that were added
     """
-    if not NEW_TRIMS:
-        return
+    if not staged_trims():
+        return []
 
     if not db_session:
         logger.warning("⚠️ No database session provided to save_new_trims_to_db")
-        return
-
-    for trim_data in NEW_TRIMS:
-        brand_name = trim_data.get('brand')
-        trim_name = trim_data.get('trim')
-        source = trim_data.get('source', 'auto_detected')
-
-        if not brand_name or not trim_name:
-            continue
-
-        try:
-            # Find the brand
-            brand = db_session.query(Brand).filter(Brand.name == brand_name).first()
-            if not brand:
-                logger.warning(f"⚠️ Cannot save trim: Brand '{brand_name}' not found")
-                continue
+        return []
 
-            # Check if this trim already exists for this brand
-            existing_trim = db_session.query(BrandTrim).filter(
-                BrandTrim.brand_id == brand.id,
-                BrandTrim.name == trim_name
-            ).first()
-
-            if not existing_trim:
-                # Create new brand trim
-                new_trim = BrandTrim(
-                    name=trim_name,
-                    brand_id=brand.id,
-                    source=source
-                )
-                db_session.add(new_trim)
-                db_session.commit()
-                logger.info(f"✅ New trim added: {trim_name} for {brand_name}")
-            else:
-                logger.debug(f"ℹ️ Trim already exists: {trim_name} for {brand_name}")
-        except Exception as e:
-            logger.error(f"❌ Error saving trim {trim_name} for {brand_name}: {e}")
-
-    # Clear the list after processing
-    NEW_TRIMS.clear()
+    from backend.models import BrandTrim
+    return _save_staged(db_session, BrandTrim, staged_trims(), 'trim', 'trim')
 
 
 def save_new_modifications_to_db(db_session=None):
@@ -83,52 +169,19 @@ def save_new_modifications_to_db(db_session=None):
     
     Args:
         db_session: Optional SQLAlchemy session to use for database operations
+
+    Returns:
+        list: Names of the modifications that were added
     """
-    if not NEW_MODIFICATIONS:
-        return
+    if not staged_modifications():
+        return []
 
     if not db_session:
         logger.warning("⚠️ No database session provided to save_new_modifications_to_db")
-        return
-
-    for mod_data in NEW_MODIFICATIONS:
-        brand_name = mod_data.get('brand')
-        mod_name = mod_data.get('modification')
-        source = mod_data.get('source', 'auto_detected')
+        return []
 
-        if not brand_name or not mod_name:
-            continue
-
-        try:
-            # Find the brand
-            brand = db_session.query(Brand).filter(Brand.name == brand_name).first()
-            if not brand:
-                logger.warning(f"⚠️ Cannot save modification: Brand '{brand_name}' not found")
-                continue
-
-            # Check if this modification already exists for this brand
-            existing_mod = db_session.query(BrandModification).filter(
-                BrandModification.brand_id == brand.id,
-                BrandModification.name == mod_name
-            ).first()
-
-            if not existing_mod:
-                # Create new brand modification
-                new_mod = BrandModification(
-                    name=mod_name,
-                    brand_id=brand.id,
-                    source=source
-                )
-                db_session.add(new_mod)
-                db_session.commit()
-                logger.info(f"✅ New modification added: {mod_name} for {brand_name}")
-            else:
-                logger.debug(f"ℹ️ Modification already exists: {mod_name} for {brand_name}")
-        except Exception as e:
-            logger.error(f"❌ Error saving modification {mod_name} for {brand_name}: {e}")
-
-    # Clear the list after processing
-    NEW_MODIFICATIONS.clear()
+    from backend.models import BrandModification
+    return _save_staged(db_session, BrandModification, staged_modifications(), 'modification', 'modification')
 
 
 def get_brand_trims(brand_name, db_session=None):
@@ -148,17 +201,14 @@ def get_brand_trims(brand_name, db_session=None):
     if not db_session:
         raise ValueError("Database session is required to get brand trims")
 
-    from backend.models import Brand, BrandTrim
     try:
         # Find the brand
-        brand = db_session.query(Brand).filter(Brand.name == brand_name).first()
+        brand = get_reference_snapshot(db_session).get_brand(brand_name)
         if not brand:
             logger.warning(f"Brand not found: {brand_name}")
             return ["Standard"]  # Return default trim
 
-        # Get all trims for this brand
-        trims = db_session.query(BrandTrim).filter(BrandTrim.brand_id == brand.id).all()
-        trim_names = [trim.name for trim in trims]
+        trim_names = list(brand.trims)
 
         # Always include "Standard" as a fallback trim
         if "Standard" not in trim_names:
@@ -187,28 +237,23 @@ def get_all_brands_with_synonyms(db_session=None):
         raise ValueError("Database session is required to get brands with synonyms")
 
     try:
-        # Try to get brands from the database
-        from backend.models import Brand, BrandSynonym
+        return list(get_reference_snapshot(db_session).brand_names)
+    except Exception as e:
+        logger.error(f"Error getting brands with synonyms: {str(e)}")
+        raise
 
-        brands = []
 
-        # Query all brands
-        brand_objects = db_session.query(Brand).all()
-        for brand in brand_objects:
-            brands.append(brand.name)
+def get_brand_matcher(db_session):
+    """
+    Get the compiled matcher over all brand names and synonyms.
 
-            # Get synonyms for this brand
-            try:
-                synonyms = db_session.query(BrandSynonym).filter(BrandSynonym.brand_id == brand.id).all()
-                for synonym in synonyms:
-                    brands.append(synonym.name)
-            except Exception as e:
-                logger.error(f"Error getting synonyms for brand {brand.name}: {str(e)}")
+    Args:
+        db_session: SQLAlchemy session
 
-        return brands
-    except Exception as e:
-        logger.error(f"Error getting brands with synonyms: {str(e)}")
-        raise
+    Returns:
+        LongestMatchPattern: Matcher from the current reference snapshot
+    """
+    return get_reference_snapshot(db_session).brand_matcher
 
 
 def get_brand_models(brand_name, db_session=None):
@@ -229,18 +274,13 @@ def get_brand_models(brand_name, db_session=None):
         raise ValueError("Database session is required to get brand models")
 
     try:
-        # Try to get models from the database
-        from backend.models import Brand, BrandModel
-
         # Find the brand first
-        brand = db_session.query(Brand).filter(Brand.name == brand_name).first()
+        brand = get_reference_snapshot(db_session).get_brand(brand_name)
         if not brand:
             logger.warning(f"Brand not found: {brand_name}")
             return []
 
-        # Get all models for this brand
-        models = db_session.query(BrandModel).filter(BrandModel.brand_id == brand.id).all()
-        return [model.name for model in models]
+        return list(brand.models)
     except Exception as e:
         logger.error(f"Error getting models for brand {brand_name}: {str(e)}")
         raise
@@ -264,17 +304,13 @@ def get_brand_modifications(brand_name, db_session=None):
         raise ValueError("Database session is required to get brand modifications")
 
     try:
-        from backend.models import Brand, BrandModification
-
         # Get brand
-        brand = db_session.query(Brand).filter(Brand.name == brand_name).first()
+        brand = get_reference_snapshot(db_session).get_brand(brand_name)
         if not brand:
             logger.warning(f"Brand not found: {brand_name}")
             return []
 
-        # Get modifications for this brand
-        modifications = db_session.query(BrandModification).filter(BrandModification.brand_id == brand.id).all()
-        return [mod.name for mod in modifications]
+        return list(brand.modifications)
     except Exception as e:
         logger.error(f"Error getting modifications for brand {brand_name}: {str(e)}")
         raise
@@ -293,6 +329,7 @@ def save_new_model_to_db(brand_name, model_name, db_session=None):
         bool: True if model was added, False otherwise
     """
     if not db_session:
+        from backend.db import db
         db_session = db.session
 
     # Do nothing if empty or too short model name
@@ -300,29 +337,15 @@ def save_new_model_to_db(brand_name, model_name, db_session=None):
         return False
 
     try:
-        # Find brand
-        brand = db_session.query(Brand).filter(Brand.name == brand_name).first()
-        if not brand:
-            logger.warning(f"Cannot save model: Brand '{brand_name}' not found")
-            return False
-
-        # Check if model already exists for this brand
-        existing = db_session.query(BrandModel).filter(
-            BrandModel.name == model_name,
-            BrandModel.brand_id == brand.id
-        ).first()
-
-        if not existing:
-            # Create new model
-            is_multi_word = len(model_name.split()) > 1
-            brand_model = BrandModel(
-                name=model_name,
-                brand_id=brand.id,
-                is_multi_word=is_multi_word,
-                source="auto_detected"
-            )
-            db_session.add(brand_model)
-            db_session.commit()
+        from backend.models import BrandModel
+        added = _insert_brand_rows(db_session, BrandModel, [(brand_name, {
+            "name": model_name,
+            "is_multi_word": len(model_name.split()) > 1,
+            "source": "auto_detected"
+        })])
+        db_session.commit()
+        if added:
+            invalidate_reference_snapshot()
             logger.info(f"Added new model '{model_name}' for brand '{brand_name}'")
             return True
     except Exception as e:
@@ -355,28 +378,9 @@ def find_known_trim(brand, text, db_session=None):
             from backend.database import Session
             db_session = Session()
 
-    # Get brand ID
     try:
-        brand_obj = db_session.query(Brand).filter(Brand.name == brand).first()
-        if not brand_obj:
-            return None
-
-        # Get all trims for this brand
-        trims = db_session.query(BrandTrim).filter(BrandTrim.brand_id == brand_obj.id).all()
-        if not trims:
-            return None
-
-        # Sort trims by length (longest first) to match more specific trims before generic ones
-        trims_sorted = sorted(trims, key=lambda x: len(x.name), reverse=True)
-
-        # Check each trim
-        for trim in trims_sorted:
-            # Check against word boundaries (e.g., "Sport" shouldn't match "SportBack")
-            pattern = r'\b' + re.escape(trim.name) + r'\b'
-            if re.search(pattern, text, re.IGNORECASE):
-                return trim.name
-
-        return None
+        # Trims are sorted by length (longest first) to match more specific trims before generic ones
+        return get_brand_rules(brand, db_session).known_trims.search(text)
     except Exception as e:
         logger.error(f"Error finding trim: {e}")
         return None
@@ -412,23 +416,12 @@ def find_known_modification(brand, modification_text, db_session=None):
             if mod.lower() in modification_text.lower():
                 return mod
 
-        # If no direct match, check cars table for similar modifications
-        cars_with_mods = db_session.query(Car).join(Car.brand).filter(
-            Brand.name == brand,
-            Car.modification.isnot(None),
-            Car.modification != ''
-        ).all()
-
-        # Extract unique modifications
-        possible_mods = set()
-        for car in cars_with_mods:
-            if car.modification and car.modification.strip():
-                possible_mods.add(car.modification.strip())
-
-        # Check if any known modification appears in the text
-        for mod in possible_mods:
-            if mod.lower() in modification_text.lower():
-                return mod
+        # If no direct match, check the modifications already used by the brand's cars
+        brand_entry = get_reference_snapshot(db_session).get_brand(brand)
+        if brand_entry:
+            used_mods = find_used_modifications(db_session, brand_entry.id, modification_text, limit=1)
+            if used_mods:
+                return used_mods[0]
 
     except Exception as e:
         logger.error(f"Error finding known modification for {brand}: {e}")
@@ -448,23 +441,24 @@ def check_trim_carquery(brand, model, trim_candidate):
     Returns:
         bool: True if trim is confirmed, False otherwise
     """
+    cache = get_api_cache()
     cache_key = f"{brand.lower()}_{model.lower()}"
 
     # Check cache first
-    if cache_key in API_RESULTS_CACHE.get('carquery', {}):
-        trims = API_RESULTS_CACHE['carquery'][cache_key]
-    else:
+    trims = cache.get('carquery', cache_key)
+    if trims is MISS:
         try:
-            url = f"https://www.carqueryapi.com/api/0.3/?cmd=getTrims&make={brand.lower()}&model={model.lower()}"
-            response = requests.get(url, timeout=5)
+            params = {"cmd": "getTrims", "make": brand.lower(), "model": model.lower()}
+            response = requests.get(CARQUERY_API_URL, params=params, timeout=5)
             if response.status_code == 200:
                 data = response.json()
-                trims = data.get('Trims', [])
+                trims = data.get('Trims', []) or []
 
-                # Cache the results
-                if 'carquery' not in API_RESULTS_CACHE:
-                    API_RESULTS_CACHE['carquery'] = {}
-                API_RESULTS_CACHE['carquery'][cache_key] = trims
+                # Cache the results; an empty answer is cached as a negative result
+                cache.set('carquery', cache_key, trims, negative=not trims)
+            elif response.status_code == 404:
+                cache.set('carquery', cache_key, [], negative=True)
+                return False
             else:
                 logger.warning(f"CarQuery API returned status {response.status_code}")
                 return False
@@ -508,49 +502,32 @@ def check_trim_carapi(brand, model, trim_candidate):
         logger.warning("⚠️ CARAPI_API_KEY or CARAPI_API_SECRET not set in config/environment")
         return False
 
+    cache = get_api_cache()
     cache_key = f"{brand.lower()}_{model.lower()}"
 
     # Check cache first
-    if cache_key in API_RESULTS_CACHE.get('carapi', {}):
-        cars = API_RESULTS_CACHE['carapi'][cache_key]
-    else:
+    cars = cache.get('carapi', cache_key)
+    if cars is MISS:
         try:
-            # First get an access token using key and secret
-            auth_url = "https://carapi.app/api/auth/login"
-            auth_data = {
-                "api_token": carapi_key,
-                "api_secret": carapi_secret
-            }
-            auth_response = requests.post(auth_url, json=auth_data, timeout=5)
-
-            if auth_response.status_code != 200:
-                logger.warning(f"CarAPI authentication failed with status {auth_response.status_code}")
-                return False
-
-            # Extract access token from response
-            auth_data = auth_response.json()
-            access_token = auth_data.get('access_token')
-
-            if not access_token:
-                logger.warning("CarAPI did not return an access token")
-                return False
-
-            # Now use the access token to query the API
-            url = f"https://carapi.app/api/v1/trims?make={brand.lower()}&model={model.lower()}"
-            headers = {"Authorization": f"Bearer {access_token}"}
-            response = requests.get(url, headers=headers, timeout=5)
+            # The client logs in only when it has no valid token and reuses its connections
+            client = get_carapi_client(CARAPI_BASE_URL, carapi_key, carapi_secret)
+            response = client.get_trims(brand.lower(), model.lower())
 
             if response.status_code == 200:
                 data = response.json()
-                cars = data.get('data', [])
+                cars = data.get('data', []) or []
 
-                # Cache the results
-                if 'carapi' not in API_RESULTS_CACHE:
-                    API_RESULTS_CACHE['carapi'] = {}
-                API_RESULTS_CACHE['carapi'][cache_key] = cars
+                # Cache the results; an empty answer is cached as a negative result
+                cache.set('carapi', cache_key, cars, negative=not cars)
+            elif response.status_code == 404:
+                cache.set('carapi', cache_key, [], negative=True)
+                return False
             else:
                 logger.warning(f"CarAPI returned status {response.status_code}")
                 return False
+        except CarAPIAuthError as e:
+            logger.warning(str(e))
+            return False
         except Exception as e:
             logger.error(f"Error querying CarAPI: {e}")
             return False
@@ -565,7 +542,313 @@ def check_trim_carapi(brand, model, trim_candidate):
     return False
 
 
-def parse_car_info(car_data, db_session):
+# Provider name -> check(brand, model, trim_candidate) -> bool
+TRIM_PROVIDERS = {
+    "carquery": check_trim_carquery,
+    "carapi": check_trim_carapi,
+}
+
+_verification_executor = None
+_verification_executor_lock = threading.Lock()
+
+
+def _get_verification_executor():
+    global _verification_executor
+    with _verification_executor_lock:
+        if _verification_executor is None:
+            _verification_executor = ThreadPoolExecutor(
+                max_workers=TRIM_VERIFICATION_WORKERS, thread_name_prefix="trim-verify"
+            )
+        return _verification_executor
+
+
+def get_trim_providers():
+    """Get the (name, check) pairs configured in TRIM_VERIFICATION_PROVIDERS"""
+    names = [name.strip() for name in TRIM_VERIFICATION_PROVIDERS.split(',') if name.strip()]
+    return [(name, TRIM_PROVIDERS[name]) for name in names if name in TRIM_PROVIDERS]
+
+
+def verify_trim_candidate(brand, model, trim_candidate, providers=None, deadline=TRIM_VERIFICATION_DEADLINE):
+    """
+    Ask all trim providers at once whether a trim exists, within an overall deadline.
+
+    Returns as soon as one provider confirms the trim; the remaining lookups
+    are cancelled if they have not started yet (lookups already running finish
+    in the background and still fill the API cache). A confirmed trim is queued
+    in the calling thread's staged_trims() for save_new_trims_to_db().
+
+    Args:
+        brand (str): Car brand
+        model (str): Car model
+        trim_candidate (str): Potential trim to check
+        providers (list): (name, check) pairs, defaults to get_trim_providers()
+        deadline (float): Seconds to wait for a positive answer
+
+    Returns:
+        str or None: Name of the provider that confirmed the trim, or None
+    """
+    if providers is None:
+        providers = get_trim_providers()
+    if not providers or not brand or not model or not trim_candidate:
+        return None
+
+    # Providers read Flask config, so run them inside the caller's app context
+    try:
+        from flask import current_app
+        app = current_app._get_current_object()
+    except (ImportError, RuntimeError):
+        app = None
+
+    def run(check):
+        if app is None:
+            return check(brand, model, trim_candidate)
+        with app.app_context():
+            return check(brand, model, trim_candidate)
+
+    executor = _get_verification_executor()
+    started = time.monotonic()
+    futures = {executor.submit(run, check): name for name, check in providers}
+    pending = set(futures)
+    try:
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                logger.warning(f"⏱️ Trim verification of '{trim_candidate}' for {brand} {model} "
+                               f"hit the {deadline}s deadline, no answer from: "
+                               f"{', '.join(sorted(futures[f] for f in pending))}")
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    confirmed = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Trim provider {futures[future]} failed: {e}")
+                    continue
+                if confirmed:
+                    staged_trims().append({'brand': brand, 'trim': trim_candidate, 'source': futures[future]})
+                    return futures[future]
+        return None
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+class BrandRules:
+    """Compiled model and trim matchers of one brand, built once per reference snapshot"""
+
+    def __init__(self, brand_entry):
+        models = brand_entry.models if brand_entry else ()
+        # LongestMatchPattern orders names longest first, exactly like the
+        # previous `sorted(models, key=len, reverse=True)` loops
+        self.multi_word_models = LongestMatchPattern([m for m in models if ' ' in m])
+        self.single_word_models = LongestMatchPattern([m for m in models if ' ' not in m])
+        # Spelling-independent ("Тигго 8", "UNI T") and typo-tolerant fallbacks
+        # for models that match no model exactly
+        self.model_keys = KeyIndex((m, m) for m in models)
+        self.fuzzy_models = TrigramIndex((m, m) for m in models)
+
+        # Trims as returned by get_brand_trims() ("Standard" always included);
+        # the tries rank names longest first like the previous sorted loops
+        trims = list(brand_entry.trims) if brand_entry else []
+        self.known_trims = TokenTrie(trims)
+        self.trim_keys = KeyIndex((t, t) for t in trims)
+        if "Standard" not in trims:
+            trims.append("Standard")
+        self.multi_word_trims = TokenTrie([t for t in trims if ' ' in t])
+        self.single_word_trims = TokenTrie([t for t in trims if ' ' not in t and len(t) > 1])
+
+
+def get_brand_rules(brand_name, db_session=None, snapshot=None, trace=None):
+    """
+    Get the compiled per-brand matchers for a brand.
+
+    Args:
+        brand_name (str): Brand name
+        db_session: SQLAlchemy session (used when no snapshot is given)
+        snapshot: Optional ReferenceSnapshot to build the rules from
+        trace (ParseTrace): Optional trace recording whether the rules were cached
+
+    Returns:
+        BrandRules: Matchers shared by every listing of this brand
+    """
+    if snapshot is None:
+        snapshot = get_reference_snapshot(db_session)
+
+    built = []
+
+    def build():
+        built.append(brand_name)
+        return BrandRules(snapshot.get_brand(brand_name))
+
+    rules = snapshot.cached(('brand_rules', brand_name), build)
+    if trace is not None:
+        trace.cache_result('brand_rules', not built)
+    return rules
+
+
+def _brand_entries(snapshot):
+    """(name, brand name) pairs of every brand and its synonyms, older brands first"""
+    entries = []
+    for entry in snapshot.brands.values():
+        entries.append((entry.name, entry.name))
+        entries.extend((synonym, entry.name) for synonym in entry.synonyms)
+    return entries
+
+
+def get_brand_key_index(snapshot):
+    """Get the normalized-key index over brand names and synonyms of a snapshot, mapping to brand names"""
+    return snapshot.cached(('brand_key_index',), lambda: KeyIndex(_brand_entries(snapshot)))
+
+
+def get_brand_fuzzy_index(snapshot):
+    """Get the trigram index over brand names and synonyms of a snapshot, mapping to brand names"""
+    return snapshot.cached(('brand_fuzzy_index',), lambda: TrigramIndex(_brand_entries(snapshot)))
+
+
+def _fuzzy_brand(car_data, fuzzy_index):
+    """
+    Match the first one or two words of a listing against the brand trigram index.
+
+    Returns:
+        tuple: (brand, brand_end_index) of the best accepted match, or None
+    """
+    best = None
+    words = list(re.finditer(r'\S+', car_data))[:2]
+    for count in range(1, len(words) + 1):
+        candidate = car_data[words[0].start():words[count - 1].end()]
+        found = fuzzy_index.match(candidate)
+        if found and (best is None or found[2] > best[2]):
+            best = (found[0], words[count - 1].end(), found[2])
+    if best is None:
+        return None
+
+    logger.info(f"🔤 Fuzzy brand match: '{car_data[:best[1]].strip()}' -> {best[0]} ({best[2]:.2f})")
+    return best[0], best[1]
+
+
+def _split_brand(car_data, brand_matcher, fuzzy_index=None, key_index=None):
+    """
+    Step 1 of parsing: find the brand at the start of a listing.
+
+    Args:
+        car_data (str): Car data string
+        brand_matcher (LongestMatchPattern): Matcher over brand names and synonyms
+        fuzzy_index (TrigramIndex): Optional index for misspelled brands
+        key_index (KeyIndex): Optional index for brands spelled differently
+            ("Greatwall", "Тайота" typed with Latin letters, ...)
+
+    Returns:
+        tuple: (brand, brand_end_index, is_known). is_known is False when the
+        first word was taken as a brand that is not in the reference data yet.
+    """
+    brand_match = brand_matcher.search(car_data)
+    if brand_match:
+        found_brand, _, brand_end_index = brand_match
+        return found_brand, brand_end_index, True
+
+    # A known brand in another spelling or a misspelled one ("Hyundia")
+    # before falling back to a new brand
+    if key_index is not None:
+        key_match = key_index.search(car_data)
+        if key_match:
+            return key_match[0], key_match[2], True
+
+    if fuzzy_index is not None:
+        fuzzy_match = _fuzzy_brand(car_data, fuzzy_index)
+        if fuzzy_match:
+            return fuzzy_match[0], fuzzy_match[1], True
+
+    # Try fallback method: use first word as brand
+    words = car_data.split()
+    if words:
+        return words[0], len(words[0]), False
+
+    return None, 0, True
+
+
+def _parse_after_brand(car_data, found_brand, brand_end_index, rules, on_new_model, trace=None):
+    """
+    Steps 2-5 of parsing: engine info, model, trim and modification.
+
+    Args:
+        car_data (str): Full car data string
+        found_brand (str): Brand found by _split_brand()
+        brand_end_index (int): End of the brand in car_data
+        rules (BrandRules): Compiled matchers of the brand
+        on_new_model (callable): Called with a model name that is not in the reference data
+        trace (ParseTrace): Optional trace collecting stage timings
+
+    Returns:
+        dict: Car information without the brand key
+    """
+    result = {}
+
+    # Get the rest of the text after the brand for further processing
+    remaining_text = car_data[brand_end_index:].strip()
+    if not remaining_text:
+        return result
+
+    # Step 2: Identify engine info from the remaining text
+    with trace_stage(trace, 'engine'):
+        result["engine"] = extract_engine_info(remaining_text)
+
+    # Step 3: Extract model (based on the brand) - first try multi-word models,
+    # then single-word models, both with exact boundary match
+    with trace_stage(trace, 'model'):
+        found_model = None
+        mod_text_start = None
+        model_end_index = 0
+
+        model_match = rules.multi_word_models.search(remaining_text) or rules.single_word_models.search(remaining_text)
+        if not model_match:
+            # The same model written differently, mapped to its reference name
+            model_match = rules.model_keys.search(remaining_text)
+        if model_match:
+            found_model, _, mod_text_start = model_match
+            model_end_index = brand_end_index + mod_text_start
+        else:
+            # If no model found, use first word in remaining text as potential model
+            words = remaining_text.split()
+            fuzzy_model = rules.fuzzy_models.match(words[0]) if words else None
+            if fuzzy_model:
+                # A misspelled known model
+                found_model = fuzzy_model[0]
+                mod_text_start = remaining_text.find(words[0]) + len(words[0])
+                model_end_index = brand_end_index + mod_text_start
+                logger.info(f"🔤 Fuzzy model match: '{words[0]}' -> {found_model} ({fuzzy_model[2]:.2f})")
+            elif words:
+                found_model = words[0]
+                model_end_index = brand_end_index + remaining_text.find(words[0]) + len(words[0])
+
+                # Add this model to the database if it doesn't exist
+                on_new_model(found_model)
+
+                # Try to match model in remaining_text and get its end position
+                match = re.search(r'\b' + re.escape(found_model) + r'\b', remaining_text, re.IGNORECASE)
+                if match:
+                    mod_text_start = match.end()
+
+    result["model"] = found_model
+
+    if not found_model:
+        # Can't parse further without a model
+        return result
+
+    # Get modification text after model
+    if mod_text_start is not None:
+        modification_text = remaining_text[mod_text_start:].strip()
+    else:
+        modification_text = car_data[model_end_index:].strip()
+    if not modification_text:
+        return result
+
+    # Step 4 & 5: Normalize the car data (extract trim and modification)
+    with trace_stage(trace, 'normalize'):
+        result.update(_normalize_with_rules(found_brand, found_model, modification_text, rules, trace))
+    return result
+
+
+def parse_car_info(car_data, db_session, trace=None):
     """
     Parse car information from input string
     
@@ -589,6 +872,8 @@ def parse_car_info(car_data, db_session):
     Args:
         car_data (str): Car data string
         db_session: SQLAlchemy session
+        trace (ParseTrace): Optional trace that collects per-stage timings,
+            the SQL query count and cache hits of this call
         
     Returns:
         dict: Car information with brand, model, modification, trim, and engine info
@@ -599,6 +884,43 @@ def parse_car_info(car_data, db_session):
     if not db_session:
         raise ValueError("Database session is required to parse car info")
 
+    if trace is None:
+        return _memoized_parse_car_info(car_data, db_session)
+    with trace.active(db_session):
+        try:
+            return _memoized_parse_car_info(car_data, db_session, trace)
+        finally:
+            trace.finish()
+
+
+def _memoized_parse_car_info(car_data, db_session, trace=None):
+    """_parse_car_info() behind the parse memo"""
+    memo = get_parse_memo()
+    if not memo.enabled:
+        return _parse_car_info(car_data, db_session, trace)
+
+    # Texts that differ only in whitespace or Unicode composition share a memo entry
+    version = get_reference_version()
+    memo_key = memo.key(normalize_listing_text(car_data), version)
+
+    result = memo.get(memo_key)
+    if trace is not None:
+        trace.cache_result('parse_memo', result is not MISS)
+    if result is not MISS:
+        return result
+
+    result = _parse_car_info(car_data, db_session, trace)
+
+    # A parse that created brands or models would not give the same result again
+    if get_reference_version() == version:
+        memo.set(memo_key, result)
+    else:
+        memo.skip()
+    return result
+
+
+def _parse_car_info(car_data, db_session, trace=None):
+    """parse_car_info() without the argument checks"""
     result = {
         "brand": None,
         "model": None,
@@ -608,25 +930,14 @@ def parse_car_info(car_data, db_session):
     }
 
     # Step 1: Extract brand (longest matching brand first)
-    all_brands = get_all_brands_with_synonyms(db_session)
-    sorted_brands = sorted(all_brands, key=len, reverse=True)
-    found_brand = None
-    brand_end_index = 0
-    for brand in sorted_brands:
-        brand_pattern = r'\b' + re.escape(brand) + r'\b'
-        match = re.search(brand_pattern, car_data, re.IGNORECASE)
-        if match:
-            found_brand = brand
-            brand_end_index = match.end()
-            break
-
-    if not found_brand:
-        # Try fallback method: use first word as brand
-        words = car_data.split()
-        if words:
-            found_brand = words[0]
-            brand_end_index = len(found_brand)
-
+    with trace_stage(trace, 'brand'):
+        snapshot = get_reference_snapshot(db_session)
+        if trace is not None:
+            trace.cache_result('reference_snapshot', snapshot.loaded_at < trace.started_at)
+        found_brand, brand_end_index, is_known = _split_brand(
+            car_data, snapshot.brand_matcher, get_brand_fuzzy_index(snapshot), get_brand_key_index(snapshot)
+        )
+        if not is_known:
             # Add this brand to the database if it doesn't exist
             create_or_get_brand(found_brand, db_session)
 
@@ -636,89 +947,161 @@ def parse_car_info(car_data, db_session):
         # Can't parse further without a brand
         return result
 
-    # Get the rest of the text after the brand for further processing
-    remaining_text = car_data[brand_end_index:].strip()
-    if not remaining_text:
+    try:
+        rules = get_brand_rules(found_brand, db_session, trace=trace)
+        result.update(_parse_after_brand(
+            car_data, found_brand, brand_end_index, rules,
+            lambda model_name: create_or_get_model(found_brand, model_name, db_session),
+            trace
+        ))
         return result
+    except Exception as e:
+        logger.error(f"Error parsing car info: {str(e)}")
+        raise
 
-    # Step 2: Identify engine info from the remaining text
-    engine_info = extract_engine_info(remaining_text)
-    result["engine"] = engine_info
 
-    # Step 3: Extract model (based on the brand)
-    # Get models for this brand from DB
-    try:
-        models = get_brand_models(found_brand, db_session)
+def parse_car_info_many(car_data_items, db_session, chunk_size=PARSE_BATCH_CHUNK_SIZE):
+    """
+    Parse many car information strings, yielding one result per input in input order.
 
-        # Sort models by length (longer models first) for more specific matches
-        sorted_models = sorted(models, key=len, reverse=True)
+    Results are the same dicts parse_car_info() returns, but the reference
+    data is loaded once, listings of a chunk are grouped by detected brand so
+    every brand's compiled matchers are shared by its listings, and brands
+    and models that are not in the reference data yet are collected and saved
+    with one bulk insert per table once the input is exhausted.
 
-        # Split into multi-word and single-word models
-        multi_word_models = [m for m in sorted_models if ' ' in m]
-        single_word_models = [m for m in sorted_models if ' ' not in m]
+    Unlike a parse_car_info() loop, a brand or model discovered in this batch
+    is not used for matching the following listings of the same batch.
 
-        # Try to find model - first try multi-word models, then single-word
-        found_model = None
-        model_end_index = 0
+    Args:
+        car_data_items (iterable): Car data strings
+        db_session: SQLAlchemy session
+        chunk_size (int): Number of listings grouped together at a time
 
-        # First, try matching multi-word models with exact boundary match
-        for model in multi_word_models:
-            model_pattern = r'\b' + re.escape(model) + r'\b'
-            match = re.search(model_pattern, remaining_text, re.IGNORECASE)
-            if match:
-                found_model = model
-                model_end_index = brand_end_index + match.end()
-                break
+    Yields:
+        dict: Car information with brand, model, modification, trim, and engine info
 
-        # If no multi-word model found, try single-word models
-        if not found_model:
-            for model in single_word_models:
-                model_pattern = r'\b' + re.escape(model) + r'\b'
-                match = re.search(model_pattern, remaining_text, re.IGNORECASE)
-                if match:
-                    found_model = model
-                    model_end_index = brand_end_index + match.end()
-                    break
+    Raises:
+        ValueError: If db_session is not provided
+    """
+    if not db_session:
+        raise ValueError("Database session is required to parse car info")
 
-        # If still no model found, use first word in remaining text as potential model
-        if not found_model:
-            words = remaining_text.split()
-            if words:
-                found_model = words[0]
-                model_end_index = brand_end_index + remaining_text.find(words[0]) + len(words[0])
+    snapshot = get_reference_snapshot(db_session)
+    new_brands = {}
+    new_models = {}
 
-                # Add this model to the database if it doesn't exist
-                create_or_get_model(found_brand, found_model, db_session)
+    items = iter(car_data_items)
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            break
 
-        result["model"] = found_model
+        results = []
+        brand_groups = {}
+        for index, car_data in enumerate(chunk):
+            # Step 1: Extract brand (longest matching brand first)
+            found_brand, brand_end_index, is_known = _split_brand(
+                car_data, snapshot.brand_matcher, get_brand_fuzzy_index(snapshot), get_brand_key_index(snapshot)
+            )
+            if not is_known:
+                new_brands.setdefault(found_brand)
+            results.append({
+                "brand": found_brand,
+                "model": None,
+                "modification": None,
+                "trim": None,
+                "engine": None
+            })
+            if found_brand:
+                brand_groups.setdefault(found_brand, []).append((index, brand_end_index))
+
+        for found_brand, listings in brand_groups.items():
+            rules = get_brand_rules(found_brand, snapshot=snapshot)
+
+            def on_new_model(model_name, brand_name=found_brand):
+                new_models.setdefault((brand_name, model_name))
+
+            for index, brand_end_index in listings:
+                try:
+                    results[index].update(_parse_after_brand(
+                        chunk[index], found_brand, brand_end_index, rules, on_new_model
+                    ))
+                except Exception as e:
+                    logger.error(f"Error parsing car info: {str(e)}")
+                    raise
+
+        yield from results
+
+    if new_brands or new_models:
+        save_discovered_brands_and_models(list(new_brands), list(new_models), db_session)
+
+
+def _new_brand_rows(brand_names, db_session):
+    """
+    Brand rows to insert: slug from the name, and the default country (the
+    first one, can be updated by admin later).
 
-        if not found_model:
-            # Can't parse further without a model
-            return result
+    Returns:
+        list: Row dicts, or None if there is no country to assign
+    """
+    from backend.models import Country
 
-        # Get modification text after model
-        mod_text_start = None
-        if found_model:
-            # Try to match model in remaining_text and get its end position
-            model_pattern = r'\b' + re.escape(found_model) + r'\b'
-            match = re.search(model_pattern, remaining_text, re.IGNORECASE)
-            if match:
-                mod_text_start = match.end()
-        if mod_text_start is not None:
-            modification_text = remaining_text[mod_text_start:].strip()
-        else:
-            modification_text = car_data[model_end_index:].strip()
-        if not modification_text:
-            return result
+    if not brand_names:
+        return []
+    default_country_id = db_session.query(Country.id).order_by(Country.id).limit(1).scalar()
+    if default_country_id is None:
+        return None
+    return [
+        {"name": brand_name, "slug": brand_name.lower().replace(' ', '-'), "country_id": default_country_id}
+        for brand_name in brand_names
+    ]
 
-        # Step 4 & 5: Normalize the car data (extract trim and modification)
-        normalized = normalize_car(found_brand, found_model, modification_text, db_session)
-        result.update(normalized)
 
-        return result
+def save_discovered_brands_and_models(brand_names, brand_models, db_session):
+    """
+    Save brands and models found by parse_car_info_many() with one bulk insert per table.
+
+    Brands whose name or slug already exists and models that already exist for
+    their brand are skipped by the tables' unique constraints.
+
+    Args:
+        brand_names (list): Brand names
+        brand_models (list): (brand name, model name) pairs
+        db_session: SQLAlchemy session
+
+    Returns:
+        tuple: (number of brands added, number of models added)
+    """
+    from backend.models import Brand, BrandModel
+
+    max_brand_length = Brand.__table__.c.name.type.length
+    max_model_length = BrandModel.__table__.c.name.type.length
+
+    try:
+        brand_rows = _new_brand_rows([brand_name for brand_name in brand_names
+                                      if len(brand_name) <= max_brand_length], db_session)
+        if brand_rows is None:
+            logger.warning("Cannot save discovered brands: No countries available in database")
+            brand_rows = []
+        added_brands = insert_ignore(db_session, Brand, brand_rows, [('name',), ('slug',)])
+
+        added_models = _insert_brand_rows(db_session, BrandModel, [
+            (brand_name, {"name": model_name, "is_multi_word": ' ' in model_name})
+            for brand_name, model_name in brand_models
+            if len(model_name) <= max_model_length
+        ])
+
+        db_session.commit()
+        if added_brands or added_models:
+            # Bulk inserts bypass the mapper events that normally do this
+            invalidate_reference_snapshot()
+            logger.info(f"✅ Saved {len(added_brands)} new brands and {len(added_models)} new models")
+        return len(added_brands), len(added_models)
     except Exception as e:
-        logger.error(f"Error parsing car info: {str(e)}")
-        raise
+        logger.error(f"❌ Error saving discovered brands and models: {e}")
+        db_session.rollback()
+        return 0, 0
 
 
 def normalize_car(brand, model, modification_text, db_session):
@@ -737,6 +1120,11 @@ def normalize_car(brand, model, modification_text, db_session):
     if not db_session:
         raise ValueError("Database session is required to normalize car data")
 
+    return _normalize_with_rules(brand, model, modification_text, get_brand_rules(brand, db_session))
+
+
+def _normalize_with_rules(brand, model, modification_text, rules, trace=None):
+    """normalize_car() with the brand's trims taken from precompiled BrandRules"""
     result = {
         "brand": brand,
         "model": model,
@@ -747,31 +1135,14 @@ def normalize_car(brand, model, modification_text, db_session):
     # Remove anything in parentheses (e.g., (версия Ruiyi))
     mod_text = re.sub(r'\([^)]*\)', '', modification_text).strip()
 
-    # Get all known trims for this brand
-    brand_trims = get_brand_trims(brand, db_session)
-    sorted_trims = sorted(brand_trims, key=len, reverse=True)
-
-    # Find trim first - prioritize multi-word trims
+    # Find trim first - prioritize multi-word trims, then single-word trims
+    # (whole-word, case-insensitive, longest trim first)
     trim = None
-    # Try to match multi-word trims first (using exact match with boundaries)
-    for trim_candidate in sorted_trims:
-        if ' ' in trim_candidate:
-            if re.search(r'\b' + re.escape(trim_candidate) + r'\b', mod_text, re.IGNORECASE):
-                trim = trim_candidate
-                # Remove the trim from the modification text
-                mod_text = re.sub(r'\b' + re.escape(trim_candidate) + r'\b', '', mod_text, flags=re.IGNORECASE).strip()
-                break
-
-    # If no multi-word trim found, try to match single-word trims
-    if not trim:
-        for trim_candidate in sorted_trims:
-            if ' ' not in trim_candidate and len(trim_candidate) > 1:
-                if re.search(r'\b' + re.escape(trim_candidate) + r'\b', mod_text, re.IGNORECASE):
-                    trim = trim_candidate
-                    # Remove the trim from the modification text
-                    mod_text = re.sub(r'\b' + re.escape(trim_candidate) + r'\b', '', mod_text,
-                                      flags=re.IGNORECASE).strip()
-                    break
+    trim_match = rules.multi_word_trims.find_best(mod_text) or rules.single_word_trims.find_best(mod_text)
+    if trim_match:
+        trim, occurrences = trim_match
+        # Remove every occurrence of the trim from the modification text
+        mod_text = remove_spans(mod_text, occurrences).strip()
 
     # If no trim was found, check the last word as a potential trim
     if not trim:
@@ -779,15 +1150,32 @@ def normalize_car(brand, model, modification_text, db_session):
         if len(words) > 1:
             # Check if the last word or last two words form a known trim
             last_word = words[-1]
-            if find_known_trim(brand, last_word, db_session):
+            if rules.known_trims.search(last_word):
                 trim = last_word
                 mod_text = ' '.join(words[:-1]).strip()
             elif len(words) > 2:
                 last_two_words = ' '.join(words[-2:])
-                if find_known_trim(brand, last_two_words, db_session):
+                if rules.known_trims.search(last_two_words):
                     trim = last_two_words
                     mod_text = ' '.join(words[:-2]).strip()
 
+            # A known trim written differently ("Rline", "R Line"), mapped to its reference name
+            if not trim:
+                for count in (1, 2)[:len(words) - 1]:
+                    known_trim = rules.trim_keys.get(' '.join(words[-count:]))
+                    if known_trim:
+                        trim = known_trim
+                        mod_text = ' '.join(words[:-count]).strip()
+                        break
+
+            # Unknown last word: ask the external catalogs if it is a trim of this model
+            if not trim and TRIM_VERIFICATION_ENABLED:
+                with trace_stage(trace, 'trim_verification'):
+                    verified = verify_trim_candidate(brand, model, last_word)
+                if verified:
+                    trim = last_word
+                    mod_text = ' '.join(words[:-1]).strip()
+
     # If still no trim found, use "Standard"
     if not trim:
         trim = "Standard"
@@ -815,30 +1203,22 @@ def normalize_car(brand, model, modification_text, db_session):
 def save_new_brand_to_db(brand_name, db_session=None):
     """Save a newly discovered brand to the database."""
     if not db_session:
+        from backend.db import db
         db_session = db.session
 
     try:
-        # Check if brand already exists
-        existing = db_session.query(Brand).filter(Brand.name == brand_name).first()
-        if not existing:
-            # Get default country (can be updated by admin later)
-            default_country = db_session.query(Country).first()
-            if not default_country:
-                logger.warning("Cannot save brand: No countries available in database")
-                return False
+        from backend.models import Brand
 
-            # Create a slug from the brand name
-            slug = brand_name.lower().replace(' ', '-')
+        brand_rows = _new_brand_rows([brand_name], db_session)
+        if brand_rows is None:
+            logger.warning("Cannot save brand: No countries available in database")
+            return False
 
-            # Create the new brand
-            new_brand = Brand(
-                name=brand_name,
-                slug=slug,
-                country=default_country,
-                source="auto_detected"
-            )
-            db_session.add(new_brand)
-            db_session.commit()
+        # An existing name or slug leaves the table untouched
+        added = insert_ignore(db_session, Brand, brand_rows, [('name',), ('slug',)])
+        db_session.commit()
+        if added:
+            invalidate_reference_snapshot()
             logger.info(f"Added new brand: {brand_name}")
             return True
     except Exception as e:
@@ -881,6 +1261,8 @@ def create_or_get_brand(brand_name, db_session=None):
             return StubBrand(brand_name)
     except Exception as e:
         logger.error(f"Error creating/getting brand: {str(e)}")
+        if db_session:
+            db_session.rollback()
 
         # Return a stub brand as fallback
         class StubBrand:
@@ -935,6 +1317,8 @@ def create_or_get_model(brand_name, model_name, db_session=None):
             return StubModel(model_name, brand_name)
     except Exception as e:
         logger.error(f"Error creating/getting model: {str(e)}")
+        if db_session:
+            db_session.rollback()
 
         # Return a stub model as fallback
         class StubModel:
@@ -945,6 +1329,111 @@ def create_or_get_model(brand_name, model_name, db_session=None):
         return StubModel(model_name, brand_name)
 
 
+# Engine attribute patterns, highest priority first. Every family is compiled
+# into one regex and scanned once; the value of the first pattern in the list
+# that occurs anywhere in the text wins, exactly like trying the patterns one
+# by one with re.search(). A value of None means "use the matched text".
+DISPLACEMENT_PATTERNS = [
+    (None, r'\b(\d+\.\d+\s?TSI)\b'),  # 2.0 TSI
+    (None, r'\b(\d+\.\d+\s?TDI)\b'),  # 2.0 TDI
+    (None, r'\b(\d+\.\d+\s?TFSI)\b'),  # 2.0 TFSI
+    (None, r'\b(\d+\.\d+)[T](?!\w)\b'),  # 2.0T but not 2.0TSI
+    (None, r'\b(\d+\.\d+)\s?[L](?!\w)\b'),  # 2.5L but not 2.5LSA
+    (None, r'\b(\d+\.\d+)\s?(?:литра|л)(?!\w)\b'),  # 2.0 литра, 1.6л
+    (None, r'\b(\d+\.\d+)\s?(?:kWh|kwh|кВтч)\b'),  # 77.4 kWh
+    (None, r'\b(\d+\.\d+)\b'),  # 2.0, 1.6 (plain number, lowest priority)
+]
+
+POWER_PATTERNS = [
+    (None, r'\b(\d+)\s?(?:hp|л\.с\.|лс)\b'),  # 150 hp, 110 л.с.
+    (None, r'\b(\d+)\s?(?:HP|ЛС)\b'),  # 220 HP, 180 ЛС
+]
+
+ENGINE_TYPE_PATTERNS = [
+    ("hybrid", r'\b(?:гибрид|hybrid)\b'),
+    ("electric", r'\b(?:электр|electric|EV)\b'),
+    ("electric", r'(?-i:kWh)'),  # case-sensitive substring check
+    ("diesel", r'\b(?:дизель|diesel|TDI|xDrive\d+d)\b'),
+    ("gasoline", r'\b(?:бензин|gasoline|petrol|TSI|TFSI)\b'),
+    ("gasoline", r'\b\d+\.\d+T\b'),
+]
+
+DRIVE_TYPE_PATTERNS = [
+    ("all_wheel_drive", r'\b(?:4WD|4x4|AWD|4Motion|полный привод|all wheel drive)\b'),
+    ("rear_wheel_drive", r'\b(?:RWD|задний привод|rear wheel drive)\b'),
+    ("front_wheel_drive", r'\b(?:FWD|передний привод|front wheel drive)\b'),
+    ("quattro", r'\bquattro\b'),
+    ("xdrive", r'\bxDrive'),
+    ("e_four", r'\bE-Four\b'),
+]
+
+TRANSMISSION_PATTERNS = [
+    ("dsg", r'\b(?:DSG|S-?tronic)\b'),
+    ("cvt", r'\b(?:CVT|вариатор)\b'),
+    ("automatic", r'\b(?:АКПП|автомат|automatic)\b'),
+    ("manual", r'\b(?:МКПП|механика|manual)\b'),
+    ("pdk", r'\b(?:PDK)\b'),
+    ("dct", r'\b(?:DCT)\b'),
+]
+
+
+class PatternFamily:
+    """Ordered (value, pattern) table compiled into a single case-insensitive regex"""
+
+    def __init__(self, patterns):
+        self.values = [value for value, _ in patterns]
+
+        # Inner groups are made non-capturing so group p<i> is always pattern i.
+        # A leading \b shared by consecutive patterns is checked once for the
+        # whole run, so positions inside words are rejected straight away.
+        parts = []
+        bounded = []
+        for index, (_, pattern) in enumerate(patterns):
+            pattern = re.sub(r'(?<!\\)\((?!\?)', '(?:', pattern)
+            if pattern.startswith(r'\b'):
+                bounded.append(f'(?P<p{index}>{pattern[2:]})')
+                continue
+            if bounded:
+                parts.append(r'\b(?:' + '|'.join(bounded) + ')')
+                bounded = []
+            parts.append(f'(?P<p{index}>{pattern})')
+        if bounded:
+            parts.append(r'\b(?:' + '|'.join(bounded) + ')')
+
+        # The alternation sits in a lookahead, so finditer reports a candidate at
+        # every position instead of skipping text consumed by a weaker pattern.
+        self._pattern = re.compile('(?=' + '|'.join(parts) + ')', re.IGNORECASE)
+        self._group_index = {f'p{index}': index for index in range(len(patterns))}
+
+    def search(self, text):
+        """
+        Find the highest-priority pattern that occurs in the text.
+
+        Returns:
+            tuple or None: (value, matched text of its first occurrence), or None
+        """
+        best_index = None
+        best_match = None
+        for match in self._pattern.finditer(text):
+            index = self._group_index[match.lastgroup]
+            if best_index is None or index < best_index:
+                best_index = index
+                best_match = match
+                if index == 0:
+                    break
+
+        if best_match is None:
+            return None
+        return self.values[best_index], best_match.group(best_match.lastgroup)
+
+
+DISPLACEMENT_FAMILY = PatternFamily(DISPLACEMENT_PATTERNS)
+POWER_FAMILY = PatternFamily(POWER_PATTERNS)
+ENGINE_TYPE_FAMILY = PatternFamily(ENGINE_TYPE_PATTERNS)
+DRIVE_TYPE_FAMILY = PatternFamily(DRIVE_TYPE_PATTERNS)
+TRANSMISSION_FAMILY = PatternFamily(TRANSMISSION_PATTERNS)
+
+
 def extract_engine_info(text):
     """
     Extract engine information from text
@@ -965,75 +1454,46 @@ def extract_engine_info(text):
     }
 
     # Extract displacement (e.g., 1.6T, 2.0, 2.5L, 77.4 kWh)
-    displacement_patterns = [
-        r'\b(\d+\.\d+\s?TSI)\b',  # 2.0 TSI
-        r'\b(\d+\.\d+\s?TDI)\b',  # 2.0 TDI
-        r'\b(\d+\.\d+\s?TFSI)\b',  # 2.0 TFSI
-        r'\b(\d+\.\d+)[T](?!\w)\b',  # 2.0T but not 2.0TSI
-        r'\b(\d+\.\d+)\s?[L](?!\w)\b',  # 2.5L but not 2.5LSA
-        r'\b(\d+\.\d+)\s?(?:литра|л)(?!\w)\b',  # 2.0 литра, 1.6л
-        r'\b(\d+\.\d+)\s?(?:kWh|kwh|кВтч)\b',  # 77.4 kWh
-        r'\b(\d+\.\d+)\b'  # 2.0, 1.6 (plain number, lowest priority)
-    ]
+    match = DISPLACEMENT_FAMILY.search(text)
+    if match:
+        engine_data["displacement"] = match[1]
 
-    for pattern in displacement_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    # Extract power (e.g., 150 hp, 110 л.с.)
+    match = POWER_FAMILY.search(text)
+    if match:
+        engine_data["power_hp"] = int(re.match(r'\d+', match[1]).group(0))
+
+    # Determine engine type, drive type and transmission
+    for key, family in (("type", ENGINE_TYPE_FAMILY),
+                        ("drive", DRIVE_TYPE_FAMILY),
+                        ("transmission", TRANSMISSION_FAMILY)):
+        match = family.search(text)
         if match:
-            engine_data["displacement"] = match.group(0)
-            break
+            engine_data[key] = match[0]
 
-    # Extract power (e.g., 150 hp, 110 л.с.)
-    power_patterns = [
-        r'\b(\d+)\s?(?:hp|л\.с\.|лс)\b',  # 150 hp, 110 л.с.
-        r'\b(\d+)\s?(?:HP|ЛС)\b'  # 220 HP, 180 ЛС
-    ]
+    return engine_data
 
-    for pattern in power_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            engine_data["power_hp"] = int(match.group(1))
-            break
 
-    # Determine engine type
-    if re.search(r'\b(?:гибрид|hybrid)\b', text, re.IGNORECASE):
-        engine_data["type"] = "hybrid"
-    elif re.search(r'\b(?:электр|electric|EV)\b', text, re.IGNORECASE) or "kWh" in text:
-        engine_data["type"] = "electric"
-    elif re.search(r'\b(?:дизель|diesel|TDI|xDrive\d+d)\b', text, re.IGNORECASE):
-        engine_data["type"] = "diesel"
-    elif re.search(r'\b(?:бензин|gasoline|petrol|TSI|TFSI)\b', text, re.IGNORECASE) or re.search(r'\b\d+\.\d+T\b', text,
-                                                                                                 re.IGNORECASE):
-        engine_data["type"] = "gasoline"
-
-    # Determine drive type
-    if re.search(r'\b(?:4WD|4x4|AWD|4Motion|полный привод|all wheel drive)\b', text, re.IGNORECASE):
-        engine_data["drive"] = "all_wheel_drive"
-    elif re.search(r'\b(?:RWD|задний привод|rear wheel drive)\b', text, re.IGNORECASE):
-        engine_data["drive"] = "rear_wheel_drive"
-    elif re.search(r'\b(?:FWD|передний привод|front wheel drive)\b', text, re.IGNORECASE):
-        engine_data["drive"] = "front_wheel_drive"
-    elif re.search(r'\bquattro\b', text, re.IGNORECASE):
-        engine_data["drive"] = "quattro"
-    elif re.search(r'\bxDrive', text, re.IGNORECASE):
-        engine_data["drive"] = "xdrive"
-    elif re.search(r'\bE-Four\b', text, re.IGNORECASE):
-        engine_data["drive"] = "e_four"
-
-    # Determine transmission
-    if re.search(r'\b(?:DSG|S-?tronic)\b', text, re.IGNORECASE):
-        engine_data["transmission"] = "dsg"
-    elif re.search(r'\b(?:CVT|вариатор)\b', text, re.IGNORECASE):
-        engine_data["transmission"] = "cvt"
-    elif re.search(r'\b(?:АКПП|автомат|automatic)\b', text, re.IGNORECASE):
-        engine_data["transmission"] = "automatic"
-    elif re.search(r'\b(?:МКПП|механика|manual)\b', text, re.IGNORECASE):
-        engine_data["transmission"] = "manual"
-    elif re.search(r'\b(?:PDK)\b', text, re.IGNORECASE):
-        engine_data["transmission"] = "pdk"
-    elif re.search(r'\b(?:DCT)\b', text, re.IGNORECASE):
-        engine_data["transmission"] = "dct"
+def extract_engine_info_many(texts):
+    """
+    Extract engine information for many texts, e.g. when re-processing a whole table.
 
-    return engine_data
+    Each distinct text is only scanned once.
+
+    Args:
+        texts (iterable): Texts containing engine information
+
+    Returns:
+        list: One engine data dict per input text, in input order
+    """
+    extracted = {}
+    results = []
+    for text in texts:
+        engine_data = extracted.get(text)
+        if engine_data is None:
+            engine_data = extracted[text] = extract_engine_info(text)
+        results.append(dict(engine_data))
+    return results
 
 
 def get_db_session():
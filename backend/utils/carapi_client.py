@@ -0,0 +1,224 @@
+"""
+CarAPI (carapi.app) client used for trim verification.
+
+- The JWT from /auth/login is reused until shortly before it expires and is
+  refreshed once when a request comes back 401.
+- Requests go through one keep-alive requests.Session with a bounded
+  connection pool, so bursts of imports do not repeat TLS handshakes.
+- Latency and error counts are recorded per endpoint.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+CARAPI_TIMEOUT = float(os.getenv("CARAPI_TIMEOUT", "5"))
+CARAPI_POOL_SIZE = int(os.getenv("CARAPI_POOL_SIZE", "10"))
+# Used when neither the token nor the login response says when it expires
+CARAPI_TOKEN_TTL = int(os.getenv("CARAPI_TOKEN_TTL", "3600"))
+# Refresh this many seconds before the token expires
+TOKEN_EXPIRY_MARGIN = 60
+
+
+class CarAPIAuthError(Exception):
+    """Login to CarAPI failed or returned no token"""
+
+
+def _token_expires_at(token, login_data):
+    """
+    Work out when an access token expires.
+
+    Uses the JWT "exp" claim, then an "expires_in" field of the login
+    response, then CARAPI_TOKEN_TTL.
+    """
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+        if exp:
+            return float(exp)
+    except (IndexError, ValueError, AttributeError):
+        pass
+
+    expires_in = login_data.get('expires_in') if isinstance(login_data, dict) else None
+    if expires_in:
+        return time.time() + float(expires_in)
+    return time.time() + CARAPI_TOKEN_TTL
+
+
+class CarAPIClient:
+    """Authenticated, pooled CarAPI client safe to share between threads"""
+
+    def __init__(self, base_url, api_key, api_secret, timeout=CARAPI_TIMEOUT, pool_size=CARAPI_POOL_SIZE,
+                 session=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.timeout = timeout
+
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+
+        self._token = None
+        self._token_expires_at = 0
+        self._token_lock = threading.Lock()
+
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+        self.logins = 0
+        self.token_refreshes = 0
+
+    def _record(self, endpoint, elapsed_ms, error):
+        with self._stats_lock:
+            stats = self._stats.setdefault(endpoint, {
+                'requests': 0,
+                'errors': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'last_ms': None,
+            })
+            stats['requests'] += 1
+            stats['errors'] += int(error)
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['last_ms'] = round(elapsed_ms, 3)
+
+    def _send(self, method, endpoint, **kwargs):
+        started = time.perf_counter()
+        error = True
+        try:
+            response = self.session.request(method, f"{self.base_url}{endpoint}", timeout=self.timeout, **kwargs)
+            error = response.status_code >= 400
+            return response
+        finally:
+            self._record(endpoint, (time.perf_counter() - started) * 1000, error)
+
+    def _login(self):
+        response = self._send('POST', '/auth/login', json={
+            "api_token": self.api_key,
+            "api_secret": self.api_secret
+        })
+        self.logins += 1
+        if response.status_code != 200:
+            raise CarAPIAuthError(f"CarAPI authentication failed with status {response.status_code}")
+
+        try:
+            data = response.json()
+        except ValueError:
+            # CarAPI can also answer with the bare JWT
+            data = {'access_token': response.text.strip()}
+        token = data.get('access_token') if isinstance(data, dict) else None
+        if not token:
+            raise CarAPIAuthError("CarAPI did not return an access token")
+
+        self._token = token
+        self._token_expires_at = _token_expires_at(token, data)
+
+    def get_token(self, force_refresh=False, stale_token=None):
+        """
+        Get a valid access token, logging in only when there is none or it expires soon.
+
+        Args:
+            force_refresh (bool): Log in again even if the token looks valid
+            stale_token (str): Token that was rejected; another thread may already have replaced it
+
+        Returns:
+            str: Access token
+
+        Raises:
+            CarAPIAuthError: If login fails
+        """
+        with self._token_lock:
+            if force_refresh and self._token is not None and self._token != stale_token:
+                return self._token
+            if (force_refresh or self._token is None
+                    or time.time() >= self._token_expires_at - TOKEN_EXPIRY_MARGIN):
+                if self._token is not None:
+                    self.token_refreshes += 1
+                self._login()
+            return self._token
+
+    def get(self, endpoint, params=None):
+        """
+        Make an authenticated GET request, refreshing the token once on 401.
+
+        Args:
+            endpoint (str): Path below the base URL, e.g. "/v1/trims"
+            params (dict): Query parameters
+
+        Returns:
+            requests.Response: The response
+
+        Raises:
+            CarAPIAuthError: If login fails
+            requests.RequestException: On network errors
+        """
+        token = self.get_token()
+        response = self._send('GET', endpoint, params=params, headers={"Authorization": f"Bearer {token}"})
+        if response.status_code == 401:
+            logger.info("🔑 CarAPI token rejected, logging in again")
+            token = self.get_token(force_refresh=True, stale_token=token)
+            response = self._send('GET', endpoint, params=params, headers={"Authorization": f"Bearer {token}"})
+        return response
+
+    def get_trims(self, make, model):
+        """Query /v1/trims for a make and model"""
+        return self.get('/v1/trims', params={"make": make, "model": model})
+
+    def stats(self):
+        """Get login counters and per-endpoint request latency"""
+        with self._stats_lock:
+            endpoints = {}
+            for endpoint, stats in self._stats.items():
+                endpoints[endpoint] = dict(
+                    stats,
+                    total_ms=round(stats['total_ms'], 3),
+                    max_ms=round(stats['max_ms'], 3),
+                    avg_ms=round(stats['total_ms'] / stats['requests'], 3) if stats['requests'] else None,
+                )
+        return {
+            'logins': self.logins,
+            'token_refreshes': self.token_refreshes,
+            'token_expires_at': self._token_expires_at or None,
+            'endpoints': endpoints,
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_carapi_client(base_url, api_key, api_secret):
+    """Get the process-wide client for a base URL and credentials, creating it on first use"""
+    key = (base_url, api_key, api_secret)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = CarAPIClient(base_url, api_key, api_secret)
+        return client
+
+
+def get_carapi_stats():
+    """Get stats of every CarAPI client created in this process"""
+    with _clients_lock:
+        clients = list(_clients.values())
+    return [dict(client.stats(), base_url=client.base_url) for client in clients]
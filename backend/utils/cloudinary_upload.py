@@ -1,3 +1,5 @@
+import os
+
 import cloudinary
 import cloudinary.api
 import cloudinary.uploader
@@ -8,6 +10,10 @@ from utils.file_logger import get_module_logger
 # Use the centralized logger
 logger = get_module_logger(__name__)
 
+# Files larger than this are sent in chunks of this size instead of one request
+# body built in memory (Cloudinary requires chunks of at least 5 MB)
+CLOUDINARY_CHUNK_SIZE = int(os.getenv("CLOUDINARY_CHUNK_SIZE", str(6 * 1024 * 1024)))
+
 
 def upload_image(file, car_id=None, car_name=None, car_brand=None, is_main=False, index=None):
     try:
@@ -27,15 +33,22 @@ def upload_image(file, car_id=None, car_name=None, car_brand=None, is_main=False
         car_folder = f"{base_folder}/cars/{car_id or 'unknown'}-{folder_name}".replace(" ", "-")
         logger.info(f"📂 Загрузка в Cloudinary → Папка: {car_folder} | Файл: {base_name}")
 
+        upload = cloudinary.uploader.upload
+        options = {}
+        if isinstance(file, str) and os.path.isfile(file) and os.path.getsize(file) > CLOUDINARY_CHUNK_SIZE:
+            upload = cloudinary.uploader.upload_large
+            options['chunk_size'] = CLOUDINARY_CHUNK_SIZE
+
         try:
-            result = cloudinary.uploader.upload(
+            result = upload(
                 file,
                 folder=car_folder,  # создаёт физическую папку
                 public_id=base_name,  # только имя файла
                 overwrite=True,
                 resource_type="image",
                 use_filename=False,
-                unique_filename=False
+                unique_filename=False,
+                **options
             )
             logger.info(f"✅ Uploaded to Cloudinary: {result['secure_url']}")
             return result['secure_url']
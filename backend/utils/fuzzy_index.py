@@ -0,0 +1,129 @@
+"""
+Typo-tolerant name lookup with a character-trigram index.
+
+Names are lowercased, "ё" is folded to "е" and runs of non-word characters
+become single spaces. Every word is padded like PostgreSQL's pg_trgm does
+("  word ") and split into trigrams. An inverted index maps each trigram to the
+names containing it, so a lookup only scores names that share at least one
+trigram with the query. The score is the Dice coefficient of the two trigram
+sets (1.0 for identical names).
+
+Numbers and short code words are not corrected: "Model7" shares most
+trigrams with "Model6", "CX-5" with "CX-9" and "I-Pace" with "E-Pace", but
+they are different models. Names whose digit runs or words of up to two
+characters differ from the query's are never accepted.
+"""
+
+import os
+import re
+
+FUZZY_MATCH_THRESHOLD = float(os.getenv("FUZZY_MATCH_THRESHOLD", "0.6"))
+# Shorter queries are too ambiguous to correct
+FUZZY_MIN_LENGTH = int(os.getenv("FUZZY_MIN_LENGTH", "3"))
+
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+DIGITS_PATTERN = re.compile(r'\d+')
+# Words of this length or shorter must match exactly
+CODE_WORD_LENGTH = 2
+
+
+def normalize_name(text):
+    return NON_WORD_PATTERN.sub(' ', text.lower().replace('ё', 'е')).strip()
+
+
+def _identity(key):
+    """Parts of a normalized name that must match exactly: digit runs and short code words"""
+    return DIGITS_PATTERN.findall(key), [word for word in key.split() if len(word) <= CODE_WORD_LENGTH]
+
+
+def trigrams(text):
+    """Set of padded word trigrams of a name"""
+    grams = set()
+    for word in normalize_name(text).split():
+        padded = f"  {word} "
+        for index in range(len(padded) - 2):
+            grams.add(padded[index:index + 3])
+    return grams
+
+
+class TrigramIndex:
+    """Inverted trigram index over names, each mapped to a value (e.g. the canonical name)"""
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (iterable): (name, value) pairs; of names with the same
+                normalized form the first one is kept
+        """
+        self.names = []
+        self.values = []
+        self._sizes = []
+        self._identities = []
+        self._postings = {}
+        seen = set()
+        for name, value in entries:
+            key = normalize_name(name)
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            grams = trigrams(key)
+            entry_id = len(self.names)
+            self.names.append(name)
+            self.values.append(value)
+            self._sizes.append(len(grams))
+            self._identities.append(_identity(key))
+            for gram in grams:
+                self._postings.setdefault(gram, []).append(entry_id)
+
+    def best(self, text):
+        """
+        Find the most similar name with the same numbers and code words as the text.
+
+        Returns:
+            tuple: (value, name, score) of the best match, or None if no such
+                name shares a trigram with the text; ties go to the earlier entry
+        """
+        grams = trigrams(text)
+        if not grams:
+            return None
+
+        shared = {}
+        for gram in grams:
+            for entry_id in self._postings.get(gram, ()):
+                shared[entry_id] = shared.get(entry_id, 0) + 1
+
+        query_size = len(grams)
+        query_identity = _identity(normalize_name(text))
+        best_id, best_score = None, 0.0
+        for entry_id, count in shared.items():
+            if self._identities[entry_id] != query_identity:
+                continue
+            score = 2.0 * count / (query_size + self._sizes[entry_id])
+            if score > best_score or (score == best_score and entry_id < best_id):
+                best_id, best_score = entry_id, score
+        if best_id is None:
+            return None
+        return self.values[best_id], self.names[best_id], best_score
+
+    def match(self, text, threshold=None):
+        """
+        Find the most similar name if it is similar enough to be accepted.
+
+        Args:
+            text (str): Possibly misspelled name
+            threshold (float): Minimum score, defaults to FUZZY_MATCH_THRESHOLD
+
+        Returns:
+            tuple: (value, name, score), or None if the best match scores below the threshold
+        """
+        if len(normalize_name(text)) < FUZZY_MIN_LENGTH:
+            return None
+        if threshold is None:
+            threshold = FUZZY_MATCH_THRESHOLD
+        found = self.best(text)
+        if found is None or found[2] < threshold:
+            return None
+        return found
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,82 @@
+"""
+Concurrent download and re-upload of the gallery images of an import.
+
+Each image is resolved, downloaded and uploaded by one of
+GALLERY_UPLOAD_WORKERS threads, so a gallery takes about as long as its
+slowest image instead of the sum of all of them. Failed images are retried
+GALLERY_UPLOAD_RETRIES times with a growing delay. Results are keyed by the
+image index, so the gallery keeps the order of the post whatever order the
+uploads finish in.
+"""
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+GALLERY_UPLOAD_WORKERS = int(os.getenv("GALLERY_UPLOAD_WORKERS", "4"))
+# Extra attempts per image after the first one failed
+GALLERY_UPLOAD_RETRIES = int(os.getenv("GALLERY_UPLOAD_RETRIES", "2"))
+# Seconds before the first retry; doubled for every further one
+GALLERY_RETRY_DELAY = float(os.getenv("GALLERY_RETRY_DELAY", "1"))
+
+
+def _upload_with_retries(upload, index, item, retries, retry_delay):
+    for attempt in range(retries + 1):
+        try:
+            url = upload(index, item)
+            if url:
+                return url
+            error = "no URL returned"
+        except Exception as e:
+            error = e
+        if attempt < retries:
+            delay = retry_delay * 2 ** attempt
+            logger.warning(f"⚠️ Gallery image {index} failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+    logger.warning(f"⚠️ Gallery image {index} failed after {retries + 1} attempt(s): {error}")
+    return None
+
+
+def upload_gallery(items, upload, workers=GALLERY_UPLOAD_WORKERS, retries=GALLERY_UPLOAD_RETRIES,
+                   retry_delay=GALLERY_RETRY_DELAY, on_uploaded=None):
+    """
+    Upload gallery images in parallel.
+
+    Args:
+        items (list): (index, item) pairs, e.g. (1, telegram file_id)
+        upload (callable): upload(index, item) returns the uploaded URL, or None
+            (or raises) if the attempt failed; called from worker threads
+        workers (int): Maximum number of images transferred at once
+        retries (int): Extra attempts per image
+        retry_delay (float): Seconds before the first retry of an image
+        on_uploaded (callable): Called as on_uploaded(index, url) in the calling
+            thread for every uploaded image, as soon as it is done
+
+    Returns:
+        dict: index -> URL of the uploaded images
+    """
+    if not items:
+        return {}
+
+    uploaded = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items))),
+                            thread_name_prefix="gallery-upload") as executor:
+        futures = {
+            executor.submit(_upload_with_retries, upload, index, item, retries, retry_delay): index
+            for index, item in items
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            url = future.result()
+            if url:
+                uploaded[index] = url
+                if on_uploaded is not None:
+                    on_uploaded(index, url)
+    return uploaded
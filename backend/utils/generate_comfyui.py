@@ -105,6 +105,10 @@ def generate_with_comfyui(image_url: str, prompt: str, car_model, car_brand, car
         print("⚠️ Пустой результат от Replicate")
         return None
 
+    if str(output).startswith('http'):
+        from backend.utils.generation_outputs import record_generation_output
+        record_generation_output(str(output), car_id=car_id, generator='comfy')
+
     with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_png:
         output_path = temp_png.name
         temp_png.write(output.read())
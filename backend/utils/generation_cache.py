@@ -0,0 +1,146 @@
+"""
+Content-addressed cache of AI image generations.
+
+A generation is identified by the generator, the sha256 of the source image
+content, the sha256 of the prompt and the remaining parameters, so the same
+photo generated with the same prompt and model is found again even when it
+comes from another Telegram URL or another car. Parameters that only name the
+upload (car id, brand, model) are not part of the key. Entries hold the final
+Cloudinary URL; the table keeps the GENERATION_CACHE_MAX_ENTRIES most
+recently used ones.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, func, select
+
+try:
+    from backend.models import GenerationCache
+except ImportError:
+    from models import GenerationCache
+
+try:
+    from backend.utils.image_transfer import downloaded_image
+except ImportError:
+    from utils.image_transfer import downloaded_image
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "5000"))
+# Generator parameter holding the source image URL
+SOURCE_PARAM = 'image_url'
+# Parameters that only decide where the result is uploaded, not what is generated
+NAMING_PARAMS = ('app', 'car_id', 'car_model', 'car_brand')
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Lookups of this process, for the hit rate
+_stats = {'hits': 0, 'misses': 0, 'stored': 0, 'evicted': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def hash_file(path):
+    """sha256 of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for chunk in iter(lambda: source.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_source_image(url):
+    """sha256 of the content of the image at a URL"""
+    with downloaded_image(url) as path:
+        return hash_file(path)
+
+
+def generation_key(generator, params, source_hash):
+    """
+    Cache key of a generation.
+
+    Args:
+        generator (str): Generator path ("module:function")
+        params (dict): Generator parameters
+        source_hash (str): sha256 of the source image content
+
+    Returns:
+        tuple: (cache key, prompt hash or None)
+    """
+    prompt = params.get('prompt')
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest() if prompt else None
+    other = {name: value for name, value in params.items()
+             if name not in NAMING_PARAMS and name not in (SOURCE_PARAM, 'prompt')}
+    material = json.dumps([generator, source_hash, prompt_hash, other], sort_keys=True, default=str)
+    return hashlib.sha256(material.encode('utf-8')).hexdigest(), prompt_hash
+
+
+def lookup_generation(db_session, cache_key):
+    """
+    Find a cached generation and mark it as used.
+
+    Returns:
+        GenerationCache: The entry, or None on a miss
+    """
+    entry = db_session.scalars(select(GenerationCache).where(GenerationCache.cache_key == cache_key)).first()
+    if entry is None:
+        _count('misses')
+        return None
+    entry.hits += 1
+    entry.last_used_at = datetime.utcnow()
+    db_session.commit()
+    _count('hits')
+    return entry
+
+
+def forget_generation(db_session, cache_key):
+    """Drop an entry whose result can no longer be used (e.g. deleted from Cloudinary)"""
+    db_session.execute(delete(GenerationCache).where(GenerationCache.cache_key == cache_key))
+    db_session.commit()
+
+
+def store_generation(db_session, cache_key, generator, source_hash, prompt_hash, result_url, mode=None,
+                     max_entries=GENERATION_CACHE_MAX_ENTRIES):
+    """Cache the result of a generation, evicting the least recently used entries beyond max_entries"""
+    entry = db_session.scalars(select(GenerationCache).where(GenerationCache.cache_key == cache_key)).first()
+    if entry is None:
+        entry = GenerationCache(cache_key=cache_key, generator=generator, source_hash=source_hash,
+                                prompt_hash=prompt_hash, mode=mode, hits=0)
+        db_session.add(entry)
+    entry.result_url = result_url
+    entry.last_used_at = datetime.utcnow()
+    db_session.flush()
+    _count('stored')
+
+    surplus = db_session.scalar(select(func.count(GenerationCache.id))) - max_entries
+    if surplus > 0:
+        oldest = select(GenerationCache.id).order_by(GenerationCache.last_used_at, GenerationCache.id).limit(surplus)
+        db_session.execute(delete(GenerationCache).where(GenerationCache.id.in_(oldest.scalar_subquery())))
+        _count('evicted', surplus)
+    db_session.commit()
+
+
+def get_generation_cache_stats(db_session=None):
+    """Hit rate of this process, plus table size and lifetime hits if a session is given"""
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else None
+    if db_session is not None:
+        entries, total_hits = db_session.execute(
+            select(func.count(GenerationCache.id), func.coalesce(func.sum(GenerationCache.hits), 0))
+        ).one()
+        stats.update(entries=entries, total_hits=total_hits, max_entries=GENERATION_CACHE_MAX_ENTRIES)
+    return stats
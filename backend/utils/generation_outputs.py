@@ -0,0 +1,75 @@
+"""
+Durable record of AI generator outputs.
+
+Generators call record_generation_output() the moment Replicate returns the
+URL of a generated image, before downloading and uploading it. If the upload
+fails afterwards, the output is found again by task id with
+latest_generation_output() instead of being paid for a second time.
+
+The task id is taken from generation_task(), which the caller wraps around
+the generator call, so generators do not need a task id argument. Outputs are
+written on their own connection and committed at once, independent of the
+caller's session and of whether its transaction is rolled back later.
+"""
+
+import threading
+from contextlib import contextmanager
+
+from sqlalchemy import select
+
+try:
+    from backend.models import db, GenerationOutput
+except ImportError:
+    from models import db, GenerationOutput
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Task id of the generation running in this thread
+_current = threading.local()
+
+
+@contextmanager
+def generation_task(task_id):
+    """Attribute the outputs recorded inside the block to an image task"""
+    previous = getattr(_current, 'task_id', None)
+    _current.task_id = task_id
+    try:
+        yield
+    finally:
+        _current.task_id = previous
+
+
+def record_generation_output(output_url, car_id=None, generator=None, task_id=None, bind=None):
+    """
+    Store a generator output URL. Errors are logged, never raised.
+
+    Args:
+        output_url (str): URL returned by the generator
+        car_id (int): Car the image was generated for
+        generator (str): Generator name, e.g. "photon"
+        task_id (str): Image task id; defaults to the enclosing generation_task()
+        bind: Engine to write with; defaults to the Flask-SQLAlchemy engine
+    """
+    task_id = task_id or getattr(_current, 'task_id', None)
+    try:
+        with (bind or db.engine).begin() as connection:
+            connection.execute(GenerationOutput.__table__.insert().values(
+                task_id=task_id, car_id=car_id, generator=generator, output_url=output_url))
+        logger.info(f"📝 Recorded generator output for task {task_id}: {output_url}")
+    except Exception as e:
+        logger.error(f"❌ Could not record generator output {output_url} for task {task_id}: {e}")
+
+
+def latest_generation_output(db_session, task_id):
+    """URL of the last output recorded for an image task, or None"""
+    if not task_id:
+        return None
+    return db_session.scalar(
+        select(GenerationOutput.output_url).where(GenerationOutput.task_id == task_id)
+        .order_by(GenerationOutput.id.desc()).limit(1)
+    )
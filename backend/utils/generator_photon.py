@@ -14,6 +14,12 @@ from PIL import Image
 from utils.file_logger import get_module_logger
 from utils.cloudinary_upload import upload_image
 
+# The same module as the image queue's, so the output is recorded under its generation_task()
+try:
+    from backend.utils.generation_outputs import record_generation_output
+except ImportError:
+    from utils.generation_outputs import record_generation_output
+
 # Use the centralized logger
 logger = get_module_logger(__name__)
 
@@ -151,6 +157,9 @@ def generate_with_photon(prompt: str, image_url: str, car_model: str, car_brand:
         # Log successful receipt of image URL
         logger.info(f"✅ Successfully received image URL from Replicate: {output_url}")
 
+        # Keep the output before the upload, so a failed upload does not cost another generation
+        record_generation_output(output_url, car_id=car_id, generator='photon')
+
         logger.info(f"📥 Downloading generated image from: {output_url}")
 
     except Exception as e:
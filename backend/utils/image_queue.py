@@ -1,117 +1,89 @@
+import importlib
+import inspect
 import os
-import queue
+import socket
 import sys
-import threading
 import time
 from datetime import datetime
 from typing import Dict, Any, List
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
-    from backend.models import db, Car, CarImage
+    from backend.models import db, Car, CarImage, ImageTask as ImageTaskModel
 except ImportError:
-    from models import db, Car, CarImage
+    from models import db, Car, CarImage, ImageTask as ImageTaskModel
 
 from backend.utils.file_logger import get_module_logger
+from backend.utils.generation_cache import (SOURCE_PARAM, forget_generation, generation_key, hash_source_image,
+                                            lookup_generation, store_generation)
+from backend.utils.generation_outputs import generation_task, latest_generation_output
+from backend.utils.image_task_queue import (QUEUED_STATUSES, claim_image_task, count_image_tasks,
+                                            get_retry_policy, release_image_task, renew_image_task_leases,
+                                            retry_delay)
+from backend.utils.image_workers import ImageWorkerPool
 
 logger = get_module_logger(__name__)
 
-# Queue to hold image generation tasks
-image_queue = queue.Queue()
-
-# Track task status
-task_status: Dict[str, Dict[str, Any]] = {}
-
-# Lock for thread-safe access to task_status
-status_lock = threading.Lock()
-
-# Dictionary to store successfully generated images that had upload failures
-# Key: task_id, Value: {"output_url": url, "timestamp": time}
-generated_cache = {}
-generated_cache_lock = threading.Lock()
-CACHE_EXPIRY_SECONDS = 60 * 30  # Cache generated images for 30 minutes
-
-
-# Clean old entries from the cache periodically
-def clean_generated_cache():
-    current_time = time.time()
-    with generated_cache_lock:
-        to_remove = []
-        for task_id, data in generated_cache.items():
-            if current_time - data["timestamp"] > CACHE_EXPIRY_SECONDS:
-                to_remove.append(task_id)
-
-        for task_id in to_remove:
-            del generated_cache[task_id]
-            logger.debug(f"Removed expired cache entry for task {task_id}")
-
-
-def add_to_generated_cache(task_id, output_url):
-    """Cache a successfully generated image for later upload attempts"""
-    with generated_cache_lock:
-        generated_cache[task_id] = {
-            "output_url": output_url,
-            "timestamp": time.time()
-        }
-        logger.info(f"✅ Cached generated image URL for task {task_id}")
-
-
-def get_from_generated_cache(task_id):
-    """Retrieve a cached generated image if available"""
-    clean_generated_cache()  # Clean expired entries
-    with generated_cache_lock:
-        if task_id in generated_cache:
-            return generated_cache[task_id]["output_url"]
-    return None
-
-
-class ImageTask:
-    """Represents an image generation task"""
-
-    def __init__(self,
-                 task_id: str,
-                 car_id: int,
-                 generator_func: callable,
-                 params: Dict[str, Any],
-                 max_retries: int = 3,
-                 retry_delay: int = 30):
-        self.task_id = task_id
-        self.car_id = car_id
-        self.generator_func = generator_func
-        self.params = params
-        self.max_retries = max_retries
-        self.retry_delay = retry_delay
-        self.retries = 0
-        self.created_at = datetime.now()
-
-    def to_dict(self) -> Dict[str, Any]:
-        """Convert task to dictionary for status tracking"""
-        return {
-            'task_id': self.task_id,
-            'car_id': self.car_id,
-            'status': 'pending',
-            'retries': self.retries,
-            'created_at': self.created_at.isoformat(),
-            'last_update': datetime.now().isoformat(),
-            'result': None,
-            'error': None
-        }
+# ImageTask.source of tasks started by the admin "generate from gallery" action
+GALLERY_AI_SOURCE = 'gallery_ai'
+# Prefix of the worker ids written to image_tasks.locked_by
+_process_id = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def generator_path(generator_func: callable) -> str:
+    """The "module:function" name a generator is stored under in image_tasks.generator"""
+    return f"{generator_func.__module__}:{generator_func.__qualname__}"
+
+
+def resolve_generator(path: str):
+    """Import the generator function stored as "module:function", or None if it cannot be found"""
+    try:
+        module_name, _, name = path.partition(':')
+        return getattr(importlib.import_module(module_name), name)
+    except (ImportError, AttributeError, ValueError) as e:
+        logger.error(f"❌ Unknown image generator {path}: {e}")
+        return None
+
+
+def _generation_cache_key(generator: str, params: Dict[str, Any]):
+    """(cache key, source hash, prompt hash) of a generation, or None if it cannot be cached"""
+    source_url = params.get(SOURCE_PARAM)
+    if not source_url:
+        return None
+    try:
+        source_hash = hash_source_image(source_url)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not hash source image {source_url}, skipping the generation cache: {e}")
+        return None
+    cache_key, prompt_hash = generation_key(generator, params, source_hash)
+    return cache_key, source_hash, prompt_hash
 
 
 def enqueue_image_task(car_id: int, generator_func: callable, params: Dict[str, Any], 
-                     max_retries: int = 3, source: str = 'ai_generation', 
+                     max_retries: int = None, source: str = 'ai_generation', 
                      source_image_id: int = None, prompt: str = None, 
                      source_url: str = None, app=None) -> str:
-    """Add an image generation task to the queue"""
+    """
+    Store an image generation task in the image_tasks queue.
+
+    The generator is stored by its import path and params as JSON, so any
+    process can run the task; the Flask app is passed to generators that take
+    an `app` argument when the task runs. max_retries defaults to the retry
+    policy registered for the generator.
+
+    Raises:
+        SQLAlchemyError: If the task could not be stored
+    """
     task_id = f"img_task_{car_id}_{int(time.time())}"
+    generator = generator_path(generator_func)
+    if max_retries is None:
+        max_retries = get_retry_policy(generator).max_retries
 
     from flask import current_app
-    from .models import db, ImageTask as ImageTaskModel
-    
+
     if app is None:
         app = current_app._get_current_object()
-    
-    # Create database record
+
     with app.app_context():
         try:
             db_task = ImageTaskModel(
@@ -121,7 +93,10 @@ def enqueue_image_task(car_id: int, generator_func: callable, params: Dict[str,
                 status='pending',
                 source_image_id=source_image_id,
                 prompt=prompt,
-                source_url=source_url
+                source_url=source_url,
+                generator=generator,
+                params={key: value for key, value in params.items() if key != 'app'},
+                max_retries=max_retries
             )
             db.session.add(db_task)
             db.session.commit()
@@ -129,26 +104,17 @@ def enqueue_image_task(car_id: int, generator_func: callable, params: Dict[str,
         except Exception as e:
             logger.error(f"Failed to create task record in database: {str(e)}")
             db.session.rollback()
-    
-    # Create and enqueue the task
-    task = ImageTask(
-        task_id=task_id,
-        car_id=car_id,
-        generator_func=generator_func,
-        params=params,
-        max_retries=max_retries
-    )
-    image_queue.put(task)
-    
-    # Initialize task status
-    update_task_status(task_id, 'pending', app=app)
-    
+            raise
+
+    if _image_processor is not None:
+        _image_processor.wake()
+
     return task_id
 
 
 def update_task_status(task_id: str, status: str, result: Any = None, error: str = None, app=None):
     """
-    Update the status of a task in both memory and database
+    Update the status of a task in the database
     
     Args:
         task_id: Unique task identifier
@@ -158,34 +124,18 @@ def update_task_status(task_id: str, status: str, result: Any = None, error: str
         app: Flask app context (optional, will use current_app if None)
     """
     from flask import current_app
-    from .models import db, ImageTask
-    
+
     if app is None:
         app = current_app._get_current_object()
-    
-    # Update in-memory status
-    with status_lock:
-        if task_id not in task_status:
-            task_status[task_id] = {}
-            
-        task_status[task_id].update({
-            'status': status,
-            'last_update': datetime.now().isoformat()
-        })
-        
-        if result is not None:
-            task_status[task_id]['result'] = result
-            
-        if error is not None:
-            task_status[task_id]['error'] = error
-    
-    # Update database
+
     with app.app_context():
         try:
-            task = ImageTask.query.filter_by(task_id=task_id).first()
+            task = ImageTaskModel.query.filter_by(task_id=task_id).first()
             if task:
                 task.status = status
                 task.error = error
+                task.locked_by = None
+                task.locked_at = None
                 
                 if status == 'completed' and result:
                     if isinstance(result, dict):
@@ -203,38 +153,54 @@ def update_task_status(task_id: str, status: str, result: Any = None, error: str
 
 def get_task_status(task_id: str) -> Dict[str, Any]:
     """Get the current status of a task"""
-    with status_lock:
-        return task_status.get(task_id, {'status': 'unknown', 'error': 'Task not found'})
+    task = ImageTaskModel.query.filter_by(task_id=task_id).first()
+    if task is None:
+        return {'status': 'unknown', 'error': 'Task not found'}
+    return task.to_dict()
 
 
 def get_car_tasks(car_id: int) -> List[Dict[str, Any]]:
     """Get all tasks for a specific car"""
-    with status_lock:
-        return [task for task in task_status.values() if task.get('car_id') == car_id]
+    tasks = ImageTaskModel.query.filter_by(car_id=car_id).order_by(ImageTaskModel.id).all()
+    return [task.to_dict() for task in tasks]
 
 
-def process_image_task(task: ImageTask, app):
-    """Process a single image generation task"""
-    from backend.utils.file_logger import get_module_logger
-    from .models import db, ImageTask as ImageTaskModel
-    
-    logger = get_module_logger(__name__)
-    
-    # Update task status to processing
-    update_task_status(task.task_id, 'processing', app=app)
-    
-    # Get the database record for this task
+def add_gallery_generation(car, image_url: str) -> CarImage:
+    """
+    Add an image generated from one of the car's gallery photos, as the admin
+    "generate from gallery" action does: appended after the existing gallery
+    images and set as the car's main image. The caller commits.
+    """
+    brand_name = car.brand.name if car.brand else ''
+    gallery_image = CarImage(
+        car_id=car.id,
+        url=image_url,
+        title=f"AI Generated {datetime.now().strftime('%Y-%m-%d')}",
+        alt=f"AI generated {brand_name} {car.model}",
+        position=len(car.gallery_images) if car.gallery_images else 0
+    )
+    db.session.add(gallery_image)
+    car.image_url = image_url
+    return gallery_image
+
+
+def process_image_task(task_id: str, app):
+    """Process an image generation task claimed from the image_tasks queue"""
     with app.app_context():
-        db_task = ImageTaskModel.query.filter_by(task_id=task.task_id).first()
-        if not db_task:
-            logger.error(f"No database record found for task {task.task_id}")
-            update_task_status(task.task_id, 'failed', error='No database record found', app=app)
+        task = ImageTaskModel.query.filter_by(task_id=task_id).first()
+        if not task:
+            logger.error(f"No database record found for task {task_id}")
+            return
+        generator_func = resolve_generator(task.generator)
+        if generator_func is None:
+            update_task_status(task_id, 'failed', error=f'Unknown generator {task.generator}', app=app)
             return
+        params = dict(task.params or {})
+        if 'app' in inspect.signature(generator_func).parameters:
+            params['app'] = app
+        policy = get_retry_policy(task.generator)
 
     try:
-        # Check if we already have a generated image for this task (to avoid redundant generation)
-        cached_output_url = get_from_generated_cache(task.task_id)
-
         # Run the generator function with app context
         with app.app_context():
             # Get car to verify it still exists
@@ -244,6 +210,9 @@ def process_image_task(task: ImageTask, app):
                 update_task_status(task.task_id, 'failed', error='Car not found', app=app)
                 return
 
+            # Check if an earlier attempt already generated an image (to avoid redundant generation)
+            cached_output_url = latest_generation_output(db.session, task.task_id)
+
             # If we have a cached generated image, skip generation and try upload directly
             result = None
             if cached_output_url:
@@ -252,32 +221,28 @@ def process_image_task(task: ImageTask, app):
                 # Try to download and upload the cached image
                 try:
                     import tempfile
-                    import requests
                     from utils.cloudinary_upload import upload_image
+                    from utils.image_transfer import downloaded_image
 
                     logger.info(f"⬇️ Downloading cached image from: {cached_output_url}")
-                    with tempfile.NamedTemporaryFile(suffix=".jpg") as temp_jpg:
+                    # Stream the image to disk instead of holding it in memory
+                    with downloaded_image(cached_output_url) as downloaded_path:
                         with tempfile.NamedTemporaryFile(suffix=".webp") as temp_webp:
-                            # Download the image
-                            response = requests.get(cached_output_url)
-                            temp_jpg.write(response.content)
-                            temp_jpg.flush()
-
                             # Convert to WebP using the same function as in generator_photon
                             try:
                                 from utils.generator_photon import convert_to_webp
-                                convert_to_webp(temp_jpg.name, temp_webp.name)
+                                convert_to_webp(downloaded_path, temp_webp.name)
                             except ImportError:
                                 # Fallback if conversion function not available
                                 import shutil
-                                shutil.copy(temp_jpg.name, temp_webp.name)
+                                shutil.copy(downloaded_path, temp_webp.name)
 
                             # Upload to Cloudinary
                             result = upload_image(
                                 temp_webp.name,
                                 car_id=task.car_id,
-                                car_name=task.params.get('car_model', ''),
-                                car_brand=task.params.get('car_brand', ''),
+                                car_name=params.get('car_model', ''),
+                                car_brand=params.get('car_brand', ''),
                                 is_main=True,
                                 index="ai"
                             )
@@ -285,31 +250,56 @@ def process_image_task(task: ImageTask, app):
                     logger.error(f"❌ Failed to process cached image: {str(e)}")
                     # We'll fall back to normal generation below if result is None
 
+            # Reuse an earlier generation of the same source photo with the same prompt and model
+            cache_key = None
+            if not result:
+                cache_key = _generation_cache_key(task.generator, params)
+                cached = lookup_generation(db.session, cache_key[0]) if cache_key else None
+                if cached:
+                    from utils.cloudinary_upload import upload_image
+
+                    logger.info(f"💾 Generation cache hit for task {task.task_id}: {cached.result_url}")
+                    # Copy it into this car's folder, the cached image goes away with the car it was made for
+                    result = upload_image(
+                        cached.result_url,
+                        car_id=task.car_id,
+                        car_name=params.get('car_model', ''),
+                        car_brand=params.get('car_brand', ''),
+                        is_main=True,
+                        index="ai"
+                    )
+                    if not result:
+                        forget_generation(db.session, cache_key[0])
+
             # If no cached image or cached processing failed, run normal generation
             if not result:
                 # Separate generation result from upload result
                 generator_output_url = None
+                generator_error = None
 
                 try:
                     # Run the generator function which should return the uploaded URL
-                    result = task.generator_func(**task.params)
-
-                    # If we got None back but no exception, it might be just a Cloudinary upload failure
-                    if not result and 'generator_photon' in str(task.generator_func):
-                        # Try to extract the output URL from the logs - this is a hacky fallback
-                        # but better than regenerating the same image multiple times
-                        import re
-                        with open("/home/aleks/dev/cnauto-site/backend/logs/app_20250430.log", "r") as f:
-                            log_content = f.read()
-                            match = re.search(f"Downloading generated image from: (https?://.*?)\\n", log_content)
-                            if match:
-                                generator_output_url = match.group(1)
-                                logger.info(f"📝 Extracted generated image URL from logs: {generator_output_url}")
-                                if generator_output_url:
-                                    add_to_generated_cache(task.task_id, generator_output_url)
+                    with generation_task(task.task_id):
+                        result = generator_func(**params)
+                    if result and cache_key:
+                        try:
+                            store_generation(db.session, cache_key[0], task.generator, cache_key[1], cache_key[2],
+                                             result, mode=params.get('mode'))
+                        except Exception as e:
+                            logger.warning(f"⚠️ Could not cache generation of task {task.task_id}: {e}")
+                            db.session.rollback()
+
                 except Exception as e:
+                    generator_error = e
                     logger.error(f"❌ Generator function error: {str(e)}")
 
+                # If we got None back, it might be just a Cloudinary upload failure after the
+                # generator recorded its output; the next attempt uploads that output
+                if not result:
+                    generator_output_url = latest_generation_output(db.session, task.task_id)
+                    if generator_output_url == cached_output_url:
+                        generator_output_url = None
+
             if result:
                 # Update the car with the generated image
                 car.image_url = result
@@ -319,19 +309,23 @@ def process_image_task(task: ImageTask, app):
                     # Explicitly refresh the car object to avoid stale data
                     db.session.refresh(car)
 
-                    # Set the image and verify the change
-                    car.image_url = result
-                    db.session.add(car)
-
-                    # Also create a gallery image
-                    gallery_image = CarImage(
-                        car_id=task.car_id,
-                        url=result,
-                        title=f"AI Generated {datetime.now().strftime('%Y-%m-%d')}",
-                        alt="AI generated image",
-                        position=999  # High position to put it at the end
-                    )
-                    db.session.add(gallery_image)
+                    if task.source == GALLERY_AI_SOURCE:
+                        # Finish an admin "generate from gallery" run the way the admin action does
+                        add_gallery_generation(car, result)
+                    else:
+                        # Set the image and verify the change
+                        car.image_url = result
+                        db.session.add(car)
+
+                        # Also create a gallery image
+                        gallery_image = CarImage(
+                            car_id=task.car_id,
+                            url=result,
+                            title=f"AI Generated {datetime.now().strftime('%Y-%m-%d')}",
+                            alt="AI generated image",
+                            position=999  # High position to put it at the end
+                        )
+                        db.session.add(gallery_image)
 
                     # Commit changes
                     db.session.commit()
@@ -377,19 +371,22 @@ def process_image_task(task: ImageTask, app):
                 update_task_status(task.task_id, 'completed', result=result)
             else:
                 # If we've cached a generated image, don't retry the generation
-                if generator_output_url:
-                    logger.warning(f"⚠️ Image upload failed, but generation succeeded. Will retry upload later.")
-                    update_task_status(task.task_id, 'waiting_upload', error='Upload failed but generation succeeded')
-                    # Put back in queue with lower retry count
-                    time.sleep(task.retry_delay)
-                    image_queue.put(task)
+                if generator_output_url and task.attempts <= task.max_retries:
+                    delay = retry_delay(policy, task.attempts)
+                    logger.warning(f"⚠️ Image upload failed, but generation succeeded. "
+                                   f"Will retry upload in {delay:.0f}s.")
+                    release_image_task(db.session, task_id, 'waiting_upload',
+                                       error='Upload failed but generation succeeded', delay=delay)
+                elif generator_error is not None and policy.is_fatal(generator_error):
+                    logger.error(f"❌ Image generation failed with a non-retryable error: {generator_error}")
+                    update_task_status(task.task_id, 'failed', error=f'Error: {generator_error}')
                 # Retry if within retry limit
-                elif task.retries < task.max_retries:
-                    task.retries += 1
-                    logger.warning(f"⚠️ Image generation failed, retrying ({task.retries}/{task.max_retries})")
-                    update_task_status(task.task_id, 'retrying', error='Generation returned None')
-                    time.sleep(task.retry_delay)
-                    image_queue.put(task)  # Put back in the queue
+                elif task.attempts <= task.max_retries:
+                    delay = retry_delay(policy, task.attempts)
+                    logger.warning(f"⚠️ Image generation failed, retrying in {delay:.0f}s "
+                                   f"({task.attempts}/{task.max_retries})")
+                    release_image_task(db.session, task_id, 'retrying',
+                                       error=str(generator_error or 'Generation returned None'), delay=delay)
                 else:
                     logger.error(f"❌ Image generation failed after {task.max_retries} attempts")
                     update_task_status(task.task_id, 'failed', error=f'Failed after {task.max_retries} attempts')
@@ -398,53 +395,61 @@ def process_image_task(task: ImageTask, app):
         logger.exception("Traceback:")
 
         # Retry if within retry limit
-        if task.retries < task.max_retries:
-            task.retries += 1
-            logger.warning(f"⚠️ Processing error, retrying ({task.retries}/{task.max_retries})")
-            update_task_status(task.task_id, 'retrying', error=str(e))
-            time.sleep(task.retry_delay)
-            image_queue.put(task)
+        if not policy.is_fatal(e) and task.attempts <= task.max_retries:
+            delay = retry_delay(policy, task.attempts)
+            logger.warning(f"⚠️ Processing error, retrying in {delay:.0f}s ({task.attempts}/{task.max_retries})")
+            with app.app_context():
+                release_image_task(db.session, task_id, 'retrying', error=str(e), delay=delay)
         else:
-            logger.error(f"❌ Processing failed after {task.max_retries} attempts")
-            update_task_status(task.task_id, 'failed', error=f'Error: {str(e)}')
+            logger.error(f"❌ Processing failed after {task.attempts} attempt(s)")
+            update_task_status(task.task_id, 'failed', error=f'Error: {str(e)}', app=app)
 
 
-def image_processor_worker(app) -> None:
-    """Worker function to process image tasks from the queue"""
-    logger.info("🚀 Starting image processor worker")
+def _claim_task(app, worker_name):
+    with app.app_context():
+        task = claim_image_task(db.session, f"{_process_id}:{worker_name}")
+        return task.task_id if task else None
 
-    while True:
-        try:
-            # Get a task from the queue
-            task = image_queue.get(block=True, timeout=1)
 
-            # Process the task
-            process_image_task(task, app)
+def _renew_leases(app, task_ids, worker_names):
+    with app.app_context():
+        renew_image_task_leases(db.session, task_ids, [f"{_process_id}:{name}" for name in worker_names])
 
-            # Mark the task as done
-            image_queue.task_done()
-        except queue.Empty:
-            # No tasks in queue, just continue
-            pass
-        except Exception as e:
-            logger.exception(f"❌ Unexpected error in image processor worker: {str(e)}")
-            # Sleep a bit to prevent excessive CPU usage in case of recurring errors
-            time.sleep(5)
 
-        # Periodically log that the worker is still running
-        if int(time.time()) % 120 == 0:  # Log every 2 minutes (approximately)
-            logger.debug(f"⚙️ Image processor worker is active - {image_queue.qsize()} tasks in queue")
+def _queue_depth(app):
+    with app.app_context():
+        counts = count_image_tasks(db.session)
+        return sum(counts.get(status, 0) for status in QUEUED_STATUSES)
+
 
+# The running pool, started by start_image_processor()
+_image_processor = None
 
-def start_image_processor(app) -> threading.Thread:
-    """Start the image processor worker thread"""
-    worker_thread = threading.Thread(
-        target=image_processor_worker,
-        args=(app,),
-        daemon=True
-    )
-    worker_thread.name = "ImageProcessorThread"  # Name the thread for easier debugging
-    worker_thread.start()
-    logger.info(f"✅ Image processor worker thread started: {worker_thread.name} (id: {worker_thread.ident})")
 
-    return worker_thread
+def start_image_processor(app, workers=None) -> ImageWorkerPool:
+    """
+    Start the pool of image generation workers (IMAGE_WORKERS threads by default).
+
+    Tasks left pending or retrying by an earlier run are picked up right away;
+    tasks that were running in a process that died are claimed again once
+    their lease expires.
+    """
+    global _image_processor
+    if _image_processor is None:
+        options = {} if workers is None else {'workers': workers}
+        _image_processor = ImageWorkerPool(
+            lambda task_id: process_image_task(task_id, app),
+            lambda worker_name: _claim_task(app, worker_name),
+            renew=lambda task_ids, worker_names: _renew_leases(app, task_ids, worker_names),
+            queue_depth=lambda: _queue_depth(app),
+            **options
+        ).start()
+        pending = _queue_depth(app)
+        if pending:
+            logger.info(f"♻️ {pending} image task(s) queued before the start will be processed")
+    return _image_processor
+
+
+def get_image_processor():
+    """Get the image worker pool, or None if it has not been started in this process"""
+    return _image_processor
@@ -0,0 +1,264 @@
+"""
+Durable queue of AI image generation tasks in the image_tasks table.
+
+enqueue_image_task() only inserts a row with the generator and its
+parameters; image workers of any process claim rows one at a time, so tasks
+survive restarts and several gunicorn workers share one queue. On PostgreSQL
+the oldest claimable row is locked with SELECT ... FOR UPDATE SKIP LOCKED;
+other databases (SQLite in development and tests) claim with a
+compare-and-set UPDATE instead.
+
+A claimed task carries a lease (locked_by/locked_at) that its worker refreshes
+while it runs; a task whose lease is older than IMAGE_TASK_LEASE seconds is
+claimed again, unless that was its last allowed attempt: the task then most
+likely crashed its worker and is marked failed. A task is never claimed while
+another task of the same car is running, so generations of one car do not
+race on Car.image_url.
+
+A failed task is not retried by a sleeping worker: it goes back to the queue
+with next_attempt_at set by exponential backoff with jitter, and is not
+claimable before then. How often and how fast a task is retried, and which
+errors are not worth retrying, is a RetryPolicy registered per generator.
+"""
+
+import os
+import random
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+import requests
+
+from sqlalchemy import and_, exists, func, or_, select, update
+from sqlalchemy.orm import aliased
+
+try:
+    from backend.models import ImageTask
+except ImportError:
+    from models import ImageTask
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Seconds without a heartbeat after which a processing task is claimed again
+IMAGE_TASK_LEASE = int(os.getenv("IMAGE_TASK_LEASE", "300"))
+# Statuses of tasks waiting for a worker
+QUEUED_STATUSES = ('pending', 'retrying', 'waiting_upload')
+# Candidates tried per claim by the compare-and-set fallback
+CLAIM_CANDIDATES = 5
+# Backoff of the first retry and the longest backoff, in seconds
+IMAGE_TASK_RETRY_DELAY = int(os.getenv("IMAGE_TASK_RETRY_DELAY", "30"))
+IMAGE_TASK_MAX_RETRY_DELAY = int(os.getenv("IMAGE_TASK_MAX_RETRY_DELAY", "900"))
+
+RetryPolicy = namedtuple('RetryPolicy', ['max_retries', 'base_delay', 'max_delay', 'is_fatal'])
+
+
+def is_fatal_error(error):
+    """Errors that fail the same way on every attempt: bad input, programming errors, HTTP 4xx"""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return 400 <= status < 500 and status not in (408, 409, 425, 429)
+    return isinstance(error, (TypeError, ValueError, KeyError, AttributeError))
+
+
+DEFAULT_RETRY_POLICY = RetryPolicy(max_retries=3, base_delay=IMAGE_TASK_RETRY_DELAY,
+                                   max_delay=IMAGE_TASK_MAX_RETRY_DELAY, is_fatal=is_fatal_error)
+
+# generator path ("module:function") -> RetryPolicy
+_retry_policies = {}
+
+
+def register_retry_policy(generator, **options):
+    """
+    Set how tasks of a generator are retried.
+
+    Args:
+        generator (str): Generator path, as stored in image_tasks.generator
+        **options: RetryPolicy fields that differ from DEFAULT_RETRY_POLICY
+            (max_retries, base_delay, max_delay, is_fatal)
+    """
+    _retry_policies[generator] = DEFAULT_RETRY_POLICY._replace(**options)
+
+
+def get_retry_policy(generator):
+    return _retry_policies.get(generator, DEFAULT_RETRY_POLICY)
+
+
+def retry_delay(policy, attempt):
+    """
+    Backoff before the next attempt after `attempt` failed attempts.
+
+    The delay doubles with every attempt up to policy.max_delay; half of it is
+    random, so tasks that failed together (an API outage) do not all come back
+    at the same moment.
+    """
+    delay = min(policy.max_delay, policy.base_delay * 2 ** max(attempt - 1, 0))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def count_image_tasks(db_session):
+    """Number of queued image tasks per status"""
+    return dict(db_session.execute(
+        select(ImageTask.status, func.count(ImageTask.id))
+        .where(ImageTask.generator.isnot(None)).group_by(ImageTask.status)
+    ).all())
+
+
+def _claimable(now, lease):
+    expired = now - timedelta(seconds=lease)
+    running = aliased(ImageTask)
+    car_busy = exists().where(
+        running.car_id == ImageTask.car_id,
+        running.id != ImageTask.id,
+        running.status == 'processing',
+        running.locked_at >= expired,
+    )
+    return and_(
+        ImageTask.generator.isnot(None),
+        or_(ImageTask.next_attempt_at.is_(None), ImageTask.next_attempt_at <= now),
+        or_(
+            ImageTask.status.in_(QUEUED_STATUSES),
+            and_(ImageTask.status == 'processing', ImageTask.locked_at < expired),
+        ),
+        ~car_busy,
+    )
+
+
+def _car_claimed_concurrently(db_session, task, now, lease):
+    """Whether another task of the same car is running, claimed at the same time as this one"""
+    if task.car_id is None:
+        return False
+    return db_session.scalar(select(exists().where(
+        ImageTask.car_id == task.car_id,
+        ImageTask.id != task.id,
+        ImageTask.status == 'processing',
+        ImageTask.locked_at >= now - timedelta(seconds=lease),
+    )))
+
+
+def _abandoned(status, attempts, max_retries):
+    """
+    Whether a claimable task is a processing one whose lease expired during its last allowed attempt.
+
+    Such a task most likely took its worker down (OOM, hard crash); claiming it
+    again would crash workers forever instead of failing the task.
+    """
+    return status == 'processing' and attempts > max_retries
+
+
+def _abandoned_values(attempts, now):
+    return {'status': 'failed', 'locked_by': None, 'locked_at': None, 'updated_at': now,
+            'error': f'Worker lost during attempt {attempts} (lease expired); no retries left'}
+
+
+def claim_image_task(db_session, worker_id, lease=IMAGE_TASK_LEASE):
+    """
+    Claim the oldest queued task whose car has no other task running.
+
+    A task whose worker was lost during its last allowed attempt is marked
+    failed instead of being claimed.
+
+    Args:
+        db_session: SQLAlchemy session
+        worker_id (str): Identifies the claiming worker in locked_by
+        lease (int): Lease length in seconds
+
+    Returns:
+        ImageTask: The claimed task, committed as processing, or None if there is none
+    """
+    now = datetime.utcnow()
+    claim = {'status': 'processing', 'locked_by': worker_id, 'locked_at': now,
+             'attempts': ImageTask.attempts + 1, 'updated_at': now}
+
+    task = None
+    if db_session.get_bind().dialect.name == 'postgresql':
+        while task is None:
+            task = db_session.scalars(
+                select(ImageTask).where(_claimable(now, lease)).order_by(ImageTask.id).limit(1)
+                .with_for_update(skip_locked=True)
+            ).first()
+            if task is None:
+                break
+            if _abandoned(task.status, task.attempts, task.max_retries):
+                db_session.execute(update(ImageTask).where(ImageTask.id == task.id)
+                                   .values(**_abandoned_values(task.attempts, now)))
+                db_session.commit()
+                logger.error(f"❌ Image task {task.task_id} failed: its worker was lost during the last attempt")
+                task = None
+                continue
+            db_session.execute(update(ImageTask).where(ImageTask.id == task.id).values(**claim))
+            db_session.commit()
+    else:
+        # Polling fallback: the UPDATE only succeeds if no other worker changed the row since it was read
+        candidates = db_session.execute(
+            select(ImageTask.id, ImageTask.task_id, ImageTask.status, ImageTask.locked_at,
+                   ImageTask.attempts, ImageTask.max_retries)
+            .where(_claimable(now, lease)).order_by(ImageTask.id).limit(CLAIM_CANDIDATES)
+        ).all()
+        for row_id, task_id, status, locked_at, attempts, max_retries in candidates:
+            unchanged = ImageTask.locked_at.is_(None) if locked_at is None else ImageTask.locked_at == locked_at
+            abandoned = _abandoned(status, attempts, max_retries)
+            result = db_session.execute(
+                update(ImageTask).where(ImageTask.id == row_id, ImageTask.status == status, unchanged)
+                .values(**(_abandoned_values(attempts, now) if abandoned else claim))
+            )
+            if result.rowcount != 1:
+                continue
+            db_session.commit()
+            if abandoned:
+                logger.error(f"❌ Image task {task_id} failed: its worker was lost during the last attempt")
+                continue
+            task = db_session.get(ImageTask, row_id)
+            break
+
+    if task is None:
+        db_session.rollback()
+        return None
+
+    # Two workers may claim tasks of the same car at once (neither saw the other running);
+    # whichever commits last sees the other one and puts its task back in the queue
+    db_session.refresh(task)
+    if _car_claimed_concurrently(db_session, task, now, lease):
+        task.status = 'pending'
+        task.attempts -= 1
+        task.locked_by = None
+        task.locked_at = None
+        db_session.commit()
+        return None
+    return task
+
+
+def release_image_task(db_session, task_id, status, error=None, delay=0):
+    """
+    Put a processing task back in the queue.
+
+    Args:
+        db_session: SQLAlchemy session
+        task_id (str): Task id
+        status (str): Queued status, 'retrying' or 'waiting_upload'
+        error (str): Error of the failed attempt
+        delay (float): Seconds before the task can be claimed again
+    """
+    now = datetime.utcnow()
+    db_session.execute(
+        update(ImageTask).where(ImageTask.task_id == task_id, ImageTask.status == 'processing')
+        .values(status=status, error=error, locked_by=None, locked_at=None, updated_at=now,
+                next_attempt_at=now + timedelta(seconds=delay))
+    )
+    db_session.commit()
+
+
+def renew_image_task_leases(db_session, task_ids, worker_ids):
+    """Refresh the leases of processing tasks (by task_id) still held by the given workers"""
+    if not task_ids:
+        return 0
+    result = db_session.execute(
+        update(ImageTask)
+        .where(ImageTask.task_id.in_(task_ids), ImageTask.status == 'processing', ImageTask.locked_by.in_(worker_ids))
+        .values(locked_at=datetime.utcnow())
+    )
+    db_session.commit()
+    return result.rowcount
@@ -0,0 +1,127 @@
+"""
+Streaming, size-capped image downloads.
+
+downloaded_image() streams a URL in DOWNLOAD_CHUNK_SIZE chunks straight into a
+temporary file, so memory use per transfer stays the same however large the
+image is. The Content-Type header and the first bytes of the body are checked
+before anything is written: a non-image (an HTML error page, a truncated
+Telegram response) is rejected after one chunk instead of being downloaded and
+uploaded. Downloads larger than IMAGE_MAX_BYTES are aborted.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+import requests
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+IMAGE_MAX_BYTES = int(os.getenv("IMAGE_MAX_BYTES", str(25 * 1024 * 1024)))
+IMAGE_DOWNLOAD_TIMEOUT = float(os.getenv("IMAGE_DOWNLOAD_TIMEOUT", "30"))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# Bytes needed to recognize every format in detect_image_type()
+MAGIC_BYTES_LENGTH = 12
+# Telegram serves files as application/octet-stream
+GENERIC_CONTENT_TYPES = ('application/octet-stream', 'binary/octet-stream')
+
+
+class ImageDownloadError(Exception):
+    """The URL did not return an acceptable image"""
+
+
+def detect_image_type(head):
+    """
+    Recognize an image format from the first bytes of a file.
+
+    Returns:
+        str: File extension (".jpg", ".png", ".webp", ".gif", ".heic", ".avif",
+            ".bmp") or None if the bytes are not a supported image
+    """
+    if head.startswith(b'\xff\xd8\xff'):
+        return '.jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return '.png'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return '.gif'
+    if head[4:8] == b'ftyp':
+        brand = head[8:12]
+        if brand in (b'heic', b'heix', b'mif1', b'msf1'):
+            return '.heic'
+        if brand in (b'avif', b'avis'):
+            return '.avif'
+    if head.startswith(b'BM'):
+        return '.bmp'
+    return None
+
+
+@contextmanager
+def downloaded_image(url, max_bytes=IMAGE_MAX_BYTES, timeout=IMAGE_DOWNLOAD_TIMEOUT, session=None):
+    """
+    Stream an image into a temporary file that is deleted when the block exits.
+
+    Args:
+        url (str): Image URL
+        max_bytes (int): Largest accepted image
+        timeout (float): Connect/read timeout in seconds
+        session: Optional requests.Session to download with
+
+    Yields:
+        str: Path of the temporary file, with the extension of the detected format
+
+    Raises:
+        ImageDownloadError: If the response is not a supported image or is too large
+        requests.RequestException: On network and HTTP errors
+    """
+    http = session or requests
+    with http.get(url, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type and not content_type.startswith('image/') and content_type not in GENERIC_CONTENT_TYPES:
+            raise ImageDownloadError(f"Unexpected content type {content_type}")
+        content_length = response.headers.get('Content-Length', '')
+        if content_length.isdigit() and int(content_length) > max_bytes:
+            raise ImageDownloadError(f"Image is {content_length} bytes, more than the {max_bytes} allowed")
+
+        # Check the format on the first bytes, before anything is written
+        chunks = response.iter_content(DOWNLOAD_CHUNK_SIZE)
+        head = b''
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= MAGIC_BYTES_LENGTH:
+                break
+        extension = detect_image_type(head)
+        if extension is None:
+            raise ImageDownloadError(f"Not a supported image (starts with {head[:MAGIC_BYTES_LENGTH]!r})")
+
+        fd, path = tempfile.mkstemp(suffix=extension)
+        try:
+            size = len(head)
+            with os.fdopen(fd, 'wb') as image_file:
+                image_file.write(head)
+                for chunk in chunks:
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise ImageDownloadError(f"Image is larger than the {max_bytes} bytes allowed")
+                    image_file.write(chunk)
+            if size > max_bytes:
+                raise ImageDownloadError(f"Image is larger than the {max_bytes} bytes allowed")
+        except BaseException:
+            os.unlink(path)
+            raise
+
+    try:
+        yield path
+    finally:
+        try:
+            os.unlink(path)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not delete temporary image {path}: {e}")
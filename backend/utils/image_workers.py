@@ -0,0 +1,251 @@
+"""
+Pool of image generation workers.
+
+A Replicate prediction blocks its worker for 20-60 seconds, so
+ImageWorkerPool runs IMAGE_WORKERS threads that claim tasks from the
+image_tasks queue (utils/image_task_queue.py) instead of a single one. The
+claim never hands out a task of a car that already has one running, so two
+generations never race on Car.image_url.
+
+The pool can be resized while it runs; surplus workers exit after their
+current task. A supervisor thread renews the leases of running tasks,
+replaces workers whose thread died and logs workers busy for longer than
+IMAGE_WORKER_STUCK_AFTER seconds. stats() reports the health and utilization
+of every worker.
+"""
+
+import itertools
+import os
+import threading
+import time
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "3"))
+# Seconds a worker may spend on one task before it is reported as stuck
+IMAGE_WORKER_STUCK_AFTER = int(os.getenv("IMAGE_WORKER_STUCK_AFTER", "600"))
+IMAGE_WORKER_POLL_INTERVAL = float(os.getenv("IMAGE_WORKER_POLL_INTERVAL", "2"))
+# Seconds between lease renewals and health checks; well below IMAGE_TASK_LEASE
+IMAGE_WORKER_SUPERVISE_INTERVAL = 10.0
+
+
+class _Worker:
+    """Thread and health counters of one pool worker"""
+
+    def __init__(self, name):
+        self.name = name
+        self.thread = None
+        self.stop = threading.Event()
+        self.started_at = time.monotonic()
+        self.last_seen = self.started_at
+        self.task_id = None
+        self.task_started_at = None
+        self.busy_seconds = 0.0
+        self.completed = 0
+        self.errors = 0
+
+    def status(self, now):
+        if not self.thread.is_alive():
+            return 'dead'
+        # Read once: the worker thread clears it without taking the pool lock
+        task_started_at = self.task_started_at
+        if task_started_at is not None:
+            return 'stuck' if now - task_started_at > IMAGE_WORKER_STUCK_AFTER else 'busy'
+        return 'stopping' if self.stop.is_set() else 'idle'
+
+    def to_dict(self, now):
+        task_started_at = self.task_started_at
+        task_seconds = now - task_started_at if task_started_at is not None else None
+        busy = self.busy_seconds + (task_seconds or 0.0)
+        uptime = max(now - self.started_at, 1e-9)
+        return {
+            'name': self.name,
+            'status': self.status(now),
+            'task_id': self.task_id,
+            'task_seconds': round(task_seconds, 1) if task_seconds is not None else None,
+            'seconds_since_seen': round(now - self.last_seen, 1),
+            'completed': self.completed,
+            'errors': self.errors,
+            'utilization': round(min(busy / uptime, 1.0), 3),
+        }
+
+
+class ImageWorkerPool:
+    """Resizable pool of threads claiming and processing image tasks"""
+
+    def __init__(self, handler, claim, workers=IMAGE_WORKERS, renew=None, queue_depth=None,
+                 poll_interval=IMAGE_WORKER_POLL_INTERVAL, supervise_interval=IMAGE_WORKER_SUPERVISE_INTERVAL,
+                 name="image-worker"):
+        """
+        Args:
+            handler (callable): Called as handler(task_id) by a worker thread;
+                exceptions are logged and counted
+            claim (callable): claim(worker_name) returns the id of a task it
+                claimed for that worker, or None if there is none
+            workers (int): Initial number of worker threads
+            renew (callable): renew(task_ids, worker_names) refreshes the leases
+                of the running tasks
+            queue_depth (callable): Returns the number of tasks waiting, for stats()
+            poll_interval (float): Seconds an idle worker waits before claiming
+                again, unless wake() is called
+            supervise_interval (float): Seconds between lease renewals and health checks
+            name (str): Prefix of the thread names
+        """
+        self.handler = handler
+        self.claim = claim
+        self.size = max(0, workers)
+        self.renew = renew
+        self.queue_depth = queue_depth
+        self.poll_interval = poll_interval
+        self.supervise_interval = supervise_interval
+        self.name = name
+        self._workers = []
+        self._numbers = itertools.count()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._supervisor = None
+
+    def start(self):
+        """Start the workers and the supervisor thread"""
+        with self._lock:
+            self._spawn(self.size)
+        self._supervisor = threading.Thread(target=self._supervise, name=f"{self.name}-supervisor", daemon=True)
+        self._supervisor.start()
+        logger.info(f"✅ Image worker pool started with {self.size} workers")
+        return self
+
+    def _spawn(self, count):
+        for _ in range(count):
+            worker = _Worker(f"{self.name}-{next(self._numbers)}")
+            worker.thread = threading.Thread(target=self._work, args=(worker,), name=worker.name, daemon=True)
+            self._workers.append(worker)
+            worker.thread.start()
+
+    def resize(self, workers):
+        """
+        Change the number of workers; surplus workers finish their current task first.
+
+        Returns:
+            int: The new number of workers
+        """
+        workers = max(0, int(workers))
+        with self._lock:
+            active = [worker for worker in self._workers if not worker.stop.is_set()]
+            if workers > len(active):
+                self._spawn(workers - len(active))
+            else:
+                # Stop idle workers before busy ones
+                surplus = sorted(active, key=lambda worker: worker.task_started_at is not None)
+                for worker in surplus[:len(active) - workers]:
+                    worker.stop.set()
+            self.size = workers
+        logger.info(f"🔧 Image worker pool resized to {workers} workers")
+        return workers
+
+    def wake(self):
+        """Let idle workers claim right away, e.g. after a task was enqueued in this process"""
+        self._wakeup.set()
+
+    def _claim(self, worker):
+        try:
+            return self.claim(worker.name)
+        except Exception as e:
+            logger.error(f"❌ {worker.name} could not claim an image task: {e}")
+            return None
+
+    def _work(self, worker):
+        while not worker.stop.is_set() and not self._stopping.is_set():
+            worker.last_seen = time.monotonic()
+            task_id = self._claim(worker)
+            if task_id is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            worker.task_id = task_id
+            worker.task_started_at = time.monotonic()
+            failed = False
+            try:
+                self.handler(task_id)
+            except Exception as e:
+                failed = True
+                logger.exception(f"❌ {worker.name} failed on task {task_id}: {e}")
+            finally:
+                now = time.monotonic()
+                worker.busy_seconds += now - worker.task_started_at
+                worker.task_started_at = None
+                worker.task_id = None
+                worker.last_seen = now
+                # Counted last, so a finished task is never reported as still running
+                worker.errors += int(failed)
+                worker.completed += int(not failed)
+
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        logger.info(f"🛑 {worker.name} stopped")
+
+    def _renew_leases(self):
+        with self._lock:
+            running = {worker.task_id: worker.name for worker in self._workers if worker.task_id is not None}
+        if not running or self.renew is None:
+            return
+        try:
+            self.renew(list(running), list(running.values()))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not renew image task leases: {e}")
+
+    def _supervise(self):
+        while not self._stopping.wait(self.supervise_interval):
+            try:
+                self._supervise_once()
+            except Exception as e:
+                # The supervisor also renews the leases; it must outlive any error
+                logger.exception(f"❌ Image worker supervisor error: {e}")
+
+    def _supervise_once(self):
+        self._renew_leases()
+        now = time.monotonic()
+        with self._lock:
+            dead = [worker for worker in self._workers if not worker.thread.is_alive()]
+            for worker in dead:
+                self._workers.remove(worker)
+            missing = self.size - sum(1 for worker in self._workers if not worker.stop.is_set())
+            if missing > 0:
+                self._spawn(missing)
+            stuck = []
+            for worker in self._workers:
+                task_id, task_started_at = worker.task_id, worker.task_started_at
+                if task_started_at is not None and now - task_started_at > IMAGE_WORKER_STUCK_AFTER:
+                    stuck.append((worker.name, task_id, now - task_started_at))
+        if dead:
+            logger.error(f"❌ Replaced {len(dead)} dead image worker(s)")
+        for name, task_id, seconds in stuck:
+            logger.warning(f"⚠️ {name} has been on task {task_id} for {seconds:.0f}s")
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            workers = [worker.to_dict(now) for worker in self._workers]
+        return {
+            'size': self.size,
+            'queue_depth': self.queue_depth() if self.queue_depth is not None else None,
+            'in_flight': sum(1 for worker in workers if worker['task_id'] is not None),
+            'utilization': round(sum(worker['utilization'] for worker in workers) / len(workers), 3) if workers else 0.0,
+            'workers': workers,
+        }
+
+    def shutdown(self, timeout=30):
+        """Stop all workers, waiting up to `timeout` seconds for running tasks"""
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            threads = [worker.thread for worker in self._workers]
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
@@ -0,0 +1,274 @@
+"""
+Bounded worker pool for Telegram car imports.
+
+Imports are rows of the import_jobs table (see utils/import_jobs.py), served
+by IMPORT_WORKERS threads per process, so a burst of forwarded posts no longer
+downloads images, parses and uploads to Cloudinary all at once. When
+IMPORT_QUEUE_SIZE jobs are already pending submit() raises ImportQueueFull
+with a Retry-After estimate for the endpoint's 429 answer.
+
+Workers claim jobs as soon as one is submitted in this process and poll every
+IMPORT_POLL_INTERVAL seconds for jobs submitted to other replicas. A heartbeat
+thread renews the leases of running jobs. On shutdown the executor stops
+claiming and waits up to IMPORT_SHUTDOWN_TIMEOUT seconds for running jobs;
+pending jobs stay in the table for the next start or another replica.
+"""
+
+import math
+import os
+import socket
+import statistics
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    from backend.utils.import_jobs import (IMPORT_JOB_LEASE, claim_import_job, count_import_jobs,
+                                           enqueue_import_job, fail_import_job, renew_import_job_leases)
+except ImportError:
+    from utils.import_jobs import (IMPORT_JOB_LEASE, claim_import_job, count_import_jobs,
+                                   enqueue_import_job, fail_import_job, renew_import_job_leases)
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "4"))
+IMPORT_QUEUE_SIZE = int(os.getenv("IMPORT_QUEUE_SIZE", "20"))
+IMPORT_POLL_INTERVAL = float(os.getenv("IMPORT_POLL_INTERVAL", "2"))
+IMPORT_SHUTDOWN_TIMEOUT = float(os.getenv("IMPORT_SHUTDOWN_TIMEOUT", "30"))
+# Retry-After (seconds) until a job has finished and its duration is known
+DEFAULT_RETRY_AFTER = 30
+# Number of recent jobs the stage latencies are computed from
+IMPORT_STATS_WINDOW = 200
+
+# Executor running the job of the current worker thread, for import_stage()
+_current = threading.local()
+
+
+class ImportQueueFull(Exception):
+    """Too many import jobs are pending"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Import queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ImportExecutor:
+    """Fixed number of import threads working off the import_jobs table"""
+
+    def __init__(self, handler, session_factory, workers=IMPORT_WORKERS, queue_size=IMPORT_QUEUE_SIZE,
+                 poll_interval=IMPORT_POLL_INTERVAL, lease=IMPORT_JOB_LEASE, on_give_up=None):
+        """
+        Args:
+            handler (callable): Called as handler(db_session, job) for every claimed
+                job; it checkpoints and finishes the job, exceptions count as a
+                failed attempt
+            session_factory (callable): Returns the SQLAlchemy session of the calling thread
+            workers (int): Number of import threads
+            queue_size (int): Pending jobs accepted before submit() refuses more
+            poll_interval (float): Seconds between polls when there is no job
+            lease (int): Seconds a running job stays claimed without a heartbeat
+            on_give_up (callable): Called as on_give_up(job, error) when a job
+                fails for the last time
+        """
+        self.handler = handler
+        self.session_factory = session_factory
+        self.workers = workers
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.on_give_up = on_give_up
+        self._worker_prefix = f"{socket.gethostname()}:{os.getpid()}"
+        self._threads = []
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._stages = {}
+        # Job id -> worker id of the jobs running in this process
+        self._running = {}
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def in_flight(self):
+        return len(self._running)
+
+    def start(self):
+        """Start the import threads and the lease heartbeat"""
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, args=(f"{self._worker_prefix}:{index}",),
+                                      name=f"car-import-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat, name="car-import-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"✅ Import executor started: {self.workers} workers, {self.queue_size} pending jobs max")
+        return self
+
+    def _pending(self, session):
+        return count_import_jobs(session).get('pending', 0)
+
+    def submit(self, data, chat_id):
+        """
+        Store an import job for the workers.
+
+        Returns:
+            int: Id of the pending job
+
+        Raises:
+            ImportQueueFull: If IMPORT_QUEUE_SIZE jobs are pending or the executor is shutting down
+        """
+        session = self.session_factory()
+        try:
+            job = None if self._stopping.is_set() else enqueue_import_job(session, data, chat_id, self.queue_size)
+            if job is None:
+                with self._lock:
+                    self.rejected += 1
+                raise ImportQueueFull(self.retry_after(self._pending(session)))
+            job_id = job.id
+        finally:
+            session.close()
+        with self._lock:
+            self.submitted += 1
+        self._wakeup.set()
+        return job_id
+
+    def _work(self, worker_id):
+        _current.executor = self
+        while not self._stopping.is_set():
+            session = self.session_factory()
+            try:
+                job = claim_import_job(session, worker_id, self.lease)
+                if job is None:
+                    session.close()
+                    self._wakeup.wait(self.poll_interval)
+                    self._wakeup.clear()
+                    continue
+                self._run(session, job, worker_id)
+            except Exception as e:
+                logger.error(f"❌ Import worker {worker_id} error: {e}")
+                session.rollback()
+                self._stopping.wait(self.poll_interval)
+            finally:
+                session.close()
+
+    def _run(self, session, job, worker_id):
+        if job.attempts == 1 and job.created_at:
+            self.record_stage('queue_wait', (datetime.utcnow() - job.created_at).total_seconds() * 1000)
+        with self._lock:
+            self._running[job.id] = worker_id
+        started = time.perf_counter()
+        failed = False
+        try:
+            self.handler(session, job)
+        except Exception as e:
+            failed = True
+            logger.error(f"❌ Import job #{job.id} failed at attempt {job.attempts}: {e}")
+            session.rollback()
+            if fail_import_job(session, job, str(e)) and self.on_give_up is not None:
+                self.on_give_up(job, str(e))
+        finally:
+            self.record_stage('total', (time.perf_counter() - started) * 1000)
+            with self._lock:
+                self._running.pop(job.id, None)
+                self.failed += int(failed)
+                self.completed += int(not failed)
+
+    def _heartbeat(self):
+        while not self._stopping.wait(max(self.lease / 3, 0.1)):
+            with self._lock:
+                running = dict(self._running)
+            if not running:
+                continue
+            session = self.session_factory()
+            try:
+                renew_import_job_leases(session, list(running), list(set(running.values())))
+            except Exception as e:
+                logger.warning(f"⚠️ Could not renew import job leases: {e}")
+                session.rollback()
+            finally:
+                session.close()
+
+    def record_stage(self, name, ms):
+        with self._lock:
+            self._stages.setdefault(name, deque(maxlen=IMPORT_STATS_WINDOW)).append(ms)
+
+    @contextmanager
+    def stage(self, name):
+        """Record the wall time of the block as a stage of the import"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record_stage(name, (time.perf_counter() - started) * 1000)
+
+    def retry_after(self, pending):
+        """Seconds until a pending slot is likely free, from the average job duration"""
+        with self._lock:
+            durations = list(self._stages.get('total', ()))
+        if not durations:
+            return DEFAULT_RETRY_AFTER
+        average_seconds = statistics.fmean(durations) / 1000
+        jobs_ahead = pending + self.in_flight
+        return max(1, math.ceil(average_seconds * jobs_ahead / max(self.workers, 1)))
+
+    def stats(self):
+        session = self.session_factory()
+        try:
+            jobs = count_import_jobs(session)
+        finally:
+            session.close()
+        with self._lock:
+            stages = {name: sorted(samples) for name, samples in self._stages.items() if samples}
+            counters = {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'queue_depth': jobs.get('pending', 0),
+                'jobs': jobs,
+                'in_flight': len(self._running),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+            }
+        counters['stages'] = {
+            name: {
+                'count': len(samples),
+                'p50_ms': round(statistics.median(samples), 3),
+                'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+                'max_ms': round(samples[-1], 3),
+            }
+            for name, samples in stages.items()
+        }
+        return counters
+
+    def shutdown(self, timeout=IMPORT_SHUTDOWN_TIMEOUT):
+        """
+        Stop claiming jobs and wait up to `timeout` seconds for the running ones.
+
+        Pending jobs stay in the table; a job still running when the process
+        exits is resumed by whichever worker claims it after its lease expires.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
+        if self._running:
+            logger.warning(f"⚠️ {len(self._running)} import job(s) still running at shutdown, "
+                           f"they resume after their lease expires")
+
+
+def import_stage(name):
+    """executor.stage(name) for the job running in this thread, or a no-op outside the executor"""
+    executor = getattr(_current, 'executor', None)
+    return executor.stage(name) if executor is not None else nullcontext()
@@ -0,0 +1,191 @@
+"""
+Durable queue of Telegram car imports in the import_jobs table.
+
+/api/import_car only inserts a job row; import workers of any app replica
+claim rows one at a time. On PostgreSQL the oldest claimable row is locked
+with SELECT ... FOR UPDATE SKIP LOCKED, so replicas never claim the same job;
+other databases (SQLite in development and tests) poll and claim with a
+compare-and-set UPDATE instead.
+
+A claimed job carries a lease (locked_by/locked_at) that its worker refreshes
+while it runs. A job whose lease is older than IMPORT_JOB_LEASE seconds (its
+worker was killed by a redeploy) is claimed again, and the new worker resumes
+after the last stage checkpointed in `stage`, with the results of earlier
+stages in `state`.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, insert, literal, or_, select, update
+
+try:
+    from backend.models import ImportJob
+except ImportError:
+    from models import ImportJob
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Seconds without a heartbeat after which a running job is claimed again
+IMPORT_JOB_LEASE = int(os.getenv("IMPORT_JOB_LEASE", "60"))
+# Attempts before a failing job is given up
+IMPORT_JOB_MAX_ATTEMPTS = int(os.getenv("IMPORT_JOB_MAX_ATTEMPTS", "3"))
+# Candidates tried per claim by the compare-and-set fallback
+CLAIM_CANDIDATES = 5
+# PostgreSQL advisory lock serializing enqueue_import_job(max_pending=...)
+ENQUEUE_LOCK_KEY = 0x696d706f7274
+
+
+def enqueue_import_job(db_session, data, chat_id, max_pending=None):
+    """
+    Insert and commit a pending import job for an /api/import_car request body.
+
+    Args:
+        db_session: SQLAlchemy session
+        data (dict): Request body
+        chat_id: Telegram chat to notify
+        max_pending (int): Insert only while fewer jobs are pending. The count
+            and the insert are one INSERT ... SELECT statement, serialized
+            across replicas by an advisory lock on PostgreSQL, so concurrent
+            requests cannot push the queue past the limit
+
+    Returns:
+        ImportJob: The pending job, or None if max_pending jobs are already pending
+    """
+    values = {'payload': data, 'chat_id': str(chat_id) if chat_id is not None else None,
+              'status': 'pending', 'state': {}}
+    if max_pending is None:
+        job = ImportJob(**values)
+        db_session.add(job)
+        db_session.commit()
+        return job
+
+    if db_session.get_bind().dialect.name == 'postgresql':
+        # Held until the commit; other replicas' enqueues wait for it
+        db_session.execute(select(func.pg_advisory_xact_lock(ENQUEUE_LOCK_KEY)))
+    pending = select(func.count(ImportJob.id)).where(ImportJob.status == 'pending').scalar_subquery()
+    row = select(*(literal(value, ImportJob.__table__.c[name].type) for name, value in values.items()))
+    job_id = db_session.scalar(
+        insert(ImportJob).from_select(list(values), row.where(pending < max_pending)).returning(ImportJob.id)
+    )
+    db_session.commit()
+    return db_session.get(ImportJob, job_id) if job_id is not None else None
+
+
+def count_import_jobs(db_session):
+    """Number of import jobs per status"""
+    return dict(db_session.execute(select(ImportJob.status, func.count(ImportJob.id)).group_by(ImportJob.status)).all())
+
+
+def _claimable(now, lease):
+    return or_(
+        ImportJob.status == 'pending',
+        and_(ImportJob.status == 'running', ImportJob.locked_at < now - timedelta(seconds=lease)),
+    )
+
+
+def claim_import_job(db_session, worker_id, lease=IMPORT_JOB_LEASE):
+    """
+    Claim the oldest pending job, or a running job whose worker stopped renewing its lease.
+
+    Args:
+        db_session: SQLAlchemy session
+        worker_id (str): Identifies the claiming worker in locked_by
+        lease (int): Lease length in seconds
+
+    Returns:
+        ImportJob: The claimed job, committed as running, or None if there is none
+    """
+    now = datetime.utcnow()
+    claim = {'status': 'running', 'locked_by': worker_id, 'locked_at': now, 'attempts': ImportJob.attempts + 1}
+
+    if db_session.get_bind().dialect.name == 'postgresql':
+        job = db_session.scalars(
+            select(ImportJob).where(_claimable(now, lease)).order_by(ImportJob.id).limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+        if job is None:
+            db_session.rollback()
+            return None
+        db_session.execute(update(ImportJob).where(ImportJob.id == job.id).values(**claim))
+        db_session.commit()
+        return job
+
+    # Polling fallback: the UPDATE only succeeds if no other worker changed the row since it was read
+    candidates = db_session.execute(
+        select(ImportJob.id, ImportJob.status, ImportJob.locked_at)
+        .where(_claimable(now, lease)).order_by(ImportJob.id).limit(CLAIM_CANDIDATES)
+    ).all()
+    for job_id, status, locked_at in candidates:
+        unchanged = ImportJob.locked_at.is_(None) if locked_at is None else ImportJob.locked_at == locked_at
+        result = db_session.execute(
+            update(ImportJob).where(ImportJob.id == job_id, ImportJob.status == status, unchanged).values(**claim)
+        )
+        if result.rowcount == 1:
+            db_session.commit()
+            return db_session.get(ImportJob, job_id)
+    db_session.rollback()
+    return None
+
+
+def checkpoint_import_job(db_session, job, stage=None, **state):
+    """
+    Commit the results of a stage together with any pending changes of the session.
+
+    Args:
+        db_session: SQLAlchemy session the job was claimed with
+        job (ImportJob): Running job
+        stage (str): Stage that was completed (one of ImportJob.STAGES), or None
+            to only save progress inside the current stage
+        **state: Values stored in job.state for later stages and resumed attempts
+    """
+    if state:
+        job.state = dict(job.state or {}, **state)
+    if stage is not None:
+        job.stage = stage
+    job.locked_at = datetime.utcnow()
+    db_session.commit()
+
+
+def finish_import_job(db_session, job):
+    job.status = 'done'
+    job.error = None
+    job.locked_by = None
+    job.finished_at = datetime.utcnow()
+    db_session.commit()
+
+
+def fail_import_job(db_session, job, error, retry=True):
+    """
+    Record a failed attempt; the job is tried again until IMPORT_JOB_MAX_ATTEMPTS.
+
+    Returns:
+        bool: True if the job was given up
+    """
+    given_up = not retry or job.attempts >= IMPORT_JOB_MAX_ATTEMPTS
+    job.status = 'failed' if given_up else 'pending'
+    job.error = error
+    job.locked_by = None
+    job.locked_at = None
+    if given_up:
+        job.finished_at = datetime.utcnow()
+    db_session.commit()
+    return given_up
+
+
+def renew_import_job_leases(db_session, job_ids, worker_ids):
+    """Refresh the leases of running jobs still held by the given workers"""
+    if not job_ids:
+        return 0
+    result = db_session.execute(
+        update(ImportJob)
+        .where(ImportJob.id.in_(job_ids), ImportJob.status == 'running', ImportJob.locked_by.in_(worker_ids))
+        .values(locked_at=datetime.utcnow())
+    )
+    db_session.commit()
+    return result.rowcount
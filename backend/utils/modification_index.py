@@ -0,0 +1,183 @@
+"""
+Index of the distinct modifications used by cars, per brand.
+
+The modification_usage table holds one row per (brand, normalized
+modification) with the number of cars using it. Mapper event hooks on Car
+keep the counts up to date on every insert, update and delete, so looking up
+the modifications contained in a listing is a single query on that table
+instead of loading the brand's cars. Bulk statements (session.execute(update(Car)))
+bypass the hooks; call rebuild_modification_index() after them.
+"""
+
+import re
+
+from sqlalchemy import delete, func, inspect, select, update
+
+try:
+    from backend.utils.bulk_upsert import _dialect_insert
+except ImportError:
+    from utils.bulk_upsert import _dialect_insert
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+_listeners_registered = False
+
+
+def normalize_modification(text):
+    """Lowercased modification with collapsed whitespace, or None if it is blank"""
+    if not text:
+        return None
+    return re.sub(r'\s+', ' ', text).strip().lower() or None
+
+
+def _add_usage(connection, brand_id, modification, delta):
+    """Change the car count of a brand's modification by delta, dropping rows that reach zero"""
+    from backend.models import ModificationUsage
+
+    normalized = normalize_modification(modification)
+    if brand_id is None or normalized is None:
+        return
+
+    table = ModificationUsage.__table__
+    key = (table.c.brand_id == brand_id) & (table.c.normalized == normalized)
+    if delta < 0:
+        connection.execute(update(table).where(key).values(usage_count=table.c.usage_count + delta))
+        connection.execute(delete(table).where(key, table.c.usage_count <= 0))
+        return
+
+    row = {'brand_id': brand_id, 'normalized': normalized, 'name': modification.strip(), 'usage_count': delta}
+    dialect_insert = _dialect_insert(connection.dialect.name)
+    if dialect_insert is not None:
+        statement = dialect_insert(table).values(**row)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=['brand_id', 'normalized'],
+            set_={'usage_count': table.c.usage_count + delta, 'name': statement.excluded.name},
+        ))
+        return
+
+    # Generic fallback: update the existing row, insert if there is none
+    result = connection.execute(update(table).where(key).values(
+        usage_count=table.c.usage_count + delta, name=row['name']))
+    if not result.rowcount:
+        connection.execute(table.insert().values(**row))
+
+
+def _previous_value(target, name):
+    history = inspect(target).attrs[name].history
+    return history.deleted[0] if history.deleted else getattr(target, name)
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    """No-op 'set' listener; registering it with active_history=True is what matters"""
+
+
+def _after_insert(mapper, connection, target):
+    _add_usage(connection, target.brand_id, target.modification, 1)
+
+
+def _after_update(mapper, connection, target):
+    old_brand_id = _previous_value(target, 'brand_id')
+    old_modification = _previous_value(target, 'modification')
+    if (old_brand_id, normalize_modification(old_modification)) == \
+            (target.brand_id, normalize_modification(target.modification)):
+        return
+    _add_usage(connection, old_brand_id, old_modification, -1)
+    _add_usage(connection, target.brand_id, target.modification, 1)
+
+
+def _after_delete(mapper, connection, target):
+    _add_usage(connection, _previous_value(target, 'brand_id'), _previous_value(target, 'modification'), -1)
+
+
+def register_modification_index_listeners():
+    """Attach the insert/update/delete hooks to Car once per process."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+
+    from sqlalchemy import event
+    from backend.models import Car
+
+    # Load the previous value when an (expired) attribute is set, so
+    # _after_update can tell which index row the car is leaving
+    for attribute in (Car.brand_id, Car.modification):
+        event.listen(attribute, 'set', _keep_previous_value, active_history=True)
+    event.listen(Car, 'after_insert', _after_insert)
+    event.listen(Car, 'after_update', _after_update)
+    event.listen(Car, 'after_delete', _after_delete)
+    _listeners_registered = True
+
+
+def find_used_modifications(db_session, brand_id, text, limit=5):
+    """
+    Find the modifications of a brand's cars that occur in a text.
+
+    Args:
+        db_session: SQLAlchemy session
+        brand_id (int): Brand id
+        text (str): Modification text of a listing
+        limit (int): Maximum number of matches
+
+    Returns:
+        list: Modification names, longest first, then by number of cars
+    """
+    from backend.models import ModificationUsage
+
+    normalized = normalize_modification(text)
+    if brand_id is None or normalized is None:
+        return []
+
+    # Substring position of the indexed modification in the text (1-based, 0 if absent)
+    position = func.strpos if db_session.get_bind().dialect.name == 'postgresql' else func.instr
+    statement = (
+        select(ModificationUsage.name)
+        .where(ModificationUsage.brand_id == brand_id,
+               position(normalized, ModificationUsage.normalized) > 0)
+        .order_by(func.length(ModificationUsage.normalized).desc(), ModificationUsage.usage_count.desc(),
+                  ModificationUsage.id)
+        .limit(limit)
+    )
+    return list(db_session.scalars(statement))
+
+
+def rebuild_modification_index(db_session):
+    """
+    Recount the modification index from the cars table.
+
+    The statements run in the session's transaction; committing is left to
+    the caller.
+
+    Returns:
+        int: Number of distinct modifications indexed
+    """
+    from backend.models import Car, ModificationUsage
+
+    counts = {}
+    statement = (
+        select(Car.brand_id, Car.modification, func.count(Car.id))
+        .where(Car.brand_id.isnot(None), Car.modification.isnot(None))
+        .group_by(Car.brand_id, Car.modification)
+        .order_by(Car.brand_id, Car.modification)
+    )
+    for brand_id, modification, count in db_session.execute(statement):
+        normalized = normalize_modification(modification)
+        if normalized is None:
+            continue
+        row = counts.setdefault((brand_id, normalized), {
+            'brand_id': brand_id, 'normalized': normalized, 'name': modification.strip(), 'usage_count': 0,
+        })
+        row['usage_count'] += count
+
+    db_session.execute(delete(ModificationUsage))
+    if counts:
+        db_session.execute(ModificationUsage.__table__.insert(), list(counts.values()))
+    logger.info(f"🔁 Modification index rebuilt: {len(counts)} modifications")
+    return len(counts)
+
+
+register_modification_index_listeners()
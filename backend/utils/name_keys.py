@@ -0,0 +1,122 @@
+"""
+Spelling-independent matching keys for brand, model and trim names.
+
+normalize_key() folds case, maps "ё" to "е", transliterates Cyrillic to Latin
+and drops spaces, hyphens and other separators, so "Great Wall",
+"great-wall" and "GREATWALL" share the key "greatwall" and "Тигго 8" the key
+"tiggo8" with "Tiggo 8". In words that mix both alphabets (typically a
+Cyrillic "В" or "М" typed into "BMW") Cyrillic letters that look like Latin
+ones are mapped by shape instead of by sound.
+
+A KeyIndex maps keys to canonical names, so a lookup is a dict access per
+word n-gram of the input instead of a pattern match per name. Two guards keep
+keys from matching things that only look alike once separators are gone:
+a match must cover whole whitespace-separated chunks of the input (the "1" of
+"1.5T" is not the model "#1"), and Cyrillic input must yield a key of at least
+MIN_TRANSLITERATED_KEY_LENGTH characters ("л.с." is not the trim "LS").
+"""
+
+import re
+from functools import lru_cache
+
+WORD_PATTERN = re.compile(r'[^\W_]+')
+CHUNK_PATTERN = re.compile(r'\S+')
+LATIN_PATTERN = re.compile(r'[a-z]')
+CYRILLIC_PATTERN = re.compile(r'[а-я]')
+
+MIN_TRANSLITERATED_KEY_LENGTH = 3
+# Distinct words whose keys are kept; listings repeat the same few thousand words
+WORD_KEY_CACHE_SIZE = 8192
+
+# Lowercase Cyrillic letters whose (upper- or lowercase) form looks like a Latin letter
+LOOKALIKES = str.maketrans('авекмнорстух', 'abekmhopctyx')
+
+TRANSLITERATION = str.maketrans({
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p',
+    'р': 'r', 'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch',
+    'ш': 'sh', 'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya',
+})
+
+
+@lru_cache(maxsize=WORD_KEY_CACHE_SIZE)
+def _word_key(word):
+    word = word.lower().replace('ё', 'е')
+    if LATIN_PATTERN.search(word) and CYRILLIC_PATTERN.search(word):
+        word = word.translate(LOOKALIKES)
+    return word.translate(TRANSLITERATION)
+
+
+def normalize_key(text):
+    """Matching key of a name, e.g. normalize_key("Тойота") == normalize_key("TOYOTA") == "toyota\""""
+    return ''.join(_word_key(word) for word in WORD_PATTERN.findall(text))
+
+
+class KeyIndex:
+    """Names indexed under their normalized key, each mapped to a value (e.g. the canonical name)"""
+
+    def __init__(self, entries):
+        """
+        Args:
+            entries (iterable): (name, value) pairs; of names with the same key
+                the first one is kept
+        """
+        self._values = {}
+        self.max_words = 0
+        for name, value in entries:
+            key = normalize_key(name)
+            if key and key not in self._values:
+                self._values[key] = value
+                self.max_words = max(self.max_words, len(WORD_PATTERN.findall(name)))
+        # Every key ends with the key of the text's last word, so a last word
+        # whose key ends no indexed key rules the text out without building its key
+        self._endings = {key[start:] for key in self._values for start in range(len(key))}
+
+    def _lookup(self, text, key):
+        if CYRILLIC_PATTERN.search(text.lower()) and len(key) < MIN_TRANSLITERATED_KEY_LENGTH:
+            return None
+        return self._values.get(key)
+
+    def get(self, text):
+        """Get the value of the name with the same key as the text, or None"""
+        words = WORD_PATTERN.findall(text)
+        if not words or _word_key(words[-1]) not in self._endings:
+            return None
+        return self._lookup(text, ''.join(_word_key(word) for word in words))
+
+    def search(self, text):
+        """
+        Find the leftmost run of words whose key is indexed, preferring longer runs.
+
+        Returns:
+            tuple: (value, start, end) with the character span of the words in
+                text, or None
+        """
+        if not self._values:
+            return None
+
+        # Words with the chunk they belong to, and whether they start / end it
+        words, chunk_starts, chunk_ends = [], [], []
+        for chunk in CHUNK_PATTERN.finditer(text):
+            chunk_words = list(WORD_PATTERN.finditer(chunk.group()))
+            for index, word in enumerate(chunk_words):
+                words.append((chunk.start() + word.start(), chunk.start() + word.end(), _word_key(word.group())))
+                chunk_starts.append(index == 0)
+                chunk_ends.append(index == len(chunk_words) - 1)
+
+        for start in range(len(words)):
+            if not chunk_starts[start]:
+                continue
+            for count in range(min(self.max_words, len(words) - start), 0, -1):
+                end = start + count - 1
+                if not chunk_ends[end]:
+                    continue
+                span_start, span_end = words[start][0], words[end][1]
+                key = ''.join(word[2] for word in words[start:end + 1])
+                value = self._lookup(text[span_start:span_end], key)
+                if value is not None:
+                    return value, span_start, span_end
+        return None
+
+    def __len__(self):
+        return len(self._values)
@@ -0,0 +1,118 @@
+"""
+Memo of parse_car_info() results.
+
+Re-sent listings (Telegram retries, admin re-imports, the same post in several
+channels) skip the parser. Entries are keyed by a hash of the normalized
+listing text and by the reference version they were parsed against, so a
+change to brands, models, trims or modifications committed in this process
+makes every older entry unreachable; those entries then age out of the LRU.
+Results of parses that themselves changed the reference data (a new brand or
+model was created) are not stored, because parsing the same text again gives
+a different result.
+
+Changes committed by other processes do not bump the reference version. The
+reference snapshot picks them up after REFERENCE_SNAPSHOT_MAX_AGE seconds, and
+memoized results after PARSE_MEMO_TTL seconds, which therefore bounds how long
+a listing can keep parsing against reference data another process changed.
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+
+try:
+    from backend.utils.api_cache import MemoryCache, MISS
+except ImportError:
+    from utils.api_cache import MemoryCache, MISS
+
+# 0 disables the memo
+PARSE_MEMO_ENTRIES = int(os.getenv("PARSE_MEMO_ENTRIES", "10000"))
+PARSE_MEMO_TTL = int(os.getenv("PARSE_MEMO_TTL", "3600"))
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_listing_text(text):
+    """NFC-normalize a listing and collapse whitespace runs to single spaces"""
+    return WHITESPACE_PATTERN.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+def copy_result(result):
+    """Copy of a parse result that callers may modify without touching the memo"""
+    result = dict(result)
+    if isinstance(result.get('engine'), dict):
+        result['engine'] = dict(result['engine'])
+    return result
+
+
+class ParseMemo:
+    """LRU/TTL memo of parse results with hit-rate counters"""
+
+    def __init__(self, max_entries=PARSE_MEMO_ENTRIES, ttl=PARSE_MEMO_TTL, clock=time.time):
+        self.ttl = ttl
+        self.enabled = max_entries > 0
+        self._cache = MemoryCache(max(max_entries, 1), clock=clock)
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'skipped': 0,
+        }
+
+    @staticmethod
+    def key(text, version):
+        """Memo key of a normalized listing text parsed at a reference version"""
+        digest = hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+        return f"{version}:{digest}"
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, key):
+        """Get a copy of a memoized result, or MISS"""
+        if not self.enabled:
+            return MISS
+        value, _ = self._cache.get(key)
+        self._count('misses' if value is MISS else 'hits')
+        return value if value is MISS else copy_result(value)
+
+    def set(self, key, result):
+        if self.enabled:
+            self._cache.set(key, copy_result(result), self.ttl)
+
+    def skip(self):
+        """Count a result that was not stored because the parse changed the reference data"""
+        self._count('skipped')
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+        stats['enabled'] = self.enabled
+        stats['entries'] = len(self._cache)
+        stats['max_entries'] = self._cache.max_entries if self.enabled else 0
+        stats['evictions'] = self._cache.evictions
+        stats['ttl'] = self.ttl
+        return stats
+
+
+_parse_memo = ParseMemo()
+
+
+def get_parse_memo():
+    """Get the process-wide parse memo"""
+    return _parse_memo
+
+
+def set_parse_memo(memo):
+    """Replace the process-wide parse memo (e.g. with a disabled or small one in tests)"""
+    global _parse_memo
+    _parse_memo = memo
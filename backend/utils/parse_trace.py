@@ -0,0 +1,189 @@
+"""
+Per-stage timing of the car parsing pipeline.
+
+A ParseTrace passed to parse_car_info() collects the wall time of each stage
+(brand detection, model matching, engine extraction, normalize_car, external
+trim verification), the number of SQL statements executed and cache
+hits/misses. record_parse_trace() logs a trace as one JSON line and adds it to
+rolling per-stage histograms that get_parse_trace_stats() returns for the
+admin stats endpoint.
+"""
+
+import json
+import os
+import statistics
+import threading
+import time
+import weakref
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+from sqlalchemy import event
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Number of recent traces the rolling histograms are computed from
+PARSE_TRACE_WINDOW = int(os.getenv("PARSE_TRACE_WINDOW", "1000"))
+# Upper bounds (ms) of the histogram buckets; slower calls fall into "inf"
+HISTOGRAM_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+# Trace of the parse running in the current thread, for the query counter
+_active = threading.local()
+_instrumented_engines = weakref.WeakSet()
+_instrument_lock = threading.Lock()
+
+
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    trace = getattr(_active, 'trace', None)
+    if trace is not None:
+        trace.queries += 1
+
+
+def _instrument(engine):
+    """Attach the query counter to an engine once"""
+    with _instrument_lock:
+        if engine not in _instrumented_engines:
+            event.listen(engine, 'before_cursor_execute', _count_query)
+            _instrumented_engines.add(engine)
+
+
+class ParseTrace:
+    """Timings, query count and cache hits of one parse"""
+
+    def __init__(self, text=None):
+        self.text = text
+        self.started_at = time.time()
+        self.stages = {}
+        self.queries = 0
+        self.cache = {}
+        self.total_ms = None
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        """Add the wall time of the block to a stage (stages may nest)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    @contextmanager
+    def active(self, db_session):
+        """Count the SQL statements executed by this thread on the session's engine"""
+        _instrument(db_session.get_bind())
+        previous = getattr(_active, 'trace', None)
+        _active.trace = self
+        try:
+            yield self
+        finally:
+            _active.trace = previous
+
+    def cache_result(self, name, hit):
+        """Record a hit or miss of a named cache"""
+        counts = self.cache.setdefault(name, {'hits': 0, 'misses': 0})
+        counts['hits' if hit else 'misses'] += 1
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self._started) * 1000
+        return self
+
+    def as_dict(self):
+        return {
+            'text': self.text,
+            'total_ms': round(self.total_ms, 3) if self.total_ms is not None else None,
+            'stages': {name: round(ms, 3) for name, ms in self.stages.items()},
+            'queries': self.queries,
+            'cache': self.cache,
+        }
+
+
+def trace_stage(trace, name):
+    """trace.stage(name), or a no-op context when tracing is off"""
+    return trace.stage(name) if trace is not None else nullcontext()
+
+
+class ParseTraceStats:
+    """Rolling per-stage latency histograms over the last `window` traces"""
+
+    def __init__(self, window=PARSE_TRACE_WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._queries = deque(maxlen=window)
+        self._cache = {}
+        self.traces = 0
+
+    def add(self, trace):
+        with self._lock:
+            self.traces += 1
+            samples = dict(trace.stages)
+            if trace.total_ms is not None:
+                samples['total'] = trace.total_ms
+            for name, ms in samples.items():
+                self._stages.setdefault(name, deque(maxlen=self.window)).append(ms)
+            self._queries.append(trace.queries)
+            for name, counts in trace.cache.items():
+                totals = self._cache.setdefault(name, {'hits': 0, 'misses': 0})
+                totals['hits'] += counts['hits']
+                totals['misses'] += counts['misses']
+
+    @staticmethod
+    def _summarize(samples):
+        ordered = sorted(samples)
+        quantiles = statistics.quantiles(ordered, n=100, method='inclusive') if len(ordered) > 1 \
+            else ordered * 99
+        buckets = {}
+        for bound in HISTOGRAM_BUCKETS_MS:
+            buckets[f"le_{bound}"] = 0
+        buckets['inf'] = 0
+        for ms in ordered:
+            for bound in HISTOGRAM_BUCKETS_MS:
+                if ms <= bound:
+                    buckets[f"le_{bound}"] += 1
+                    break
+            else:
+                buckets['inf'] += 1
+        return {
+            'count': len(ordered),
+            'p50_ms': round(quantiles[49], 3),
+            'p95_ms': round(quantiles[94], 3),
+            'p99_ms': round(quantiles[98], 3),
+            'max_ms': round(ordered[-1], 3),
+            'buckets': buckets,
+        }
+
+    def stats(self):
+        with self._lock:
+            stages = {name: list(samples) for name, samples in self._stages.items()}
+            queries = list(self._queries)
+            cache = {name: dict(counts) for name, counts in self._cache.items()}
+            traces = self.traces
+        return {
+            'traces': traces,
+            'window': self.window,
+            'stages': {name: self._summarize(samples) for name, samples in stages.items() if samples},
+            'avg_queries': round(sum(queries) / len(queries), 2) if queries else None,
+            'cache': cache,
+        }
+
+
+_stats = ParseTraceStats()
+
+
+def record_parse_trace(trace):
+    """Log a finished trace as one JSON line and add it to the rolling histograms"""
+    if trace.total_ms is None:
+        trace.finish()
+    _stats.add(trace)
+    logger.info(f"parse_trace {json.dumps(trace.as_dict(), ensure_ascii=False)}")
+
+
+def get_parse_trace_stats():
+    """Get the rolling per-stage histograms of recorded traces"""
+    return _stats.stats()
@@ -0,0 +1,248 @@
+"""
+In-process snapshot of the reference dictionaries used by the car parser.
+
+Brands, synonyms, models, trims and modifications are loaded with one bulk
+query per table into an immutable ReferenceSnapshot. The snapshot is reused
+until a session that inserted, updated or deleted a row in one of those
+tables through SQLAlchemy commits (mapper event hooks flag the session at
+flush time, its commit bumps a version counter) and is then reloaded lazily on
+the next access. Bumping at commit rather than at flush keeps another thread
+from caching uncommitted (or later rolled back) rows under the new version.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from sqlalchemy.orm import Session, object_session
+
+try:
+    from backend.utils.brand_matcher import LongestMatchPattern
+except ImportError:
+    from utils.brand_matcher import LongestMatchPattern
+
+try:
+    from backend.utils.file_logger import get_module_logger
+except ImportError:
+    from utils.file_logger import get_module_logger
+
+logger = get_module_logger(__name__)
+
+# Changes made by other processes (seed scripts, other gunicorn workers) do not
+# fire our mapper events, so a snapshot is also reloaded once it is this old.
+SNAPSHOT_MAX_AGE_SECONDS = int(os.getenv("REFERENCE_SNAPSHOT_MAX_AGE", "300"))
+
+BrandEntry = namedtuple('BrandEntry', ['id', 'name', 'slug', 'synonyms', 'models', 'trims', 'modifications'])
+
+_version = 0
+_snapshot = None
+_snapshot_bind = None
+_snapshot_lock = threading.Lock()
+_listeners_registered = False
+
+_stats_lock = threading.Lock()
+_stats = {
+    'hits': 0,
+    'misses': 0,
+    'reloads': 0,
+    'last_reload_ms': None,
+    'total_reload_ms': 0.0,
+    'last_reload_at': None,
+}
+
+
+class ReferenceSnapshot:
+    """Immutable view of the reference tables at one version"""
+
+    def __init__(self, version, brands, brand_names):
+        self.version = version
+        self.loaded_at = time.time()
+        # Brand name -> BrandEntry, keyed by the exact Brand.name like the old
+        # `Brand.name == brand_name` queries
+        self.brands = MappingProxyType(brands)
+        # Brand names and synonyms in get_all_brands_with_synonyms() order
+        self.brand_names = tuple(brand_names)
+        self.brand_matcher = LongestMatchPattern(self.brand_names)
+        self._derived = {}
+
+    def get_brand(self, brand_name):
+        """Get the BrandEntry for an exact brand name, or None"""
+        return self.brands.get(brand_name)
+
+    def cached(self, key, factory):
+        """
+        Get a value derived from this snapshot, building it on first use.
+
+        Derived values (e.g. per-brand compiled matchers) live exactly as long
+        as the snapshot they were built from.
+        """
+        try:
+            return self._derived[key]
+        except KeyError:
+            return self._derived.setdefault(key, factory())
+
+    def is_expired(self):
+        return SNAPSHOT_MAX_AGE_SECONDS > 0 and time.time() - self.loaded_at > SNAPSHOT_MAX_AGE_SECONDS
+
+
+# Session.info flag: the session flushed changes to reference rows
+_CHANGED_FLAG = 'reference_rows_changed'
+
+
+def _bump_version():
+    """Mark the current snapshot as stale."""
+    global _version
+    _version += 1
+
+
+def _flag_session(mapper, connection, target):
+    """SQLAlchemy mapper event hook: remember that the flushing session changed reference rows."""
+    session = object_session(target)
+    if session is not None:
+        session.info[_CHANGED_FLAG] = True
+
+
+def _bump_after_commit(session):
+    """SQLAlchemy session event hook: the flagged changes are now visible to other sessions."""
+    if session.info.pop(_CHANGED_FLAG, False):
+        _bump_version()
+
+
+def _clear_after_rollback(session):
+    """SQLAlchemy session event hook: rolled back changes never reach the snapshot."""
+    session.info.pop(_CHANGED_FLAG, None)
+
+
+def invalidate_reference_snapshot():
+    """
+    Force a reload on next access.
+
+    Call this after writing reference rows with bulk statements
+    (session.execute(insert(...))), which bypass mapper events.
+    """
+    _bump_version()
+
+
+def get_reference_version():
+    """Get the version counter that changes whenever reference rows change"""
+    return _version
+
+
+def _register_listeners():
+    """Attach insert/update/delete and commit/rollback hooks once per process."""
+    global _listeners_registered
+    if _listeners_registered:
+        return
+
+    from sqlalchemy import event
+    from backend.models import Brand, BrandSynonym, BrandModel, BrandTrim, BrandModification
+
+    for model in (Brand, BrandSynonym, BrandModel, BrandTrim, BrandModification):
+        for event_name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, event_name, _flag_session)
+    event.listen(Session, 'after_commit', _bump_after_commit)
+    event.listen(Session, 'after_rollback', _clear_after_rollback)
+    _listeners_registered = True
+
+
+def _load_snapshot(db_session, version):
+    """Load all reference tables with one query per table."""
+    from backend.models import Brand, BrandSynonym, BrandModel, BrandTrim, BrandModification
+
+    def names_by_brand(model):
+        grouped = {}
+        for brand_id, name in db_session.query(model.brand_id, model.name).order_by(model.id):
+            grouped.setdefault(brand_id, []).append(name)
+        return grouped
+
+    synonyms = names_by_brand(BrandSynonym)
+    models = names_by_brand(BrandModel)
+    trims = names_by_brand(BrandTrim)
+    modifications = names_by_brand(BrandModification)
+
+    brands = {}
+    brand_names = []
+    for brand_id, name, slug in db_session.query(Brand.id, Brand.name, Brand.slug).order_by(Brand.id):
+        entry = BrandEntry(
+            id=brand_id,
+            name=name,
+            slug=slug,
+            synonyms=tuple(synonyms.get(brand_id, ())),
+            models=tuple(models.get(brand_id, ())),
+            trims=tuple(trims.get(brand_id, ())),
+            modifications=tuple(modifications.get(brand_id, ())),
+        )
+        brands.setdefault(name, entry)
+        brand_names.append(name)
+        brand_names.extend(entry.synonyms)
+
+    return ReferenceSnapshot(version, brands, brand_names)
+
+
+def get_reference_snapshot(db_session):
+    """
+    Get the current reference snapshot, reloading it if it is stale.
+
+    Args:
+        db_session: SQLAlchemy session used when the snapshot has to be (re)loaded
+
+    Returns:
+        ReferenceSnapshot: Snapshot of brands, synonyms, models, trims and modifications
+
+    Raises:
+        ValueError: If db_session is not provided
+    """
+    global _snapshot, _snapshot_bind
+
+    if not db_session:
+        raise ValueError("Database session is required to load reference data")
+
+    _register_listeners()
+    bind = db_session.get_bind()
+
+    with _snapshot_lock:
+        snapshot = _snapshot
+        if (snapshot is not None
+                and _snapshot_bind is bind
+                and snapshot.version == _version
+                and not snapshot.is_expired()):
+            with _stats_lock:
+                _stats['hits'] += 1
+            return snapshot
+
+        # Read the version before loading so a change made while we load
+        # leaves the new snapshot stale instead of silently missing it
+        version = _version
+        started = time.perf_counter()
+        snapshot = _load_snapshot(db_session, version)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        _snapshot, _snapshot_bind = snapshot, bind
+
+    with _stats_lock:
+        _stats['misses'] += 1
+        _stats['reloads'] += 1
+        _stats['last_reload_ms'] = round(elapsed_ms, 3)
+        _stats['total_reload_ms'] += elapsed_ms
+        _stats['last_reload_at'] = snapshot.loaded_at
+
+    logger.info(f"🔄 Reference snapshot v{version} loaded: {len(snapshot.brands)} brands, "
+                f"{len(snapshot.brand_names)} names in {elapsed_ms:.1f} ms")
+    return snapshot
+
+
+def get_snapshot_stats():
+    """Get cache hit/miss counters and reload timings for the reference snapshot"""
+    with _stats_lock:
+        stats = dict(_stats)
+
+    lookups = stats['hits'] + stats['misses']
+    stats['hit_ratio'] = round(stats['hits'] / lookups, 4) if lookups else None
+    stats['avg_reload_ms'] = round(stats['total_reload_ms'] / stats['reloads'], 3) if stats['reloads'] else None
+    stats['total_reload_ms'] = round(stats['total_reload_ms'], 3)
+    stats['version'] = _version
+    snapshot = _snapshot
+    stats['loaded_version'] = snapshot.version if snapshot else None
+    stats['brands'] = len(snapshot.brands) if snapshot else 0
+    return stats
@@ -1,6 +1,6 @@
+import atexit
 import os
 import sys
-import tempfile
 import threading
 from functools import partial
 
@@ -45,15 +45,42 @@ except ImportError:
     from utils.file_logger import get_module_logger
 
 try:
-    from backend.utils.image_queue import enqueue_image_task
+    from backend.utils.image_queue import enqueue_image_task, generator_path
 except ImportError:
-    from utils.image_queue import enqueue_image_task
+    from utils.image_queue import enqueue_image_task, generator_path
+
+try:
+    from backend.utils.image_task_queue import is_fatal_error, register_retry_policy
+except ImportError:
+    from utils.image_task_queue import is_fatal_error, register_retry_policy
 
 try:
     from backend.utils.car_parser import parse_car_info, save_new_trims_to_db
 except ImportError:
     from utils.car_parser import parse_car_info, save_new_trims_to_db
 
+try:
+    from backend.utils.parse_trace import ParseTrace, record_parse_trace
+except ImportError:
+    from utils.parse_trace import ParseTrace, record_parse_trace
+
+try:
+    from backend.utils.image_transfer import ImageDownloadError, downloaded_image
+except ImportError:
+    from utils.image_transfer import ImageDownloadError, downloaded_image
+
+try:
+    from backend.utils.gallery_upload import upload_gallery
+except ImportError:
+    from utils.gallery_upload import upload_gallery
+
+try:
+    from backend.utils.import_executor import ImportExecutor, ImportQueueFull, import_stage
+    from backend.utils.import_jobs import checkpoint_import_job, fail_import_job, finish_import_job
+except ImportError:
+    from utils.import_executor import ImportExecutor, ImportQueueFull, import_stage
+    from utils.import_jobs import checkpoint_import_job, fail_import_job, finish_import_job
+
 # Configure logging using the centralized logger
 logger = get_module_logger(__name__)
 
@@ -63,6 +90,8 @@ telegram_import = Blueprint('telegram_import', __name__)
 # Store a reference to the Flask app - will be set when the blueprint is registered
 _app = None
 _db_session = None
+_import_executor = None
+_import_executor_lock = threading.Lock()
 
 
 def get_db_session(app=None):
@@ -143,223 +172,310 @@ def send_telegram_message(chat_id, text, bot_token=None):
         return False
 
 
-# Extracted car import logic for async processing
-def process_car_import_task(app, data, chat_id):
-    session = None
+def _create_car(session, data, chat_id):
+    """
+    Parse the listing text and create the car with its brand, type and currency.
+
+    Returns:
+        Car: The flushed (not yet committed) car, or None if required fields are missing
+    """
+    car_data_str = data.get("car_data", "").strip()
+    if car_data_str:
+        logger.info(f"🚗 Processing car in new format: {car_data_str}")
+        trace = ParseTrace(car_data_str)
+        try:
+            with import_stage('parse'):
+                car_info = parse_car_info(car_data_str, db_session=session, trace=trace)
+        finally:
+            record_parse_trace(trace)
+        data["brand"] = car_info["brand"]
+        data["model"] = car_info["model"]
+        data["modification"] = car_info["modification"]
+        data["trim"] = car_info["trim"]
+        logger.info(
+            f"✅ Parsed car data: Brand={car_info['brand']}, Model={car_info['model']}, Modification={car_info['modification']}, Trim={car_info['trim']}")
+    model = data.get("model", "").strip()
+    modification = data.get("modification", "").strip()
+    trim = data.get("trim", "").strip()
+    price = int(data.get("price", 0) or 0)
+    year = int(data.get("year", 0) or 0)
+    mileage = int(data.get("mileage", 0) or 0)
+    engine = data.get("engine", "").strip()
+    car_type_name = data.get("car_type", "").strip()
+    brand_name = data.get("brand", "").strip()
+    description = data.get("description", "").strip()
+    missing_fields = [field for field in ["model", "brand", "image_file_ids"] if not data.get(field)]
+    if missing_fields:
+        send_telegram_message(chat_id, f"❌ Ошибка: отсутствуют обязательные поля: {', '.join(missing_fields)}")
+        return None
+    synonym = session.query(BrandSynonym).filter(BrandSynonym.name.ilike(brand_name)).first()
+    brand = synonym.brand if synonym else None
+    if not brand:
+        slug = brand_name.lower().replace(" ", "-")
+        existing_brand = session.query(Brand).filter(Brand.slug == slug).first()
+        if existing_brand:
+            brand = existing_brand
+            logger.info(f"✅ Using existing brand: {brand.name} (slug: {brand.slug})")
+        else:
+            brand = Brand(name=brand_name, slug=slug)
+            session.add(brand)
+            session.flush()
+            synonym = BrandSynonym(name=brand_name.lower(), brand=brand)
+            session.add(synonym)
+            session.flush()
+            logger.info(f"✅ Created new brand: {brand.name} (slug: {brand.slug})")
+    car_type = None
+    if car_type_name:
+        car_type = session.query(CarType).filter_by(name=car_type_name).first()
+        if not car_type:
+            car_type = CarType(name=car_type_name, slug=car_type_name.lower().replace(" ", "-"))
+            session.add(car_type)
+            session.flush()
+    currency_code = data.get("currency")
+    currency = None
+    if currency_code:
+        currency = session.query(Currency).filter_by(code=currency_code).first()
+        if not currency:
+            logger.warning(f"⚠️ Currency with code '{currency_code}' not found. Defaulting to None.")
+    car = Car(
+        model=model,
+        modification=modification,
+        trim=trim,
+        price=price,
+        year=year,
+        mileage=mileage,
+        engine=engine,
+        brand=brand,
+        car_type=car_type,
+        description=description,
+        currency=currency,
+    )
+    session.add(car)
+    session.flush()
+    return car
+
+
+def _car_prompt(car):
+    return (
+        "Professional car studio shot, ultra-clean pure white background, only the car visible with ample empty space around it. "
+        f"Car: {car.brand.name if car.brand else 'Unknown'} {car.model}, perfectly isolated with at least 2 meters of empty space on all sides, no other objects or cars visible. "
+        "License plate must clearly and legibly display 'cncars.ru' in proper format. "
+        f"Car positioned diagonally in frame: front facing 30 degrees left, rear facing 30 degrees right, with slight perspective as if viewed from eye level. "
+        "The car should be positioned not too close - about 5-7 meters from the virtual camera, showing full body with space around. "
+        "Crisp, ultra-sharp details, 8K quality render, professional three-point studio lighting with soft shadows. "
+        "Absolutely no background elements, no reflections of surroundings, no stray shadows - only clean, pure white backdrop. "
+        "The car should appear as a flawless 3D model with perfect proportions, slightly matte surface to avoid glare. "
+        "Add subtle ambient occlusion shadows under the car for natural grounding effect."
+    )
+
+
+def _import_summary(car, data, main_image_url, real_urls, new_trims):
+    """Telegram message listing what was recognized, the images and the links of an imported car"""
+    model = data.get("model", "").strip()
+    modification = data.get("modification", "").strip()
+    trim = data.get("trim", "").strip()
+    price = int(data.get("price", 0) or 0)
+    year = int(data.get("year", 0) or 0)
+    mileage = int(data.get("mileage", 0) or 0)
+    engine = data.get("engine", "").strip()
+    car_type_name = data.get("car_type", "").strip()
+    brand_name = car.brand.name if car.brand else "Неизвестно"
+    description = data.get("description", "").strip()
+    currency_code = data.get("currency")
+
+    # Compose detailed message
+    details = [
+        "✅ Автомобиль успешно добавлен!",
+        "",
+        "Распознано:",
+        f"• Бренд: {brand_name or 'не указано'}",
+        f"• Модель: {model or 'не указано'}",
+        f"• Модификация: {modification or 'не указано'}" if modification else None,
+        f"• Комплектация: {trim or 'не указано'}" if trim else None,
+        f"• Год: {year or 'не указано'}" if year else None,
+        f"• Пробег: {mileage} км" if mileage is not None else None,
+        f"• Двигатель: {engine or 'не указано'}" if engine else None,
+        f"• Тип: {car_type_name or 'не указано'}" if car_type_name else None,
+        f"• Цена: {price:,} {currency_code or ''}" if price else None,
+        ""
+    ]
+    if description:
+        details.append(f"Описание: {description}")
+        details.append("")
+    if main_image_url:
+        details.append("Главное изображение:")
+        details.append(main_image_url)
+
+    # Initialize URL variables early
+    car_url = None
+    admin_car_edit_url = None
+
+    # Build URLs directly without relying on url_for
     try:
-        session = get_db_session(app=app)
-        car_data_str = data.get("car_data", "").strip()
-        if car_data_str:
-            logger.info(f"🚗 Processing car in new format: {car_data_str}")
-            car_info = parse_car_info(car_data_str, db_session=session)
-            data["brand"] = car_info["brand"]
-            data["model"] = car_info["model"]
-            data["modification"] = car_info["modification"]
-            data["trim"] = car_info["trim"]
-            logger.info(
-                f"✅ Parsed car data: Brand={car_info['brand']}, Model={car_info['model']}, Modification={car_info['modification']}, Trim={car_info['trim']}")
-        model = data.get("model", "").strip()
-        modification = data.get("modification", "").strip()
-        trim = data.get("trim", "").strip()
-        price = int(data.get("price", 0) or 0)
-        year = int(data.get("year", 0) or 0)
-        mileage = int(data.get("mileage", 0) or 0)
-        engine = data.get("engine", "").strip()
-        car_type_name = data.get("car_type", "").strip()
-        brand_name = data.get("brand", "").strip()
-        description = data.get("description", "").strip()
-        image_file_ids = data.get("image_file_ids", [])
-        missing_fields = [field for field in ["model", "brand", "image_file_ids"] if not data.get(field)]
-        if missing_fields:
-            send_telegram_message(chat_id, f"❌ Ошибка: отсутствуют обязательные поля: {', '.join(missing_fields)}")
+        # Get server name from environment or use default
+        server_name = os.getenv('SERVER_NAME')
+        # If SERVER_NAME is not set, check if we have RAILWAY_PUBLIC_DOMAIN
+        if not server_name:
+            server_name = os.getenv('RAILWAY_PUBLIC_DOMAIN')
+        # If still no domain, use default
+        if not server_name:
+            server_name = "cncars.ru"
+
+        # Build the URLs directly
+        car_url = f"https://{server_name}/car/{car.id}"
+        admin_car_edit_url = f"https://{server_name}/admin/car/edit/?id={car.id}&url=/admin/car/"
+        logger.info(f"✅ Generated car URLs using server: {server_name}")
+    except Exception as e:
+        logger.error(f"❌ Error generating car URLs: {e}")
+
+    # Improved gallery output
+    max_gallery_preview = 2
+    if real_urls:
+        details.append(f"Галерея: {len(real_urls)} фото" + (
+            f" (первые {max_gallery_preview}):" if len(real_urls) > max_gallery_preview else ":"))
+        for url in real_urls[:max_gallery_preview]:
+            details.append(url)
+        if len(real_urls) > max_gallery_preview:
+            details.append(f"и еще {len(real_urls) - max_gallery_preview} фото — см. все на сайте:")
+            if car_url:
+                details.append(car_url)
+    # If new trims were added
+    if new_trims:
+        details.append("")
+        details.append(
+            "Новые комплектации/модификации, добавленные в базу: " + ", ".join(str(t) for t in new_trims))
+
+    # Place links at the end, clearly labeled
+    if car_url:
+        details.append("")
+        details.append(f"Ссылка на авто на сайте:\n{car_url}")
+    if admin_car_edit_url:
+        details.append(f"Ссылка для администрирования:\n{admin_car_edit_url}")
+    return "\n".join([d for d in details if d])
+
+
+# Extracted car import logic for async processing
+def process_import_job(app, session, job):
+    """
+    Run the stages of an import job that are not checkpointed yet.
+
+    Each stage commits its results together with the job's `stage`, so a
+    worker that claims the job after a restart continues with the next stage
+    instead of creating the car or uploading the images again.
+    """
+    # Import executor threads have no app context of their own
+    with app.app_context():
+        _run_import_stages(app, session, job)
+
+
+def _run_import_stages(app, session, job):
+    chat_id = job.payload.get("chat_id")
+    state = job.state or {}
+    data = state.get("data") or dict(job.payload)
+
+    if not job.has_completed('parsed'):
+        car = _create_car(session, data, chat_id)
+        if car is None:
+            fail_import_job(session, job, "missing required fields", retry=False)
             return
-        synonym = session.query(BrandSynonym).filter(BrandSynonym.name.ilike(brand_name)).first()
-        brand = synonym.brand if synonym else None
-        brand_created = False
-        if not brand:
-            slug = brand_name.lower().replace(" ", "-")
-            existing_brand = session.query(Brand).filter(Brand.slug == slug).first()
-            if existing_brand:
-                brand = existing_brand
-                logger.info(f"✅ Using existing brand: {brand.name} (slug: {brand.slug})")
-            else:
-                brand = Brand(name=brand_name, slug=slug)
-                session.add(brand)
-                session.flush()
-                synonym = BrandSynonym(name=brand_name.lower(), brand=brand)
-                session.add(synonym)
-                session.flush()
-                brand_created = True
-                logger.info(f"✅ Created new brand: {brand.name} (slug: {brand.slug})")
-        car_type = None
-        if car_type_name:
-            car_type = session.query(CarType).filter_by(name=car_type_name).first()
-            if not car_type:
-                car_type = CarType(name=car_type_name, slug=car_type_name.lower().replace(" ", "-"))
-                session.add(car_type)
-                session.flush()
-        currency_code = data.get("currency")
-        currency = None
-        if currency_code:
-            currency = session.query(Currency).filter_by(code=currency_code).first()
-            if not currency:
-                logger.warning(f"⚠️ Currency with code '{currency_code}' not found. Defaulting to None.")
-        car = Car(
-            model=model,
-            modification=modification,
-            trim=trim,
-            price=price,
-            year=year,
-            mileage=mileage,
-            engine=engine,
-            brand=brand,
-            car_type=car_type,
-            description=description,
-            currency=currency,
-        )
-        session.add(car)
-        session.flush()
-        prompt_hint = (
-            "Professional car studio shot, ultra-clean pure white background, only the car visible with ample empty space around it. "
-            f"Car: {car.brand.name if car.brand else 'Unknown'} {car.model}, perfectly isolated with at least 2 meters of empty space on all sides, no other objects or cars visible. "
-            "License plate must clearly and legibly display 'cncars.ru' in proper format. "
-            f"Car positioned diagonally in frame: front facing 30 degrees left, rear facing 30 degrees right, with slight perspective as if viewed from eye level. "
-            "The car should be positioned not too close - about 5-7 meters from the virtual camera, showing full body with space around. "
-            "Crisp, ultra-sharp details, 8K quality render, professional three-point studio lighting with soft shadows. "
-            "Absolutely no background elements, no reflections of surroundings, no stray shadows - only clean, pure white backdrop. "
-            "The car should appear as a flawless 3D model with perfect proportions, slightly matte surface to avoid glare. "
-            "Add subtle ambient occlusion shadows under the car for natural grounding effect."
-        )
-        real_urls = []
+        job.car_id = car.id
+        checkpoint_import_job(session, job, 'parsed', data=data)
+    else:
+        car = session.get(Car, job.car_id) if job.car_id else None
+        if car is None:
+            raise RuntimeError(f"Car #{job.car_id} of import job #{job.id} no longer exists")
+
+    brand_name = car.brand.name if car.brand else "Неизвестно"
+    image_file_ids = data.get("image_file_ids", [])
+
+    if not job.has_completed('main_image_uploaded'):
         main_image_url = None
         if image_file_ids:
             try:
-                first_file_id = image_file_ids[0]
-                url = get_telegram_file_url(first_file_id)
-                brand_name = car.brand.name if car.brand else "Неизвестно"
-                main_image_url = download_and_reupload(url, car_id=car.id, car_name=car.model, car_brand=brand_name, is_main_img=True, app=app)
-                if main_image_url:
-                    car.image_url = main_image_url
-                    session.commit()
-                    params = {
-                        'mode': REPLICATE_MODE,
-                        'prompt': prompt_hint,
-                        'image_url': main_image_url,
-                        'car_model': model,
-                        'car_brand': brand_name,  
-                        'car_id': car.id,
-                        'app': app
-                    }
-                    task_id = enqueue_image_task(
-                        car_id=car.id,
-                        generator_func=generate_image,
-                        params=params,
-                        max_retries=3
-                    )
-                    logger.info(f"🎯 Queued AI image generation as task: {task_id}")
-                    for i, file_id in enumerate(image_file_ids[1:], start=1):
-                        try:
-                            url = get_telegram_file_url(file_id)
-                            ref_url = download_and_reupload(
-                                url,
-                                car_id=car.id,
-                                car_name=car.model,
-                                car_brand=brand_name,
-                                is_main_img=False,
-                                image_index=i,
-                                app=app
-                            )
-                            if ref_url:
-                                real_urls.append(ref_url)
-                        except Exception as e:
-                            logger.warning(f"⚠️ Ошибка при обработке изображения галереи (индекс {i}): {e}")
+                url = get_telegram_file_url(image_file_ids[0])
+                with import_stage('main_image'):
+                    main_image_url = download_and_reupload(url, car_id=car.id, car_name=car.model, car_brand=brand_name, is_main_img=True, app=app)
             except Exception as e:
                 logger.warning(f"⚠️ Ошибка при обработке главного изображения: {e}")
+        if main_image_url:
+            car.image_url = main_image_url
+        checkpoint_import_job(session, job, 'main_image_uploaded', main_image_url=main_image_url)
+    main_image_url = job.state.get("main_image_url")
+
+    if not job.has_completed('gallery_uploaded'):
+        # Image index -> uploaded URL, saved after every upload so a resumed job skips them
+        gallery = dict(job.state.get("gallery") or {})
+        if main_image_url:
+            # Worker threads must not touch the session, so they get plain values
+            car_id, car_model = car.id, car.model
+
+            def upload(i, file_id):
+                with app.app_context():
+                    url = get_telegram_file_url(file_id)
+                    if not url:
+                        return None
+                    return download_and_reupload(
+                        url,
+                        car_id=car_id,
+                        car_name=car_model,
+                        car_brand=brand_name,
+                        is_main_img=False,
+                        image_index=i,
+                        app=app
+                    )
+
+            def save_progress(i, url):
+                gallery[str(i)] = url
+                checkpoint_import_job(session, job, gallery=gallery)
+
+            pending = [(i, file_id) for i, file_id in enumerate(image_file_ids[1:], start=1) if str(i) not in gallery]
+            with import_stage('gallery'):
+                upload_gallery(pending, upload, on_uploaded=save_progress)
+        real_urls = [gallery[index] for index in sorted(gallery, key=int)]
         for i, url in enumerate(real_urls):
             image = CarImage(car_id=car.id, url=url, position=i)
             session.add(image)
-        session.commit()
-
-        # Compose detailed message
-        details = [
-            "✅ Автомобиль успешно добавлен!",
-            "",
-            "Распознано:",
-            f"• Бренд: {brand_name or 'не указано'}",
-            f"• Модель: {model or 'не указано'}",
-            f"• Модификация: {modification or 'не указано'}" if modification else None,
-            f"• Комплектация: {trim or 'не указано'}" if trim else None,
-            f"• Год: {year or 'не указано'}" if year else None,
-            f"• Пробег: {mileage} км" if mileage is not None else None,
-            f"• Двигатель: {engine or 'не указано'}" if engine else None,
-            f"• Тип: {car_type_name or 'не указано'}" if car_type_name else None,
-            f"• Цена: {price:,} {currency_code or ''}" if price else None,
-            ""
-        ]
-        if description:
-            details.append(f"Описание: {description}")
-            details.append("")
+        checkpoint_import_job(session, job, 'gallery_uploaded', gallery_urls=real_urls)
+    real_urls = job.state.get("gallery_urls") or []
+
+    if not job.has_completed('ai_task_queued'):
+        task_id = None
         if main_image_url:
-            details.append("Главное изображение:")
-            details.append(main_image_url)
-        
-        # Initialize URL variables early
-        car_url = None
-        admin_car_edit_url = None
-        
-        # Build URLs directly without relying on url_for
-        try:
-            # Get server name from environment or use default
-            server_name = os.getenv('SERVER_NAME')
-            # If SERVER_NAME is not set, check if we have RAILWAY_PUBLIC_DOMAIN
-            if not server_name:
-                server_name = os.getenv('RAILWAY_PUBLIC_DOMAIN')
-            # If still no domain, use default
-            if not server_name:
-                server_name = "cncars.ru"
-                
-            # Build the URLs directly
-            car_url = f"https://{server_name}/car/{car.id}"
-            admin_car_edit_url = f"https://{server_name}/admin/car/edit/?id={car.id}&url=/admin/car/"
-            logger.info(f"✅ Generated car URLs using server: {server_name}")
-        except Exception as e:
-            logger.error(f"❌ Error generating car URLs: {e}")
-            
-        # Improved gallery output
-        max_gallery_preview = 2
-        if real_urls:
-            details.append(f"Галерея: {len(real_urls)} фото" + (
-                f" (первые {max_gallery_preview}):" if len(real_urls) > max_gallery_preview else ":"))
-            for url in real_urls[:max_gallery_preview]:
-                details.append(url)
-            if len(real_urls) > max_gallery_preview:
-                details.append(f"и еще {len(real_urls) - max_gallery_preview} фото — см. все на сайте:")
-                if car_url:
-                    details.append(car_url)
-        # If new trims were added
+            params = {
+                'mode': REPLICATE_MODE,
+                'prompt': _car_prompt(car),
+                'image_url': main_image_url,
+                'car_model': car.model,
+                'car_brand': brand_name,
+                'car_id': car.id,
+                'app': app
+            }
+            task_id = enqueue_image_task(
+                car_id=car.id,
+                generator_func=generate_image,
+                params=params,
+                app=app
+            )
+            logger.info(f"🎯 Queued AI image generation as task: {task_id}")
+        checkpoint_import_job(session, job, 'ai_task_queued', ai_task_id=task_id)
+
+    if not job.has_completed('notified'):
         new_trims = []
         if 'car_data' in data:
             new_trims = save_new_trims_to_db(db_session=session) or []
-        if new_trims:
-            details.append("")
-            details.append(
-                "Новые комплектации/модификации, добавленные в базу: " + ", ".join(str(t) for t in new_trims))
-            
-        # Place links at the end, clearly labeled
-        if car_url:
-            details.append("")
-            details.append(f"Ссылка на авто на сайте:\n{car_url}")
-        if admin_car_edit_url:
-            details.append(f"Ссылка для администрирования:\n{admin_car_edit_url}")
-        msg = "\n".join([d for d in details if d])
-        send_telegram_message(chat_id, msg)
-    except Exception as e:
-        logger.error(f"❌ Ошибка при импорте автомобиля: {e}")
-        if chat_id:
-            send_telegram_message(chat_id, f"❌ Ошибка при импорте автомобиля: {e}")
-    finally:
-        if session:
-            session.close()
+        msg = _import_summary(car, data, main_image_url, real_urls, new_trims)
+        with import_stage('notify'):
+            send_telegram_message(chat_id, msg)
+        checkpoint_import_job(session, job, 'notified')
+
+    finish_import_job(session, job)
+
+
+def notify_import_failed(job, error):
+    """Tell the chat that an import failed for the last time"""
+    chat_id = job.payload.get("chat_id")
+    if chat_id:
+        send_telegram_message(chat_id, f"❌ Ошибка при импорте автомобиля: {error}")
 
 
 @telegram_import.route('/api/import_car', methods=['POST'])
@@ -376,37 +492,63 @@ def import_car():
     if not chat_id:
         return jsonify({"error": "chat_id required in payload"}), 400
     app = current_app._get_current_object()
-    threading.Thread(target=partial(process_car_import_task, app), args=(data, chat_id), daemon=True).start()
-    return jsonify({"status": "received", "message": "Работаем над вашей заявкой..."})
+    try:
+        job_id = start_import_executor(app).submit(data, chat_id)
+    except ImportQueueFull as e:
+        logger.warning(f"⚠️ Import queue is full, rejecting import for chat {chat_id}")
+        response = jsonify({"error": "import queue is full, try again later", "retry_after": e.retry_after})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 429
+    return jsonify({"status": "received", "message": "Работаем над вашей заявкой...", "job_id": job_id})
+
+
+def start_import_executor(app):
+    """Start the process-wide import executor on first use and return it"""
+    global _import_executor
+    with _import_executor_lock:
+        if _import_executor is None:
+            _import_executor = ImportExecutor(
+                partial(process_import_job, app),
+                partial(get_db_session, app=app),
+                on_give_up=notify_import_failed,
+            ).start()
+            atexit.register(_import_executor.shutdown)
+        return _import_executor
+
+
+def get_import_executor():
+    """Get the import executor, or None if no import has been started in this process"""
+    return _import_executor
+
 
 def download_and_reupload(url: str, car_id=None, car_name=None, car_brand=None, is_main_img=False, image_index=None, app=None) -> str:
+    """
+    Copy an image to Cloudinary.
+
+    Returns:
+        str: Cloudinary URL, or None if the transfer failed
+
+    Raises:
+        ImageDownloadError: If the URL does not serve a supported image; retrying will not help
+    """
     try:
         logger.info(f"⬇️ Скачиваем изображение {image_index} с {url}")
-        response = requests.get(url)
-        response.raise_for_status()
-        file_ext = os.path.splitext(url.split('?')[0])[1] or '.jpg'
-        with tempfile.NamedTemporaryFile(suffix=file_ext, delete=False) as tmp:
-            tmp.write(response.content)
-            tmp_path = tmp.name
-        
-        logger.info(f"☁️ Загружаем изображение {image_index} в Cloudinary...")
-        
-        # Use Flask application context to ensure correct Cloudinary folder is used
-        with get_app_context(app=app):
-            uploaded_url = upload_image(
-                tmp_path,
-                car_id=car_id,
-                car_name=car_name,
-                car_brand=car_brand,
-                is_main=is_main_img,
-                index=image_index
-            )
-            
-        try:
-            os.unlink(tmp_path)
-        except Exception as e:
-            logger.warning(f"⚠️ Не удалось удалить временный файл: {e}")
+        with downloaded_image(url) as tmp_path:
+            logger.info(f"☁️ Загружаем изображение {image_index} в Cloudinary...")
+
+            # Use Flask application context to ensure correct Cloudinary folder is used
+            with get_app_context(app=app):
+                uploaded_url = upload_image(
+                    tmp_path,
+                    car_id=car_id,
+                    car_name=car_name,
+                    car_brand=car_brand,
+                    is_main=is_main_img,
+                    index=image_index
+                )
         return uploaded_url
+    except ImageDownloadError:
+        raise
     except Exception as e:
         logger.error(f"❌ Ошибка при обработке изображения {image_index}: {e}")
         return None
@@ -435,3 +577,13 @@ def generate_image(mode: str = None, prompt: str = "", image_url: str = "", car_
         else:
             logger.warning(f"⚠️ Неизвестный режим генерации: {mode}")
             return None
+
+
+def _is_fatal_generation_error(error):
+    # A source photo that is not an image fails the same way on every attempt
+    return isinstance(error, ImageDownloadError) or is_fatal_error(error)
+
+
+# Replicate predictions are slow and paid for: back off longer than the default between attempts
+register_retry_policy(generator_path(generate_image), max_retries=3, base_delay=60, max_delay=1800,
+                      is_fatal=_is_fatal_generation_error)
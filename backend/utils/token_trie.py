@@ -0,0 +1,156 @@
+"""
+Case-insensitive, word-bounded token trie used by the car parser.
+
+Text is split into alternating tokens: runs of word characters and runs of
+non-word characters. A name that starts and ends with a word character can
+only occur where a word token starts and end where a word token ends -
+exactly the places ``r'\\b' + re.escape(name) + r'\\b'`` can match - and the
+separators inside it must equal the text's separators. All occurrences of
+all names are then found in one left-to-right walk over the tokens.
+"""
+
+import re
+
+SEPARATOR_PATTERN = re.compile(r'(\W+)')
+_WORD_CHAR = re.compile(r'\w')
+
+
+def _tokenize(text):
+    """
+    Split text into lowercased [word, separator, word, ...] tokens.
+
+    The first and last tokens are empty strings when the text starts or ends
+    with a separator, so word tokens are always at even positions.
+
+    Returns:
+        tuple: (tokens, offsets) where offsets[i] is where token i starts in
+        text and offsets[-1] == len(text)
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        tokens = SEPARATOR_PATTERN.split(lowered)
+        originals = tokens
+    else:
+        # Some character lowercased to several characters, so offsets in the
+        # lowered text would not line up with the original
+        originals = SEPARATOR_PATTERN.split(text)
+        tokens = [token.lower() for token in originals]
+
+    offsets = [0]
+    for token in originals:
+        offsets.append(offsets[-1] + len(token))
+    return tokens, offsets
+
+
+class TokenTrie:
+    """
+    Find which of a set of names occur in a text as whole words.
+
+    Names are ranked like ``sorted(names, key=len, reverse=True)``, so the
+    best match is the one the old "longest name first" regex loops found.
+    Names that start or end with a non-word character cannot be aligned to
+    tokens and are checked with their word-bounded regex instead.
+    """
+
+    def __init__(self, names):
+        self.names = tuple(sorted((name for name in names if name), key=len, reverse=True))
+        self._root = {}
+        self._irregular = []
+
+        for rank, name in enumerate(self.names):
+            if not (_WORD_CHAR.match(name[0]) and _WORD_CHAR.match(name[-1])):
+                pattern = re.compile(r'\b' + re.escape(name) + r'\b', re.IGNORECASE)
+                self._irregular.append((rank, pattern))
+                continue
+
+            node = self._root
+            for token in _tokenize(name)[0]:
+                node = node.setdefault(token, {})
+            # Names that differ only in case share a node; the better rank wins
+            node.setdefault(None, rank)
+
+    def __len__(self):
+        return len(self.names)
+
+    def find_all(self, text):
+        """
+        Find every occurrence of every name in the text.
+
+        Args:
+            text (str): Text to search in
+
+        Returns:
+            list: (rank, start, end) tuples ordered by start, then end
+        """
+        if not self.names or not text:
+            return []
+
+        tokens, starts = _tokenize(text)
+
+        spans = []
+        root = self._root
+        token_count = len(tokens)
+        for first in range(0, token_count, 2):
+            node = root.get(tokens[first])
+            index = first + 1
+            while node is not None:
+                rank = node.get(None)
+                if rank is not None:
+                    spans.append((rank, starts[first], starts[index]))
+                if index == token_count:
+                    break
+                node = node.get(tokens[index])
+                index += 1
+
+        if self._irregular:
+            for rank, pattern in self._irregular:
+                spans.extend((rank, match.start(), match.end()) for match in pattern.finditer(text))
+            spans.sort(key=lambda span: (span[1], span[2]))
+
+        return spans
+
+    def find_best(self, text):
+        """
+        Find the highest-priority name in the text and where it occurs.
+
+        Args:
+            text (str): Text to search in
+
+        Returns:
+            tuple or None: (name, [(start, end), ...]) with the non-overlapping
+            occurrences of the name from left to right (the ones re.sub would
+            replace), or None if no name occurs in the text
+        """
+        spans = self.find_all(text)
+        if not spans:
+            return None
+
+        best_rank = min(span[0] for span in spans)
+        occurrences = []
+        position = 0
+        for rank, start, end in spans:
+            if rank == best_rank and start >= position:
+                occurrences.append((start, end))
+                position = end
+        return self.names[best_rank], occurrences
+
+    def search(self, text):
+        """
+        Find the first occurrence of the highest-priority name in the text.
+
+        Returns:
+            str or None: The name, or None if no name occurs in the text
+        """
+        best = self.find_best(text)
+        return best[0] if best else None
+
+
+def remove_spans(text, spans):
+    """Cut the given non-overlapping (start, end) spans out of text"""
+    parts = []
+    position = 0
+    for start, end in spans:
+        parts.append(text[position:start])
+        position = end
+    parts.append(text[position:])
+    return ''.join(parts)
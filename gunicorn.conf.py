@@ -0,0 +1,10 @@
+"""
+gunicorn settings: `gunicorn -c gunicorn.conf.py backend.app:app`
+"""
+
+
+def post_worker_init(worker):
+    # Every worker process serves the app; start its image and import pools with it,
+    # instead of on its first request
+    from backend.app import start_background_workers
+    start_background_workers()
@@ -0,0 +1,39 @@
+"""add generation_cache table
+
+Revision ID: a93c5d7e1f24
+Revises: f08d3e6b2a91
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a93c5d7e1f24'
+down_revision = 'f08d3e6b2a91'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('generation_cache',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('cache_key', sa.String(length=64), nullable=False),
+        sa.Column('generator', sa.String(length=200), nullable=False),
+        sa.Column('mode', sa.String(length=32), nullable=True),
+        sa.Column('source_hash', sa.String(length=64), nullable=False),
+        sa.Column('prompt_hash', sa.String(length=64), nullable=True),
+        sa.Column('result_url', sa.String(length=512), nullable=False),
+        sa.Column('hits', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('cache_key')
+    )
+    op.create_index(op.f('ix_generation_cache_last_used_at'), 'generation_cache', ['last_used_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_generation_cache_last_used_at'), table_name='generation_cache')
+    op.drop_table('generation_cache')
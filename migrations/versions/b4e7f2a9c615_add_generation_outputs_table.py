@@ -0,0 +1,35 @@
+"""add generation_outputs table
+
+Revision ID: b4e7f2a9c615
+Revises: a93c5d7e1f24
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e7f2a9c615'
+down_revision = 'a93c5d7e1f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('generation_outputs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('task_id', sa.String(length=64), nullable=True),
+        sa.Column('car_id', sa.Integer(), nullable=True),
+        sa.Column('generator', sa.String(length=32), nullable=True),
+        sa.Column('output_url', sa.String(length=1024), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['car_id'], ['cars.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('idx_generation_outputs_task_id', 'generation_outputs', ['task_id', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('idx_generation_outputs_task_id', table_name='generation_outputs')
+    op.drop_table('generation_outputs')
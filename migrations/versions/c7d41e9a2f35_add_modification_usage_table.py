@@ -0,0 +1,54 @@
+"""add modification_usage table
+
+Revision ID: c7d41e9a2f35
+Revises: 2e8bd4f3a712
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d41e9a2f35'
+down_revision = '2e8bd4f3a712'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    modification_usage = op.create_table('modification_usage',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('brand_id', sa.Integer(), nullable=False),
+        sa.Column('normalized', sa.String(length=100), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('usage_count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['brand_id'], ['brands.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('brand_id', 'normalized', name='unique_modification_usage_per_brand')
+    )
+
+    # Backfill from the existing cars (same normalization as utils/modification_index.py)
+    cars = sa.table('cars', sa.column('id'), sa.column('brand_id'), sa.column('modification'))
+    rows = {}
+    for brand_id, modification, count in op.get_bind().execute(
+        sa.select(cars.c.brand_id, cars.c.modification, sa.func.count(cars.c.id))
+        .where(cars.c.brand_id.isnot(None), cars.c.modification.isnot(None))
+        .group_by(cars.c.brand_id, cars.c.modification)
+        .order_by(cars.c.brand_id, cars.c.modification)
+    ):
+        normalized = re.sub(r'\s+', ' ', modification).strip().lower()
+        if not normalized:
+            continue
+        row = rows.setdefault((brand_id, normalized), {
+            'brand_id': brand_id, 'normalized': normalized, 'name': modification.strip(), 'usage_count': 0,
+        })
+        row['usage_count'] += count
+    if rows:
+        op.bulk_insert(modification_usage, list(rows.values()))
+
+
+def downgrade():
+    op.drop_table('modification_usage')
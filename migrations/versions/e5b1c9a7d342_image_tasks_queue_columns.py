@@ -0,0 +1,42 @@
+"""image_tasks queue columns
+
+Revision ID: e5b1c9a7d342
+Revises: d2a8f6c41b07
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1c9a7d342'
+down_revision = 'd2a8f6c41b07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('image_tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('generator', sa.String(length=200), nullable=True))
+        batch_op.add_column(sa.Column('params', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('max_retries', sa.Integer(), nullable=False, server_default='3'))
+        batch_op.add_column(sa.Column('locked_by', sa.String(length=128), nullable=True))
+        batch_op.add_column(sa.Column('locked_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('idx_image_tasks_status_id', ['status', 'id'], unique=False)
+
+    # Tasks queued in memory before this revision cannot be run again: they have no generator recorded
+    op.execute("UPDATE image_tasks SET status = 'failed', error = 'Lost on restart (queued in memory)' "
+               "WHERE status IN ('pending', 'retrying', 'waiting_upload') AND source = 'ai_generation'")
+
+
+def downgrade():
+    with op.batch_alter_table('image_tasks', schema=None) as batch_op:
+        batch_op.drop_index('idx_image_tasks_status_id')
+        batch_op.drop_column('locked_at')
+        batch_op.drop_column('locked_by')
+        batch_op.drop_column('max_retries')
+        batch_op.drop_column('attempts')
+        batch_op.drop_column('params')
+        batch_op.drop_column('generator')
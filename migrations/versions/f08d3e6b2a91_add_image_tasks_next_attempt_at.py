@@ -0,0 +1,26 @@
+"""add image_tasks.next_attempt_at
+
+Revision ID: f08d3e6b2a91
+Revises: e5b1c9a7d342
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f08d3e6b2a91'
+down_revision = 'e5b1c9a7d342'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('image_tasks', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('next_attempt_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('image_tasks', schema=None) as batch_op:
+        batch_op.drop_column('next_attempt_at')